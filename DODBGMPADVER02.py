@@ -1,6 +1,25 @@
 import pyxel
 import random
 import math
+import sys
+import time
+from array import array
+from itertools import chain
+
+try:
+    import perfkit  # 計測ツール (任意)。ブラウザ版では読み込まれない
+except ImportError:
+    perfkit = None
+
+try:
+    import horde  # NumPy 版ゾンビ群 (任意)。numpy が無い環境では 1 体ずつ更新する
+except ImportError:
+    horde = None
+
+try:
+    import netplay  # 対戦モードのロールバック (任意)。ブラウザ版では読み込まれず、--versus は無効になる
+except ImportError:
+    netplay = None
 
 # --- 定数 (変更なし) ---
 WINDOW_W = 160
@@ -19,6 +38,10 @@ TRAIL_MAX_LENGTH = 200
 FINAL_SCENE_HOLD_TIME = 180
 UI_HEIGHT = 20
 CREDITS_SPEED = 0.5
+# クレジットを前もって書いておくイメージバンク (0 番はタイトル画像)
+CREDITS_IMAGE_BANK = 1
+# HUD とタイトル・チュートリアルの文字を書いておくイメージバンク
+TEXT_IMAGE_BANK = 2
 GAMEOVER_HOLD_TIME = 120
 
 BASE_TIME_LIMIT = 45.0
@@ -26,6 +49,39 @@ BONUS_TIME_AFTER_CLEAR = 10.0
 FINAL_STAGE_ZOMBIES = 30
 FINAL_STAGE_TIME_LIMIT_MIN = 20.0
 
+# 大群モード (--massive-horde): ゾンビ数を何倍にするか
+MASSIVE_HORDE_SCALE = 8
+# ゾンビがこの数以上のステージは配列版 (horde.py) でまとめて更新する
+HORDE_MIN_ZOMBIES = 48
+
+# 群れの動き (徘徊・追跡中のゾンビ): この距離内のゾンビを仲間として見る
+FLOCK_RADIUS = 12
+FLOCK_SEPARATION_RADIUS = 8  # これより近い仲間からは離れる
+FLOCK_SEPARATION = 0.03      # 分離の強さ
+FLOCK_ALIGNMENT = 0.05       # 整列 (仲間の平均速度に合わせる) の強さ
+FLOCK_COHESION = 0.002       # 結合 (仲間の中心へ寄る) の強さ
+
+# シミュレーションの刻み (1 秒あたりのステップ数)。速度やフレーム数の定数はすべてこの 1 ステップ基準で、
+# 元の Pyxel の 30fps (1 フレーム 1 回の update) に合わせてある
+SIM_RATE = 30
+# 描画が遅れたとき 1 回の update で追いつくステップ数の上限 (これ以上はスローモーションになる)
+MAX_CATCH_UP_STEPS = 5
+
+# 練習モード (--practice): BackSpace / Y ボタンを押している間は巻き戻し、R でステージの最初からやり直す。
+# 時間切れでもタイトルへ戻らず、ステージの最初からやり直す
+REWIND_SECONDS = 10   # 巻き戻せる長さ (秒)
+REWIND_INTERVAL = 2   # スナップショットを取る間隔 (ステップ)。巻き戻しもこのステップ数ごとに 1 つ戻すので実時間と同じ速さで戻る
+
+# スナップショットでの状態名の番号
+SNAPSHOT_GAME_STATES = ("TITLE", "TUTORIAL", "PLAYING", "GO_TO_SANCT", "ENDING", "CREDITS_ROLL")
+SNAPSHOT_ZOMBIE_STATES = ("wander", "follow", "captured")
+# スナップショットに入れる GameApp の値 (整数 / 小数 / 真偽値)
+SNAPSHOT_INTS = ("stage", "stage_start_frame", "time_up_frame", "ending_timer")
+SNAPSHOT_FLOATS = ("stage_time_limit", "time_remaining_next_stage", "last_stage_remaining_time",
+                   "start_time_total", "zombie_speed_multiplier", "total_clear_time", "credits_y")
+SNAPSHOT_FLAGS = ("marching", "fade_outting", "next_state_called", "time_up_zombified",
+                  "time_up_warning_played", "show_final_score", "horde_active")
+
 GAMEPAD_DPAD_UP = pyxel.GAMEPAD1_BUTTON_DPAD_UP
 GAMEPAD_DPAD_DOWN = pyxel.GAMEPAD1_BUTTON_DPAD_DOWN
 GAMEPAD_DPAD_LEFT = pyxel.GAMEPAD1_BUTTON_DPAD_LEFT
@@ -35,6 +91,54 @@ GAMEPAD_A_ID = pyxel.GAMEPAD1_BUTTON_A
 GAMEPAD_START_ID = pyxel.GAMEPAD1_BUTTON_START 
 GAMEPAD_Y_ID = pyxel.GAMEPAD1_BUTTON_Y
 
+# 方向入力のビット。押しているボタンを 1 つの整数にまとめ、対戦モードではこれを送り合う
+PAD_LEFT = 1
+PAD_RIGHT = 2
+PAD_UP = 4
+PAD_DOWN = 8
+# (ビット, そのビットになるキー・ボタン)。1P は矢印キーとゲームパッド 1、2P は WASD とゲームパッド 2
+PAD1_BUTTONS = ((PAD_LEFT, (pyxel.KEY_LEFT, GAMEPAD_DPAD_LEFT)), (PAD_RIGHT, (pyxel.KEY_RIGHT, GAMEPAD_DPAD_RIGHT)),
+                (PAD_UP, (pyxel.KEY_UP, GAMEPAD_DPAD_UP)), (PAD_DOWN, (pyxel.KEY_DOWN, GAMEPAD_DPAD_DOWN)))
+PAD2_BUTTONS = ((PAD_LEFT, (pyxel.KEY_A, pyxel.GAMEPAD2_BUTTON_DPAD_LEFT)),
+                (PAD_RIGHT, (pyxel.KEY_D, pyxel.GAMEPAD2_BUTTON_DPAD_RIGHT)),
+                (PAD_UP, (pyxel.KEY_W, pyxel.GAMEPAD2_BUTTON_DPAD_UP)),
+                (PAD_DOWN, (pyxel.KEY_S, pyxel.GAMEPAD2_BUTTON_DPAD_DOWN)))
+
+# 2 人対戦 (--versus): 同じ群れを 2 人で取り合い、全員捕まえるか時間切れになったら多く捕まえた方が勝ち
+VERSUS_ZOMBIES = 20
+VERSUS_TIME_LIMIT = 60.0
+VERSUS_RESULT_HOLD = 90    # 決着してから結果を表示しておくステップ数
+VERSUS_LATENCY = 0         # 2P の入力を何フレーム遅れて届けるか (--versus-latency N でネット越しの遅れを試す)
+
+# エンドレスモード (--endless): ゾンビが左端から湧き続ける。捕まえて聖域まで連れて行くと預けられ (得点)、
+# 1 体ごとに持ち時間が増える。時間切れで終わり。ゾンビはプールで使い回し、画面上の数に上限がある
+ENDLESS_TIME_LIMIT = 45.0         # 開始時の持ち時間 (秒)
+ENDLESS_BANK_BONUS = 1.5          # 1 体預けるごとに増える時間 (秒)
+ENDLESS_SPAWN_INTERVAL = 45       # 開始時の湧く間隔 (ステップ)
+ENDLESS_MIN_SPAWN_INTERVAL = 8    # 湧く間隔の下限 (ステップ)
+ENDLESS_RAMP_SECONDS = 60.0       # この秒数ごとに湧く速さが開始時の 1 倍ずつ増える
+ENDLESS_MAX_ZOMBIES = 40          # 画面上 (捕獲済みを含む) のゾンビの上限
+
+# プレイ中のステート。この間は GC を止めておく (perfkit.GCPacer)
+GC_ACTIVE_STATES = ("PLAYING", "ENDLESS", "VERSUS")
+
+# 描画の品質の自動調整: 1 フレーム (update + draw) の時間が予算に近づいたら、見た目だけの演出を段階的に
+# 軽くし、余裕が戻ったら元に戻す。段階 (tier) が上がるほど軽い。現在の段階は --hitch-log の表示 (F3) に出る
+QUALITY_BUDGET = 1.0 / SIM_RATE  # 1 フレームの予算 (pyxel.init の fps = SIM_RATE)
+QUALITY_SMOOTHING = 0.1          # フレーム時間の移動平均の重み
+QUALITY_SLOW = 0.8               # 平均が予算のこの割合を超えたら「重い」
+QUALITY_FAST = 0.5               # 平均が予算のこの割合を下回ったら「余裕がある」
+QUALITY_DOWN_FRAMES = 15         # 重いフレームがこれだけ続いたら 1 段軽くする
+QUALITY_UP_FRAMES = 90           # 余裕のあるフレームがこれだけ続いたら 1 段戻す (行ったり来たりしないよう長めに)
+QUALITY_TIER_EFFECTS = 1         # フェードを 1 枚で描き、ゾンビのちらつきを描かない
+QUALITY_TIER_SHADOW = 2          # 影を 1 つの円にする
+QUALITY_TIER_PARTICLES = 3       # 砂ぼこり・捕獲の粒子を半分だけ出す
+QUALITY_TIERS = 3
+
+# 1 体が持てる粒子の上限 (砂ぼこり・変身・捕獲の種類ごと)。寿命で消えるのを待たずに、ここで増えるのを止める。
+# 普段のプレイやエンディングでは届かない (変身の粒子がエンディングで最大 96 個ほど)
+MAX_PARTICLES = 96
+
 # --- ユーティリティ/クラス (BGM関連ロジック以外変更なし) ---
 
 def clamp(v, a, b):
@@ -46,6 +150,42 @@ def dist(ax, ay, bx, by):
 def center_text_x(text):
     return (WINDOW_W - len(text) * 4) // 2
 
+# 描画の演出 (ちらつき・画面の揺れ) に使う乱数。シミュレーションの random の並びを描画の回数で変えない
+fx_random = random.Random()
+
+def pack_particles(out, particles):
+    """粒子 ([x, y, vx, vy, 色, 寿命] のリスト) を数の並びにして out に足す"""
+    out.append(len(particles))
+    for p in particles:
+        out += p
+
+def read_pad(buttons):
+    """buttons (PAD1_BUTTONS など) のうち押されているもののビットを合わせた整数"""
+    value = 0
+    for bit, keys in buttons:
+        for key in keys:
+            if pyxel.btn(key):
+                value |= bit
+                break
+    return value
+
+def pack_random(out, state):
+    """random.getstate() の値を数の並びにして out に足す"""
+    _, internal, gauss = state
+    out += internal
+    out += (gauss is not None, gauss or 0.0)
+
+def unpack_random(reader):
+    """pack_random() で足した並びから、random.setstate() に渡す値を作る"""
+    internal = tuple(map(int, reader.take(625)))
+    has_gauss, gauss = reader.take(2)
+    return 3, internal, gauss if has_gauss else None
+
+def unpack_particles(reader):
+    n = int(reader.next())
+    v = reader.take(n * 6)
+    return [[v[i], v[i + 1], v[i + 2], v[i + 3], int(v[i + 4]), int(v[i + 5])] for i in range(0, n * 6, 6)]
+
 CREDITS_CONTENT = [
     (16, "DEMOCRACY OF THE DEAD", 8),
     (8, "---", 7),
@@ -73,20 +213,34 @@ CREDITS_CONTENT = [
 
 # Player, Zombie, Fade, Shake クラスは省略（変更なし）
 class Player:
+    # 属性を固定して __dict__ を持たせない (インスタンスのメモリを減らし、属性アクセスを速くする)
+    __slots__ = ("x", "y", "prev_x", "prev_y", "dir", "walk_frame", "color", "is_main", "is_zombified",
+                 "temp_color", "dust_particles", "transform_particles", "trail")
+
     def __init__(self, x, y, is_main=True, color_override=None):
+        self.dust_particles = []
+        self.transform_particles = []
+        self.reset(x, y, is_main, color_override)
+
+    def reset(self, x, y, is_main=True, color_override=None):
+        """プールから再利用するときも、新規生成と同じ状態に初期化する"""
         self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y  # 描画補間用 (ひとつ前のステップの位置)
         self.dir = 1
         self.walk_frame = 0
         self.color = color_override if color_override is not None else 11
         self.is_main = is_main
         self.is_zombified = False
         self.temp_color = None
-        self.dust_particles = []
-        self.transform_particles = [] 
-        if is_main:
-            self.trail = [(x, y)] * TRAIL_MAX_LENGTH
-
-    def update(self, obstacles, controllable=True):
+        self.dust_particles.clear()
+        self.transform_particles.clear()
+        self.trail = [(x, y)] * TRAIL_MAX_LENGTH if is_main else None
+
+    def update(self, obstacles, controllable=True, tick=None, pad=None):
+        """tick はシミュレーションのステップ数 (砂ぼこりを出す間隔に使う)。省略時は pyxel.frame_count。
+        pad は方向入力 (PAD_* のビット)。省略時は 1P のキー・ゲームパッドを読む"""
+        if tick is None:
+            tick = pyxel.frame_count
         for p in self.transform_particles:
             p[0] += p[2]
             p[1] += p[3]
@@ -101,19 +255,21 @@ class Player:
 
         if controllable and not self.is_zombified:
             sp = PLAYER_SPEED
+            if pad is None:
+                pad = read_pad(PAD1_BUTTONS)
 
-            if pyxel.btn(pyxel.KEY_LEFT) or pyxel.btn(GAMEPAD_DPAD_LEFT):
+            if pad & PAD_LEFT:
                 dx = -sp
-                if pyxel.btn(pyxel.KEY_RIGHT) or pyxel.btn(GAMEPAD_DPAD_RIGHT):
+                if pad & PAD_RIGHT:
                     dx = 0
-            elif pyxel.btn(pyxel.KEY_RIGHT) or pyxel.btn(GAMEPAD_DPAD_RIGHT):
+            elif pad & PAD_RIGHT:
                 dx = sp
 
-            if pyxel.btn(pyxel.KEY_UP) or pyxel.btn(GAMEPAD_DPAD_UP):
+            if pad & PAD_UP:
                 dy = -sp
-                if pyxel.btn(pyxel.KEY_DOWN) or pyxel.btn(GAMEPAD_DPAD_DOWN):
+                if pad & PAD_DOWN:
                     dy = 0
-            elif pyxel.btn(pyxel.KEY_DOWN) or pyxel.btn(GAMEPAD_DPAD_DOWN):
+            elif pad & PAD_DOWN:
                 dy = sp
 
             if dx != 0 and dy != 0:
@@ -130,9 +286,11 @@ class Player:
 
             self.x, self.y = nx, ny
 
-            if pyxel.frame_count % 3 == 0:
-                self.dust_particles.append([self.x + random.randint(-2, 2), self.y + random.randint(2, 4),
-                                             random.uniform(-0.5, 0.5), random.uniform(-0.5, 0), 6, 15])
+            if tick % 3 == 0:
+                p = [self.x + random.randint(-2, 2), self.y + random.randint(2, 4),
+                     random.uniform(-0.5, 0.5), random.uniform(-0.5, 0), 6, 15]
+                if quality.emits(tick // 3) and len(self.dust_particles) < MAX_PARTICLES:
+                    self.dust_particles.append(p)
 
             if dx > 0:
                 self.dir = 1
@@ -143,8 +301,9 @@ class Player:
         self.y = clamp(self.y, UI_HEIGHT + PLAYER_R, WINDOW_H - 1 - PLAYER_R)
 
         if self.is_main and not self.is_zombified:
+            # 同じリストの中で入れ替える (毎ステップ新しいリストを作らない)
             self.trail.insert(0, (self.x, self.y))
-            self.trail = self.trail[:TRAIL_MAX_LENGTH]
+            del self.trail[TRAIL_MAX_LENGTH:]
 
         for p in self.dust_particles:
             p[0] += p[2]
@@ -152,8 +311,41 @@ class Player:
             p[5] -= 1
         self.dust_particles = [p for p in self.dust_particles if p[5] > 0]
 
+    def pack(self, out):
+        """スナップショット用に、状態を数の並びにして out に足す"""
+        out += (self.x, self.y, self.prev_x, self.prev_y, self.dir, self.walk_frame, self.color,
+                self.is_main, self.is_zombified, -1 if self.temp_color is None else self.temp_color)
+        pack_particles(out, self.dust_particles)
+        pack_particles(out, self.transform_particles)
+        if self.trail is None:
+            out.append(-1)
+        else:
+            out.append(len(self.trail))
+            out += chain.from_iterable(self.trail)
+
+    def unpack(self, reader):
+        """pack() で足した並びを reader (SnapshotReader) から読んで状態を戻す"""
+        self.x, self.y, self.prev_x, self.prev_y = reader.take(4)
+        self.dir = int(reader.next())
+        self.walk_frame = int(reader.next())
+        self.color = int(reader.next())
+        self.is_main = bool(reader.next())
+        self.is_zombified = bool(reader.next())
+        c = int(reader.next())
+        self.temp_color = None if c < 0 else c
+        self.dust_particles = unpack_particles(reader)
+        self.transform_particles = unpack_particles(reader)
+        n = int(reader.next())
+        if n < 0:
+            self.trail = None
+        else:
+            v = reader.take(n * 2)
+            self.trail = list(zip(v[0::2], v[1::2]))
+
     def spawn_transform_particle(self, color):
         for _ in range(random.randint(1, 4)):
+            if len(self.transform_particles) >= MAX_PARTICLES:
+                break
             self.transform_particles.append(
                 [self.x + random.uniform(-5, 5), self.y + random.uniform(-10, 0),
                  random.uniform(-1.5, 1.5), random.uniform(-2.5, -0.8), 
@@ -171,7 +363,8 @@ class Player:
         for p in self.transform_particles:
             pyxel.rect(int(p[0]), int(p[1]), 1, 1, p[4])
 
-        pyxel.circ(x, y + 3, 4, 0)
+        if quality.tier < QUALITY_TIER_SHADOW:
+            pyxel.circ(x, y + 3, 4, 0)
         pyxel.circ(x, y + 3, 3, 1)
 
         if self.is_zombified:
@@ -212,8 +405,18 @@ class Player:
         pyxel.pset(x - 2 * self.dir, y - 7 - hair_offset, hair_color)
 
 class Zombie:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "vx", "vy", "dir", "state", "speed_factor", "base_color",
+                 "bite_frame", "captured_particles")
+    muted = False  # 対戦モードで巻き戻して計算し直している間は True (捕獲音を鳴らし直さない)
+
     def __init__(self, x, y, speed_factor=1.0, global_speed_multiplier=1.0):
+        self.captured_particles = []
+        self.reset(x, y, speed_factor, global_speed_multiplier)
+
+    def reset(self, x, y, speed_factor=1.0, global_speed_multiplier=1.0):
+        """プールから再利用するときも、新規生成と同じ状態に初期化する"""
         self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y  # 描画補間用 (ひとつ前のステップの位置)
         self.vx = random.uniform(-0.4, 0.4)
         self.vy = random.uniform(-0.4, 0.4)
         self.dir = 1
@@ -221,9 +424,9 @@ class Zombie:
         self.speed_factor = speed_factor * global_speed_multiplier
         self.base_color = random.choice([3, 11, 4])
         self.bite_frame = 0
-        self.captured_particles = []
+        self.captured_particles.clear()
 
-    def update(self, player, obstacles, captured_zombies):
+    def update(self, player, obstacles, captured_zombies, neighbors=None):
         px, py = player.x, player.y
         d = dist(self.x, self.y, px, py)
 
@@ -236,9 +439,9 @@ class Zombie:
             target_pos = player.trail[target_index]
             tx, ty = target_pos
 
-            td = dist(self.x, self.y, tx, ty)
             sp = 1.0 * self.speed_factor
 
+            td = dist(self.x, self.y, tx, ty)
             if td > 1.0:
                 self.vx = (tx - self.x) / td * sp
                 self.vy = (ty - self.y) / td * sp
@@ -248,7 +451,8 @@ class Zombie:
 
             nx = self.x + self.vx
             ny = self.y + self.vy
-            self.x, self.y = nx, ny
+            self.x = clamp(nx, ZOMBIE_R, WINDOW_W - 1 - ZOMBIE_R)
+            self.y = clamp(ny, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
 
             if abs(self.vx) > 0.1:
                 if self.vx > 0:
@@ -256,27 +460,16 @@ class Zombie:
                 if self.vx < 0:
                     self.dir = -1
 
-            for p in self.captured_particles:
-                p[0] += p[2]
-                p[1] += p[3]
-                p[5] -= 1
-            self.captured_particles = [p for p in self.captured_particles if p[5] > 0]
-
-            self.x = clamp(self.x, ZOMBIE_R, WINDOW_W - 1 - ZOMBIE_R)
-            self.y = clamp(self.y, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
+            self.update_particles()
             return
 
         if d < PLAYER_R + ZOMBIE_R and self.state != "captured" and not player.is_zombified:
-            self.state = "captured"
-            self.vx = 0
-            self.vy = 0
-            pyxel.play(3, 8) # SE: 捕獲音
-            for _ in range(random.randint(5, 10)):
-                self.captured_particles.append(
-                    [self.x, self.y, random.uniform(-1, 1), random.uniform(-1, -0.5), random.choice([7, 8, 3]), 30])
+            self.capture()
             return
 
         if not player.is_zombified:
+            # 群れの力はこのステップ開始時の仲間の位置・速度から求め、追跡・徘徊の後に加える
+            fx, fy = self.flock(neighbors) if neighbors is not None else (0.0, 0.0)
             if d < 45:
                 self.state = "follow"
                 if d != 0:
@@ -287,9 +480,13 @@ class Zombie:
                 if random.random() < 0.02:
                     self.vx = random.uniform(-0.5, 0.5)
                     self.vy = random.uniform(-0.5, 0.5)
+            self.vx += fx
+            self.vy += fy
 
-        v_len = dist(0, 0, self.vx, self.vy)
         max_v = 1.0 * self.speed_factor
+        sanctuary_boundary = WINDOW_W - SANCTUARY_W
+
+        v_len = dist(0, 0, self.vx, self.vy)
         if v_len > max_v and v_len != 0:
             self.vx *= max_v / v_len
             self.vy *= max_v / v_len
@@ -297,21 +494,81 @@ class Zombie:
         nx = self.x + self.vx
         ny = self.y + self.vy
 
-        sanctuary_boundary = WINDOW_W - SANCTUARY_W
         if nx > sanctuary_boundary - ZOMBIE_R:
             if self.x <= sanctuary_boundary - ZOMBIE_R:
                 self.vx = 0
             nx = self.x
 
-        self.x, self.y = nx, ny
+        self.x = clamp(nx, ZOMBIE_R, WINDOW_W - 1 - ZOMBIE_R)
+        self.y = clamp(ny, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
 
         if self.vx > 0:
             self.dir = 1
         if self.vx < 0:
             self.dir = -1
 
-        self.x = clamp(self.x, ZOMBIE_R, WINDOW_W - 1 - ZOMBIE_R)
-        self.y = clamp(self.y, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
+    def flock(self, neighbors):
+        """近くの仲間との分離・整列・結合による速度の増分 (fx, fy)。
+        neighbors は NeighborGrid。周囲 3x3 マスの仲間だけを調べる"""
+        x, y = self.x, self.y
+        r2 = FLOCK_RADIUS * FLOCK_RADIUS
+        s2 = FLOCK_SEPARATION_RADIUS * FLOCK_SEPARATION_RADIUS
+        n = 0
+        sx = sy = ax = ay = cx = cy = 0.0
+        for cell in neighbors.around(x, y):
+            for ox, oy, ovx, ovy in cell:
+                dx = x - ox
+                dy = y - oy
+                d2 = dx * dx + dy * dy
+                if d2 >= r2 or d2 == 0:  # 範囲外 / 自分自身
+                    continue
+                n += 1
+                ax += ovx
+                ay += ovy
+                cx += ox
+                cy += oy
+                if d2 < s2:
+                    sx += dx
+                    sy += dy
+        if n == 0:
+            return 0.0, 0.0
+        return (sx * FLOCK_SEPARATION + (ax / n - self.vx) * FLOCK_ALIGNMENT + (cx / n - x) * FLOCK_COHESION,
+                sy * FLOCK_SEPARATION + (ay / n - self.vy) * FLOCK_ALIGNMENT + (cy / n - y) * FLOCK_COHESION)
+
+    def capture(self):
+        """捕獲された瞬間の処理 (配列版で捕獲されたときもここを呼ぶ)"""
+        self.state = "captured"
+        self.vx = 0
+        self.vy = 0
+        if not Zombie.muted:
+            pyxel.play(3, 8) # SE: 捕獲音
+        for i in range(random.randint(5, 10)):
+            p = [self.x, self.y, random.uniform(-1, 1), random.uniform(-1, -0.5), random.choice([7, 8, 3]), 30]
+            if quality.emits(i) and len(self.captured_particles) < MAX_PARTICLES:
+                self.captured_particles.append(p)
+
+    def pack(self, out):
+        """スナップショット用に、状態を数の並びにして out に足す"""
+        out += (self.x, self.y, self.prev_x, self.prev_y, self.vx, self.vy, self.dir,
+                SNAPSHOT_ZOMBIE_STATES.index(self.state), self.speed_factor, self.base_color, self.bite_frame)
+        pack_particles(out, self.captured_particles)
+
+    def unpack(self, reader):
+        """pack() で足した並びを reader (SnapshotReader) から読んで状態を戻す"""
+        self.x, self.y, self.prev_x, self.prev_y, self.vx, self.vy = reader.take(6)
+        self.dir = int(reader.next())
+        self.state = SNAPSHOT_ZOMBIE_STATES[int(reader.next())]
+        self.speed_factor = reader.next()
+        self.base_color = int(reader.next())
+        self.bite_frame = int(reader.next())
+        self.captured_particles = unpack_particles(reader)
+
+    def update_particles(self):
+        for p in self.captured_particles:
+            p[0] += p[2]
+            p[1] += p[3]
+            p[5] -= 1
+        self.captured_particles = [p for p in self.captured_particles if p[5] > 0]
 
     def draw(self):
         x, y = int(self.x), int(self.y)
@@ -319,14 +576,16 @@ class Zombie:
         for p in self.captured_particles:
             pyxel.pset(int(p[0]), int(p[1]), p[4])
 
-        pyxel.circ(x, y + 3, 4, 0)
+        if quality.tier < QUALITY_TIER_SHADOW:
+            pyxel.circ(x, y + 3, 4, 0)
         pyxel.circ(x, y + 3, 3, 1)
 
         c = 7 if self.state == "captured" else self.base_color
 
         pyxel.rect(x - 3, y - 3, 6, 6, c)
         pyxel.rect(x - 2, y - 2, 4, 4, c + 1)
-        pyxel.pset(x + random.randint(-2, 2), y + random.randint(-2, 2), 8)
+        if quality.tier < QUALITY_TIER_EFFECTS:
+            pyxel.pset(x + fx_random.randint(-2, 2), y + fx_random.randint(-2, 2), 8)
 
         pyxel.circ(x, y - 5, 2, c)
         pyxel.pset(x + self.dir, y - 5, 8)
@@ -334,6 +593,8 @@ class Zombie:
             pyxel.pset(x - self.dir, y - 5, 8)
 
 class Fade:
+    __slots__ = ("alpha", "target", "speed", "active")
+
     def __init__(self):
         self.alpha = 0.0
         self.target = 0.0
@@ -360,11 +621,14 @@ class Fade:
     def draw(self):
         if self.alpha <= 0.01:
             return
-        layers = int(self.alpha * 8) + 1
+        # 黒の矩形は不透明なので、軽くするときは 1 枚で済ませる
+        layers = 1 if quality.tier >= QUALITY_TIER_EFFECTS else int(self.alpha * 8) + 1
         for i in range(layers):
             pyxel.rect(0, 0, WINDOW_W, WINDOW_H, 0)
 
 class Shake:
+    __slots__ = ("timer", "intensity")
+
     def __init__(self):
         self.timer = 0
         self.intensity = 0
@@ -380,8 +644,439 @@ class Shake:
     def get_offset(self):
         if self.timer <= 0:
             return 0, 0
-        return (random.randint(-self.intensity, self.intensity),
-                random.randint(-self.intensity, self.intensity))
+        return (fx_random.randint(-self.intensity, self.intensity),
+                fx_random.randint(-self.intensity, self.intensity))
+
+
+class QualityGovernor:
+    """1 フレームの時間の移動平均を見て、見た目だけの演出の段階 (tier) を上げ下げする。
+    段階はゲームの進み方を変えない: 出さない粒子の分も乱数は同じだけ引く"""
+
+    def __init__(self, budget=QUALITY_BUDGET):
+        self.budget = budget
+        self.tier = 0
+        self.avg = 0.0
+        self.slow = 0      # 重いフレームが続いた数
+        self.fast = 0      # 余裕のあるフレームが続いた数
+        self.locked = False  # 対戦中は粒子も状態 (スナップショット) の一部なので、出す数を変えない
+
+    def record(self, secs):
+        """1 フレームにかかった時間 (秒) を渡す"""
+        self.avg += (secs - self.avg) * QUALITY_SMOOTHING
+        if self.avg > self.budget * QUALITY_SLOW:
+            self.slow += 1
+            self.fast = 0
+        elif self.avg < self.budget * QUALITY_FAST:
+            self.fast += 1
+            self.slow = 0
+        else:
+            self.slow = self.fast = 0
+        if self.slow >= QUALITY_DOWN_FRAMES and self.tier < QUALITY_TIERS:
+            self.tier += 1
+            self.slow = 0
+        elif self.fast >= QUALITY_UP_FRAMES and self.tier > 0:
+            self.tier -= 1
+            self.fast = 0
+
+    def emits(self, i):
+        """i 番目の粒子を出すか"""
+        return self.tier < QUALITY_TIER_PARTICLES or self.locked or i % 2 == 0
+
+# 描画の品質 (GameApp が毎フレームの時間を記録し、各エンティティの描画と粒子の生成が参照する)
+quality = QualityGovernor()
+
+
+class SimClock:
+    """シミュレーションを固定の dt (1/SIM_RATE 秒) で進める時計。
+    Pyxel が update を呼ぶ間隔が乱れても (重いブラウザなど)、落ちたフレームの分は
+    追加のステップで追いつくので、移動もタイマーも実時間どおりに進む"""
+
+    def __init__(self, rate=SIM_RATE, max_steps=MAX_CATCH_UP_STEPS):
+        self.dt = 1.0 / rate
+        self.max_steps = max_steps
+        self.acc = 0.0
+        self.last = None
+        self.ticks = 0     # 進めたステップ数。タイマーは pyxel.frame_count ではなくこれで測る
+        self.alpha = 0.0   # 描画の補間率 (前のステップの位置 → 今のステップの位置)
+        self.saved = []
+
+    def steps(self):
+        """今回の update で進めるステップ数を返す"""
+        now = time.perf_counter()
+        elapsed = self.dt if self.last is None else now - self.last
+        self.last = now
+        # ほぼ 1 ステップ分なら揃える (時間の揺らぎで 0 回・2 回と交互にならないように)
+        if abs(elapsed - self.dt) < self.dt * 0.1:
+            elapsed = self.dt
+        self.acc += elapsed
+        n = int(self.acc / self.dt)
+        if n > self.max_steps:
+            # 長く止まっていた分 (ウィンドウ移動など) は追いかけない
+            n = self.max_steps
+            self.acc = 0.0
+        else:
+            self.acc -= n * self.dt
+        self.alpha = self.acc / self.dt
+        return n
+
+    def seconds(self, since=0):
+        """since (ticks) からの経過時間 (秒)"""
+        return (self.ticks - since) / SIM_RATE
+
+    def remember(self, *groups):
+        """ステップの頭で呼ぶ。補間用に今の位置を覚えておく"""
+        for group in groups:
+            for e in group:
+                e.prev_x = e.x
+                e.prev_y = e.y
+
+    def lerp(self, *groups):
+        """描画の間だけ、座標を前のステップと今のステップの間の位置に置き換える"""
+        a = self.alpha
+        saved = self.saved
+        for group in groups:
+            for e in group:
+                x, y = e.x, e.y
+                saved.append((e, x, y))
+                e.x = e.prev_x + (x - e.prev_x) * a
+                e.y = e.prev_y + (y - e.prev_y) * a
+
+    def restore(self):
+        """lerp() で置き換えた座標をシミュレーションの値に戻す"""
+        for e, x, y in self.saved:
+            e.x = x
+            e.y = y
+        self.saved.clear()
+
+
+class NeighborGrid:
+    """群れの計算用の近傍マス (セルリスト)。FLOCK_RADIUS 四方のマスに、捕獲されていないゾンビの
+    (x, y, vx, vy) を毎ステップ 1 回入れ直す。近傍を探すのは周囲 3x3 マスだけなので、
+    1 体あたりの手間は周りの仲間の数にしか比例しない (全員との総当たりにならない)"""
+
+    def __init__(self, cell=FLOCK_RADIUS):
+        self.cell = cell
+        self.cols = cols = WINDOW_W // cell + 1
+        self.rows = rows = WINDOW_H // cell + 1
+        self.cells = [[] for _ in range(cols * rows)]
+        # マスごとの周囲 3x3 マス (画面外は除く)。リスト自体は使い回すので作るのは最初だけ
+        self.neighborhoods = []
+        for i in range(cols * rows):
+            col, row = i % cols, i // cols
+            self.neighborhoods.append(tuple(
+                self.cells[r * cols + c]
+                for r in range(max(0, row - 1), min(rows, row + 2))
+                for c in range(max(0, col - 1), min(cols, col + 2))))
+
+    def index(self, x, y):
+        return (clamp(int(y) // self.cell, 0, self.rows - 1) * self.cols
+                + clamp(int(x) // self.cell, 0, self.cols - 1))
+
+    def rebuild(self, zombies):
+        """このステップ開始時の位置・速度で入れ直す"""
+        for cell in self.cells:
+            cell.clear()
+        cells = self.cells
+        index = self.index
+        for z in zombies:
+            if z.state != "captured":
+                cells[index(z.x, z.y)].append((z.x, z.y, z.vx, z.vy))
+
+    def around(self, x, y):
+        return self.neighborhoods[self.index(x, y)]
+
+
+class TextLayer:
+    """変化の少ない文字 (HUD・タイトル・チュートリアル) をイメージバンクの一角に書いておき、
+    毎フレームは blt で写すだけにする。表示する値の組 (key) が変わったときだけ書き直す"""
+
+    def __init__(self, bank, u, v, w, h):
+        self.bank = bank
+        self.u, self.v, self.w, self.h = u, v, w, h
+        self.key = None
+
+    def draw(self, x, y, key, render, colkey=None):
+        """key が前回と違えば render(img, ox, oy, key) で書き直してから (x, y) に写す。
+        render は画面の座標に (ox, oy) を足した位置へ img.text などで描く"""
+        if key != self.key:
+            img = pyxel.images[self.bank]
+            img.clip(self.u, self.v, self.w, self.h)
+            img.rect(self.u, self.v, self.w, self.h, 0)
+            render(img, self.u - x, self.v - y, key)
+            img.clip()
+            self.key = key
+        if colkey is None:
+            pyxel.blt(x, y, self.bank, self.u, self.v, self.w, self.h)
+        else:
+            pyxel.blt(x, y, self.bank, self.u, self.v, self.w, self.h, colkey)
+
+
+class CreditsTexture:
+    """クレジットの全行を、イメージバンクに 1 回だけ書いておく (エンディングに入るとき)。
+    ロール中は画面に見えている範囲を blt で 1 回写すだけなので、行数が増えても重くならない"""
+
+    def __init__(self, bank=CREDITS_IMAGE_BANK):
+        self.bank = bank
+        self.height = 0  # 書いた高さ (0 = まだ書いていない)
+
+    def render(self):
+        # 最後の文字の行の下端まで (末尾の空行は書かない)
+        height = 0
+        y = 0
+        for line_height, text, _ in CREDITS_CONTENT:
+            if text:
+                height = y + pyxel.FONT_HEIGHT
+            y += line_height
+        img = pyxel.images[self.bank]
+        self.height = min(height, img.height)
+        img.rect(0, 0, WINDOW_W, self.height, 0)
+        y = 0
+        for line_height, text, color in CREDITS_CONTENT:
+            if text:
+                img.text(center_text_x(text), y, text, color)
+            y += line_height
+
+    def draw(self, top):
+        """テクスチャの上端を画面の Y 座標 top に合わせ、見えている部分だけ写す"""
+        top = math.floor(top)
+        src_y = max(0, -top)
+        dst_y = max(0, top)
+        h = min(self.height - src_y, WINDOW_H - dst_y)
+        if h > 0:
+            pyxel.blt(0, dst_y, self.bank, 0, src_y, WINDOW_W, h)
+
+
+class StagePrefetch:
+    """次のステージの配置を、フェードなど演出中のフレームに分けて前もって生成しておく"""
+
+    def __init__(self, budget=0.002, discard=None):
+        self.budget = budget  # 1 フレームあたりに使ってよい生成時間 (秒)
+        self.key = None
+        self.builder = None
+        self.layout = None
+        self.discard = discard  # 使わずに捨てる完成済みの配置を受け取る (借りたエンティティをプールへ返す)
+
+    def step(self, key, make_builder, budget=None):
+        """演出中に毎フレーム呼ぶ。key (ステージ番号など) が変わったら作り直す"""
+        if key != self.key:
+            self.cancel()
+            self.key = key
+            self.builder = make_builder()
+            self.layout = None
+        if self.layout is not None:
+            return
+        end = time.perf_counter() + (self.budget if budget is None else budget)
+        try:
+            while time.perf_counter() < end:
+                next(self.builder)
+        except StopIteration as e:
+            self.layout = e.value
+
+    def take(self, key, make_builder):
+        """ステージ開始時に呼ぶ。生成が終わっていなければ残りをこの場で生成する"""
+        while key != self.key or self.layout is None:
+            self.step(key, make_builder, budget=float("inf"))
+        layout = self.layout
+        self.key = self.builder = self.layout = None
+        return layout
+
+    def cancel(self):
+        """生成途中・生成済みの配置を捨てる (スナップショットから戻したとき・key が変わったときなど)。
+        生成途中のジェネレータは close() で止め (借りた分はジェネレータが返す)、完成済みの配置は discard に渡す"""
+        if self.layout is not None:
+            if self.discard:
+                self.discard(self.layout)
+        elif self.builder is not None:
+            self.builder.close()
+        self.key = self.builder = self.layout = None
+
+
+class EntityPool:
+    """Zombie / Player を使い回すプール。ステージ切り替えで捨てたインスタンスを回収し、
+    次に acquire されたとき reset() でその場で初期化し直す"""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0     # これまでに生成したインスタンス数 (= プールの大きさ)
+        self.high_water = 0  # 同時に使用中だった数の最大値
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+        in_use = self.created - len(self.free)
+        if in_use > self.high_water:
+            self.high_water = in_use
+        return obj
+
+    def release(self, objs):
+        self.free.extend(objs)
+
+    def fit(self, objs, count):
+        """リスト objs の長さを count に合わせる (余りは返し、足りなければ借りる)。中身は呼び出し側で上書きする"""
+        if len(objs) > count:
+            self.release(objs[count:])
+            del objs[count:]
+        while len(objs) < count:
+            objs.append(self.acquire(0, 0))
+
+    def summary(self):
+        return "%s: peak %d / created %d / free %d" % (
+            self.cls.__name__, self.high_water, self.created, len(self.free))
+
+
+class SnapshotReader:
+    """スナップショットの数の並びを先頭から順に読む"""
+    __slots__ = ("values", "pos")
+
+    def __init__(self, values):
+        self.values = values
+        self.pos = 0
+
+    def next(self):
+        v = self.values[self.pos]
+        self.pos += 1
+        return v
+
+    def take(self, n):
+        v = self.values[self.pos:self.pos + n]
+        self.pos += n
+        return v
+
+
+class RewindBuffer:
+    """スナップショット (bytes) を直近 capacity 個だけ持つリングバッファ。古いものから上書きする"""
+
+    def __init__(self, capacity):
+        self.slots = [None] * capacity
+        self.head = 0   # 次に書く位置
+        self.count = 0
+
+    def push(self, data):
+        self.slots[self.head] = data
+        self.head = (self.head + 1) % len(self.slots)
+        self.count = min(self.count + 1, len(self.slots))
+
+    def pop(self):
+        """いちばん新しいものを取り出す。空なら None"""
+        if not self.count:
+            return None
+        self.head = (self.head - 1) % len(self.slots)
+        self.count -= 1
+        data = self.slots[self.head]
+        self.slots[self.head] = None
+        return data
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.head = 0
+        self.count = 0
+
+
+class VersusMatch:
+    """2 人対戦 (--versus) の 1 試合。同じ群れを 2 人で取り合い、捕まえたゾンビはそれぞれの列に並ぶ。
+    入力 (PAD_* のビット) だけで結果が決まるよう、乱数の状態も試合ごとに持ち、step の間だけ random に入れる。
+    netplay.Rollback から step / save / load で動かす"""
+
+    def __init__(self, seed, zombie_count=VERSUS_ZOMBIES):
+        saved = random.getstate()
+        random.seed(seed)
+        self.players = [Player(WINDOW_W // 4, WINDOW_H // 2 - 20, color_override=11),
+                        Player(WINDOW_W // 4, WINDOW_H // 2 + 20, color_override=8)]
+        self.zombies = []
+        for _ in range(zombie_count):
+            zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
+            zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
+            self.zombies.append(Zombie(zx, zy, speed_factor=random.choice([0.8, 1.0, 1.3])))
+        self.captured = ([], [])  # プレイヤーごとの捕まえた順
+        self.neighbors = NeighborGrid()
+        self.ticks = 0
+        self.end_ticks = -1       # 決着したステップ (-1 = まだ)
+        self.score = (0, 0)       # 決着したときの捕獲数
+        self.rng = random.getstate()
+        random.setstate(saved)
+
+    def winner(self):
+        """勝った方の番号 (0 / 1)。引き分けは -1、決着前は None"""
+        if self.end_ticks < 0:
+            return None
+        a, b = self.score
+        return 0 if a > b else 1 if b > a else -1
+
+    def time_left(self):
+        ticks = self.ticks if self.end_ticks < 0 else self.end_ticks
+        return max(0.0, VERSUS_TIME_LIMIT - ticks / SIM_RATE)
+
+    def nearest(self, z):
+        """z にいちばん近いプレイヤーの番号 (同じ距離なら 1P)"""
+        a, b = self.players
+        return 0 if (a.x - z.x) ** 2 + (a.y - z.y) ** 2 <= (b.x - z.x) ** 2 + (b.y - z.y) ** 2 else 1
+
+    def step(self, inputs, replay=False):
+        """1 ステップ進める。inputs は (1P, 2P) の方向入力"""
+        saved = random.getstate()
+        random.setstate(self.rng)
+        muted = Zombie.muted
+        Zombie.muted = muted or replay
+        playing = self.end_ticks < 0
+
+        for e in chain(self.players, self.zombies):
+            e.prev_x = e.x
+            e.prev_y = e.y
+        for p, pad in zip(self.players, inputs):
+            p.update((), controllable=playing, tick=self.ticks, pad=pad)
+
+        # 捕まっていないゾンビは近い方のプレイヤーを追い、触れた方の列に加わる
+        self.neighbors.rebuild(self.zombies)
+        for z in self.zombies:
+            if z.state == "captured":
+                owner = 0 if z in self.captured[0] else 1
+                z.update(self.players[owner], (), self.captured[owner], self.neighbors)
+            else:
+                owner = self.nearest(z)
+                z.update(self.players[owner], (), self.captured[owner], self.neighbors)
+                if z.state == "captured":
+                    self.captured[owner].append(z)
+
+        self.ticks += 1
+        if playing and (len(self.captured[0]) + len(self.captured[1]) == len(self.zombies)
+                        or self.ticks >= VERSUS_TIME_LIMIT * SIM_RATE):
+            self.end_ticks = self.ticks
+            self.score = (len(self.captured[0]), len(self.captured[1]))
+
+        Zombie.muted = muted
+        self.rng = random.getstate()
+        random.setstate(saved)
+
+    def save(self):
+        """試合の状態を平らなバイト列にする (GameApp.save_state と同じ形式)"""
+        out = [0.0, self.ticks, self.end_ticks, self.score[0], self.score[1]]
+        for e in chain(self.players, self.zombies):
+            e.pack(out)
+        index = {id(z): i for i, z in enumerate(self.zombies)}
+        for group in self.captured:
+            out.append(len(group))
+            out += [index[id(z)] for z in group]
+        pack_random(out, self.rng)
+        out[0] = len(out)
+        return array("d", out).tobytes()
+
+    def load(self, data):
+        values = array("d")
+        values.frombytes(data)
+        reader = SnapshotReader(values.tolist())
+        reader.next()
+        self.ticks, self.end_ticks, a, b = map(int, reader.take(4))
+        self.score = (a, b)
+        for e in chain(self.players, self.zombies):
+            e.unpack(reader)
+        for group in self.captured:
+            group[:] = [self.zombies[int(i)] for i in reader.take(int(reader.next()))]
+        self.rng = unpack_random(reader)
 
 
 # ------------------------------------------------------------
@@ -389,7 +1084,8 @@ class Shake:
 # ------------------------------------------------------------
 class GameApp:
     def __init__(self):
-        pyxel.init(WINDOW_W, WINDOW_H, title="DEMOCRACY OF THE DEAD")
+        # 描画もシミュレーションと同じ刻みで回す (遅れたフレームだけ SimClock が追加のステップで追いつく)
+        pyxel.init(WINDOW_W, WINDOW_H, title="DEMOCRACY OF THE DEAD", fps=SIM_RATE)
 
         try:
             pyxel.pal(1, 4)
@@ -452,6 +1148,15 @@ class GameApp:
 
         self.fade = Fade()
         self.shake = Shake()
+        self.stage_prefetch = StagePrefetch(discard=self.release_layout)
+        self.neighbors = NeighborGrid()
+        self.clock = SimClock()
+        self.quality = quality
+        self.frame_start = None
+        self.enter_latched = False
+        # ステージをまたいで使い回すエンティティ
+        self.zombie_pool = EntityPool(Zombie)
+        self.player_pool = EntityPool(Player)
 
         self.state = "TITLE"
         self.stage = -1
@@ -461,6 +1166,25 @@ class GameApp:
         self.last_stage_remaining_time = 0.0
         self.start_time_total = 0.0
         self.zombie_speed_multiplier = 1.0
+        # 大群モード (--massive-horde)
+        self.massive_horde = "--massive-horde" in sys.argv[1:]
+        # 配列版のゾンビ群。ゾンビが多いステージだけ使う
+        self.horde = horde.Horde(WINDOW_W, WINDOW_H, UI_HEIGHT, SANCTUARY_W, PLAYER_R, ZOMBIE_R,
+                                 FOLLOW_DISTANCE) if horde else None
+        self.horde_active = False
+        # 練習モード (--practice)
+        self.practice = "--practice" in sys.argv[1:]
+        self.rewind = RewindBuffer(REWIND_SECONDS * SIM_RATE // REWIND_INTERVAL)
+        self.stage_snapshot = None  # ステージ開始時のスナップショット (やり直し用)
+        self.rewind_steps = 0       # 巻き戻し中にたまったステップ数 (REWIND_INTERVAL ごとに 1 つ戻す)
+        # 2 人対戦 (--versus)。netplay.py が無い環境では無効
+        self.versus_mode = "--versus" in sys.argv[1:] and netplay is not None
+        self.versus = None       # netplay.Rollback
+        self.versus_link = None  # 2P の入力を送る側の端点
+        # エンドレスモード (--endless)
+        self.endless = "--endless" in sys.argv[1:]
+        self.banked = 0             # 聖域に預けた数
+        self.next_spawn_tick = 0    # 次にゾンビが湧くステップ
 
         self.player = None
         self.players = []
@@ -481,12 +1205,27 @@ class GameApp:
         self.ending_timer = 0
         self.credits_y = WINDOW_H
         self.credits_duration = sum(height for height, _, _ in CREDITS_CONTENT)
+        self.credits_texture = CreditsTexture()
+        # 上端の UI 帯と、タイトル / チュートリアルの文字 (同時には出ないので 1 枚を共用)
+        self.hud_layer = TextLayer(TEXT_IMAGE_BANK, 0, 0, WINDOW_W, UI_HEIGHT)
+        self.screen_layer = TextLayer(TEXT_IMAGE_BANK, 0, UI_HEIGHT, WINDOW_W, WINDOW_H)
         self.title_particles = [(random.randint(0, WINDOW_W), random.randint(0, 18), random.random() * 1.4) for _ in
                                  range(28)]
 
         self.show_final_score = False
 
         self.play_music_safe("TITLE") 
+        # 計測モード (--alloc-profile)
+        self.alloc_profiler = perfkit.AllocProfiler.from_argv() if perfkit else None
+        # GC ペーシング (--no-gc-pacing で無効)
+        self.gc_pacer = perfkit.GCPacer.from_argv(GC_ACTIVE_STATES) if perfkit else None
+        # ヒッチ記録 (--hitch-log)
+        self.hitch = perfkit.HitchRecorder.from_argv() if perfkit else None
+        # プール使用状況の表示 (--pool-stats)
+        self.pool_stats = perfkit.flag("--pool-stats") if perfkit else False
+        if self.hitch:
+            self.hitch.attach(self, pyxel)
+
         pyxel.run(self.update, self.draw)
 
     # ===============================================
@@ -509,7 +1248,13 @@ class GameApp:
         march_speed = PLAYER_SPEED * 1.5
 
         # プレイヤーと捕獲したゾンビを行進させる
-        for e in [self.player] + self.captured_zombies:
+        marchers = [self.player] + self.captured_zombies
+        if self.horde_active:
+            # ゾンビ側は配列でまとめて動かす
+            self.horde.march(tx, march_speed)
+            self.horde.write_back(self.zombies)
+            marchers = [self.player]
+        for e in marchers:
             if e.x < tx:
                 speed = march_speed
                 e.x += min(speed, tx - e.x)
@@ -525,6 +1270,15 @@ class GameApp:
     # 🌟 その他のメソッド定義 (変更なし) 🌟
     # ===============================================
     
+    def update_horde(self):
+        """配列版でゾンビ群をまとめて更新し、捕獲された個体の効果音・粒子だけオブジェクト側で出す"""
+        for i in self.horde.update(self.player):
+            self.zombies[i].capture()
+        for z in self.captured_zombies:
+            if z.captured_particles:
+                z.update_particles()
+        self.horde.write_back(self.zombies)
+
     def play_music_safe(self, mode):
         pyxel.stop() 
 
@@ -537,89 +1291,324 @@ class GameApp:
         elif mode == "STOP":
             pass
 
-    def spawn_stage(self):
-        self.stage += 1
+    def next_stage_number(self):
+        stage = self.stage + 1
+        if stage > MAX_STAGE_PLAY + 1 or stage == 0:
+            stage = 1
+        return stage
 
-        if self.stage > MAX_STAGE_PLAY + 1:
-            self.stage = 1
+    def build_stage(self, stage):
+        """ステージの配置を生成するジェネレータ。ゾンビ 1 体ごとに yield し、完成した配置を返す"""
+        obstacles = []
+        spawn_x, spawn_y = WINDOW_W // 4, WINDOW_H // 2
+        player = self.player_pool.acquire(spawn_x, spawn_y, is_main=True)
+        dummy_players = []
 
-        if self.stage == 0:
-            self.stage = 1
-            self.stage_time_limit = self.time_remaining_next_stage
+        if stage == MAX_STAGE_PLAY + 1:
+            sanctuary_pos_x = WINDOW_W - SANCTUARY_W + 8
+            dummy_players = [
+                self.player_pool.acquire(sanctuary_pos_x, WINDOW_H // 2 - 20, is_main=False, color_override=11),
+                self.player_pool.acquire(sanctuary_pos_x + 5, WINDOW_H // 2, is_main=False, color_override=7),
+                self.player_pool.acquire(sanctuary_pos_x, WINDOW_H // 2 + 20, is_main=False, color_override=8)
+            ]
+            zombie_count = FINAL_STAGE_ZOMBIES
+        else:
+            zombie_count = ZOMBIE_COUNT_BASE + (stage - 1) * 2
+        if self.massive_horde:
+            zombie_count *= MASSIVE_HORDE_SCALE
+
+        zombies = []
+        try:
+            for i in range(zombie_count):
+                zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
+                zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
+                sf = random.choice([0.8, 1.0, 1.3])
+                zombies.append(self.zombie_pool.acquire(zx, zy, speed_factor=sf, global_speed_multiplier=self.zombie_speed_multiplier))
+                yield
+        except GeneratorExit:
+            # 生成途中で捨てられた (StagePrefetch.cancel) ので、ここまでに借りた分を返す
+            self.release_layout((obstacles, player, dummy_players, zombies))
+            raise
+
+        return obstacles, player, dummy_players, zombies
+
+    def release_layout(self, layout):
+        """build_stage の配置を使わずに捨てるとき、借りたプレイヤーとゾンビをプールへ返す"""
+        obstacles, player, dummy_players, zombies = layout
+        self.player_pool.release([player] + dummy_players)
+        self.zombie_pool.release(zombies)
 
-        elif self.stage <= MAX_STAGE_PLAY:
+    def prefetch_stage(self, stage):
+        """演出中に次ステージの配置を少しずつ生成する"""
+        self.stage_prefetch.step(stage, lambda: self.build_stage(stage))
+
+    def spawn_stage(self):
+        self.stage = self.next_stage_number()
+
+        if self.stage <= MAX_STAGE_PLAY:
             self.stage_time_limit = self.time_remaining_next_stage
-        elif self.stage == MAX_STAGE_PLAY + 1:
+        else:
             self.stage_time_limit = max(FINAL_STAGE_TIME_LIMIT_MIN, self.time_remaining_next_stage)
 
         self.time_up_zombified = False
         self.time_up_frame = 0
-        self.time_up_warning_played = False 
+        self.time_up_warning_played = False
 
-        if self.stage == MAX_STAGE_PLAY + 1:
-            self.obstacles = []
-            spawn_x, spawn_y = WINDOW_W // 4, WINDOW_H // 2
+        # 前のステージのエンティティはプールに戻す
+        self.player_pool.release(self.players)
+        self.zombie_pool.release(self.zombies)
 
-            self.players = []
-            self.player = Player(spawn_x, spawn_y, is_main=True)
-            self.players.append(self.player)
-
-            sanctuary_pos_x = WINDOW_W - SANCTUARY_W + 8
-            self.dummy_players = [
-                Player(sanctuary_pos_x, WINDOW_H // 2 - 20, is_main=False, color_override=11),
-                Player(sanctuary_pos_x + 5, WINDOW_H // 2, is_main=False, color_override=7),
-                Player(sanctuary_pos_x, WINDOW_H // 2 + 20, is_main=False, color_override=8)
-            ]
-            self.players.extend(self.dummy_players)
-
-            self.zombies = []
-            self.captured_zombies = []
-            zombie_count = FINAL_STAGE_ZOMBIES
+        # 演出中に生成済みの配置があれば、それを差し替えるだけで済む
+        stage = self.stage
+        self.obstacles, self.player, self.dummy_players, self.zombies = \
+            self.stage_prefetch.take(stage, lambda: self.build_stage(stage))
+        self.players = [self.player] + self.dummy_players
+        self.captured_zombies = []
+        self.horde_active = self.horde is not None and len(self.zombies) >= HORDE_MIN_ZOMBIES
+        if self.horde_active:
+            self.horde.load(self.zombies)
+        if self.pool_stats:
+            print("STAGE %d: %s, %s" % (self.stage, self.zombie_pool.summary(), self.player_pool.summary()))
 
-            for i in range(zombie_count):
-                zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
-                zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
-                sf = random.choice([0.8, 1.0, 1.3])
-                self.zombies.append(Zombie(zx, zy, speed_factor=sf, global_speed_multiplier=self.zombie_speed_multiplier))
+        if self.start_time_total == 0.0:
+            self.start_time_total = self.clock.seconds()
 
-            if self.start_time_total == 0.0:
-                self.start_time_total = pyxel.frame_count / 60.0
+        if self.gc_pacer:
+            self.gc_pacer.stage_built()
 
-            self.stage_start_frame = pyxel.frame_count
-            self.state = "PLAYING"
-            self.marching = False
-            self.fade.to(0.0, speed=0.08)
-            self.play_music_safe("PLAYING")
-            return
+        self.stage_start_frame = self.clock.ticks
+        self.state = "PLAYING"
+        self.marching = False
+        # やり直しは新しいステージの最初のステップの後から
+        self.stage_snapshot = None
+        self.rewind.clear()
+        self.fade.to(0.0, speed=0.08)
+        self.play_music_safe("PLAYING")
 
-        self.obstacles = []
-        spawn_x, spawn_y = WINDOW_W // 4, WINDOW_H // 2
-        self.players = []
-        self.player = Player(spawn_x, spawn_y, is_main=True)
-        self.players.append(self.player)
+    def start_endless(self):
+        """エンドレスモードを始める。ゾンビは 0 体から、update_endless で左端から湧かせる"""
+        self.stage_prefetch.cancel()  # チュートリアル中に先行生成したステージ 1 は使わない
+        self.player_pool.release(self.players)
+        self.zombie_pool.release(self.zombies)
+        self.player = self.player_pool.acquire(WINDOW_W // 4, WINDOW_H // 2, is_main=True)
+        self.players = [self.player]
         self.dummy_players = []
-
         self.zombies = []
         self.captured_zombies = []
-        zombie_count = ZOMBIE_COUNT_BASE + (self.stage - 1) * 2
+        self.horde_active = False  # 数が毎ステップ変わるので 1 体ずつ更新する
 
-        for i in range(zombie_count):
-            zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
-            zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
+        self.banked = 0
+        self.stage_time_limit = ENDLESS_TIME_LIMIT
+        self.stage_start_frame = self.clock.ticks
+        self.next_spawn_tick = self.clock.ticks
+        self.time_up_zombified = False
+        self.time_up_frame = 0
+        self.time_up_warning_played = False
+        if self.gc_pacer:
+            self.gc_pacer.stage_built()
+
+        self.state = "ENDLESS"
+        self.fade.to(0.0, speed=0.08)
+        self.play_music_safe("PLAYING")
+
+    def update_endless(self):
+        """エンドレスモードの 1 ステップ (湧く・捕獲・預ける・時間切れ)"""
+        elapsed = self.clock.seconds(self.stage_start_frame)
+        time_left = max(0.0, self.stage_time_limit - elapsed)
+
+        if not self.time_up_zombified and self.clock.ticks >= self.next_spawn_tick \
+                and len(self.zombies) < ENDLESS_MAX_ZOMBIES:
+            zy = random.randint(UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
             sf = random.choice([0.8, 1.0, 1.3])
-            self.zombies.append(Zombie(zx, zy, speed_factor=sf, global_speed_multiplier=self.zombie_speed_multiplier))
+            z = self.zombie_pool.acquire(ZOMBIE_R, zy, speed_factor=sf,
+                                         global_speed_multiplier=self.zombie_speed_multiplier)
+            z.vx = abs(z.vx)  # 画面の中へ歩いてくる
+            self.zombies.append(z)
+            interval = ENDLESS_SPAWN_INTERVAL / (1.0 + elapsed / ENDLESS_RAMP_SECONDS)
+            self.next_spawn_tick = self.clock.ticks + max(ENDLESS_MIN_SPAWN_INTERVAL, int(interval))
 
-        if self.start_time_total == 0.0:
-            self.start_time_total = pyxel.frame_count / 60.0
+        for z in self.zombies:
+            if z.state == "captured" and z not in self.captured_zombies:
+                self.captured_zombies.append(z)
+                self.shake.start(frames=4, intensity=1)
 
-        self.stage_start_frame = pyxel.frame_count
-        self.state = "PLAYING"
-        self.marching = False
+        # 聖域に入った列のゾンビは預けてプールへ戻す
+        sanctuary_x = WINDOW_W - SANCTUARY_W
+        banked = [z for z in self.captured_zombies if z.x >= sanctuary_x]
+        if banked and not self.time_up_zombified:
+            self.captured_zombies = [z for z in self.captured_zombies if z.x < sanctuary_x]
+            self.zombies = [z for z in self.zombies if z.state != "captured" or z.x < sanctuary_x]
+            self.zombie_pool.release(banked)
+            self.banked += len(banked)
+            self.stage_time_limit += ENDLESS_BANK_BONUS * len(banked)
+            pyxel.play(3, 9)
+
+        if time_left < 10.0 and not self.time_up_warning_played and time_left > 0:
+            pyxel.play(3, 7, loop=True)
+            self.time_up_warning_played = True
+        elif time_left >= 10.0 and self.time_up_warning_played:
+            # 預けて持ち時間が戻ったら警告音を止める
+            self.time_up_warning_played = False
+            self.play_music_safe("PLAYING")
+
+        if time_left <= 0.0 and not self.time_up_zombified:
+            self.time_up_zombified = True
+            self.player.is_zombified = True
+            self.time_up_frame = self.clock.ticks
+            pyxel.stop()
+            pyxel.play(3, 10)
+
+        if self.time_up_zombified and self.clock.ticks - self.time_up_frame > GAMEOVER_HOLD_TIME * 2:
+            self.fade.to(1.0, speed=0.06)
+            self.next_state_called = True
+
+        if self.next_state_called and self.fade.alpha >= 0.99:
+            self.next_state_called = False
+            self.stage = -1
+            self.state = "TITLE"
+            self.fade.to(0.0, speed=0.06)
+            self.play_music_safe("TITLE")
+
+    def start_versus(self):
+        """2 人対戦を始める。2P の入力はループバックの向こう側の端点から送り、
+        ネット越しと同じく予測とロールバックで受け取る (--versus-latency N で N フレーム遅らせる)"""
+        args = sys.argv[1:]
+        latency = int(args[args.index("--versus-latency") + 1]) if "--versus-latency" in args else VERSUS_LATENCY
+        local, remote = netplay.LoopbackTransport.pair(latency)
+        self.versus = netplay.Rollback(VersusMatch(random.randrange(1 << 30)), 0, local)
+        self.versus_link = remote
+        self.quality.locked = True
+        self.state = "VERSUS"
         self.fade.to(0.0, speed=0.08)
         self.play_music_safe("PLAYING")
 
+    def step_versus(self):
+        """対戦モードの 1 ステップ"""
+        self.fade.update()
+        self.shake.update()
+        self.enter_latched = False
+
+        session = self.versus
+        self.versus_link.send(session.frame + session.delay, 1, read_pad(PAD2_BUTTONS))
+        self.versus_link.poll()  # 向こう側に届いた 1P の入力は使わない
+        session.advance(read_pad(PAD1_BUTTONS))
+
+        match = session.match
+        if match.end_ticks >= 0 and match.ticks - match.end_ticks > VERSUS_RESULT_HOLD \
+                and not self.next_state_called:
+            self.fade.to(1.0, speed=0.06)
+            self.next_state_called = True
+        if self.next_state_called and self.fade.alpha >= 0.99:
+            self.next_state_called = False
+            self.versus = self.versus_link = None
+            self.quality.locked = False
+            self.state = "TITLE"
+            self.fade.to(0.0, speed=0.06)
+            self.play_music_safe("TITLE")
+
+    def save_state(self):
+        """ワールドの状態 (エンティティ・軌跡・捕獲の順番・タイマー・乱数) を平らなバイト列にする。
+        load_state() で戻すと、そのステップの直後から 1 ビットも違わずに続きを進められる。
+        先頭は小数の並びの長さで、配列版のゾンビ群を使うステージではその後ろに horde の状態が続く"""
+        out = [0.0, SNAPSHOT_GAME_STATES.index(self.state), self.clock.ticks]
+        out += [getattr(self, name) for name in SNAPSHOT_INTS]
+        out += [getattr(self, name) for name in SNAPSHOT_FLOATS]
+        out += [getattr(self, name) for name in SNAPSHOT_FLAGS]
+        out += (self.fade.alpha, self.fade.target, self.fade.speed, self.fade.active,
+                self.shake.timer, self.shake.intensity)
+
+        out.append(len(self.players))
+        for p in self.players:
+            p.pack(out)
+        out.append(len(self.zombies))
+        for z in self.zombies:
+            z.pack(out)
+        index = {id(z): i for i, z in enumerate(self.zombies)}
+        out.append(len(self.captured_zombies))
+        out += [index[id(z)] for z in self.captured_zombies]
+
+        pack_random(out, random.getstate())
+
+        out[0] = len(out)
+        data = array("d", out).tobytes()
+        if self.horde_active:
+            data += self.horde.pack()
+        return data
+
+    def load_state(self, data):
+        """save_state() のバイト列からワールドの状態を戻す。エンティティの数が違えばプールで合わせる"""
+        values = array("d")
+        values.frombytes(data[:8])
+        values.frombytes(data[8:int(values[0]) * 8])
+        reader = SnapshotReader(values.tolist())
+        reader.next()
+        self.state = SNAPSHOT_GAME_STATES[int(reader.next())]
+        self.clock.ticks = int(reader.next())
+        for name in SNAPSHOT_INTS:
+            setattr(self, name, int(reader.next()))
+        for name in SNAPSHOT_FLOATS:
+            setattr(self, name, reader.next())
+        for name in SNAPSHOT_FLAGS:
+            setattr(self, name, bool(reader.next()))
+        self.fade.alpha, self.fade.target, self.fade.speed = reader.take(3)
+        self.fade.active = bool(reader.next())
+        self.shake.timer = int(reader.next())
+        self.shake.intensity = int(reader.next())
+
+        self.player_pool.fit(self.players, int(reader.next()))
+        for p in self.players:
+            p.unpack(reader)
+        self.player = self.players[0] if self.players else None
+        self.dummy_players = self.players[1:]
+        self.zombie_pool.fit(self.zombies, int(reader.next()))
+        for z in self.zombies:
+            z.unpack(reader)
+        self.captured_zombies = [self.zombies[int(i)] for i in reader.take(int(reader.next()))]
+
+        random.setstate(unpack_random(reader))
+
+        if self.horde_active:
+            self.horde.unpack(data[len(values) * 8:])
+        # 作りかけの次ステージは、戻した乱数で作り直す
+        self.stage_prefetch.cancel()
+
+    def update_practice(self):
+        """練習モードの巻き戻し・やり直し。このフレームはシミュレーションを進めないときに True を返す"""
+        if self.state not in ("PLAYING", "GO_TO_SANCT") or self.stage_snapshot is None:
+            return False
+        was_zombified = self.time_up_zombified
+        if pyxel.btnp(pyxel.KEY_R) or \
+                (self.time_up_zombified and self.clock.ticks - self.time_up_frame > GAMEOVER_HOLD_TIME):
+            self.load_state(self.stage_snapshot)
+            self.rewind.clear()
+            self.clock.steps()  # やり直している間の時間は追いかけない
+        elif pyxel.btn(pyxel.KEY_BACKSPACE) or pyxel.btn(GAMEPAD_Y_ID):
+            # 巻き戻しも固定ステップの時計で進める。load_state で clock.ticks は戻るので、経過はここで数える
+            self.rewind_steps += self.clock.steps()
+            data = None
+            while self.rewind_steps >= REWIND_INTERVAL:
+                self.rewind_steps -= REWIND_INTERVAL
+                data = self.rewind.pop() or data
+            if data is not None:
+                self.load_state(data)
+        else:
+            self.rewind_steps = 0
+            return False
+        if was_zombified and not self.time_up_zombified:
+            self.play_music_safe("PLAYING")
+        return True
+
+    def record_practice(self):
+        """練習モードで、ステップごとにスナップショットを取る"""
+        if self.state not in ("PLAYING", "GO_TO_SANCT"):
+            return
+        if self.stage_snapshot is None:
+            self.stage_snapshot = self.save_state()
+        if self.clock.ticks % REWIND_INTERVAL == 0:
+            self.rewind.push(self.save_state())
+
     def start_ending(self):
-        self.total_clear_time = (pyxel.frame_count / 60.0) - self.start_time_total
+        self.total_clear_time = self.clock.seconds() - self.start_time_total
         self.last_stage_remaining_time = self.time_remaining_next_stage
         self.time_remaining_next_stage += BONUS_TIME_AFTER_CLEAR
         self.state = "ENDING"
@@ -629,19 +1618,55 @@ class GameApp:
 
 
     def update(self):
+        self.frame_start = time.perf_counter()
+        if self.alloc_profiler:
+            self.alloc_profiler.begin_frame(self.state)
+        if self.gc_pacer:
+            self.gc_pacer.frame(self.state)
+
+        # btnp は描画フレーム単位なので、このフレームのステップ数 (0 回・複数回) に関係なく
+        # 1 回だけ効くようにためておく
+        self.enter_latched = self.enter_latched or \
+                             pyxel.btnp(pyxel.KEY_RETURN) or \
+                             pyxel.btnp(GAMEPAD_A_ID) or \
+                             pyxel.btnp(GAMEPAD_START_ID)
+
+        if self.state == "VERSUS":
+            for _ in range(self.clock.steps()):
+                self.step_versus()
+                self.clock.ticks += 1
+            return
+
+        if self.practice and self.update_practice():
+            return
+
+        # シミュレーションは固定 dt で進める。落ちたフレームの分はまとめて追いつく
+        for _ in range(self.clock.steps()):
+            self.step()
+            self.clock.ticks += 1
+            if self.practice:
+                self.record_practice()
+
+    def step(self):
+        """シミュレーションを 1 ステップ (1/SIM_RATE 秒) 進める"""
+        self.clock.remember(self.players, self.zombies)
+
         self.fade.update()
         self.shake.update()
 
         for p in self.players:
-            can_control = self.state == "PLAYING" and not self.time_up_zombified
-            p.update(self.obstacles, controllable=can_control)
+            can_control = self.state in ("PLAYING", "ENDLESS") and not self.time_up_zombified
+            p.update(self.obstacles, controllable=can_control, tick=self.clock.ticks)
 
-        for z in self.zombies:
-            z.update(self.player, self.obstacles, self.captured_zombies)
+        if self.horde_active:
+            self.update_horde()
+        else:
+            self.neighbors.rebuild(self.zombies)
+            for z in self.zombies:
+                z.update(self.player, self.obstacles, self.captured_zombies, self.neighbors)
 
-        is_enter_pressed = pyxel.btnp(pyxel.KEY_RETURN) or \
-                             pyxel.btnp(GAMEPAD_A_ID) or \
-                             pyxel.btnp(GAMEPAD_START_ID)
+        is_enter_pressed = self.enter_latched
+        self.enter_latched = False
 
         if self.state == "TITLE":
             if is_enter_pressed:
@@ -651,10 +1676,15 @@ class GameApp:
 
             if self.next_state_called and not self.fade.active and self.fade.alpha >= 0.99:
                 self.next_state_called = False
-                self.state = "TUTORIAL"
-                self.fade.to(0.0, speed=0.06)
+                if self.versus_mode:
+                    self.start_versus()
+                else:
+                    self.state = "TUTORIAL"
+                    self.fade.to(0.0, speed=0.06)
 
         elif self.state == "TUTORIAL":
+            self.prefetch_stage(1)
+
             if is_enter_pressed:
                 pyxel.play(3, 11)
                 self.fade.to(1.0, speed=0.06)
@@ -662,10 +1692,13 @@ class GameApp:
 
             if self.next_state_called and not self.fade.active and self.fade.alpha >= 0.99:
                 self.next_state_called = False
-                self.stage = 0
-                self.time_remaining_next_stage = BASE_TIME_LIMIT
-                self.start_time_total = 0.0
-                self.spawn_stage()
+                if self.endless:
+                    self.start_endless()
+                else:
+                    self.stage = 0
+                    self.time_remaining_next_stage = BASE_TIME_LIMIT
+                    self.start_time_total = 0.0
+                    self.spawn_stage()
 
         elif self.state == "PLAYING":
             newly_captured = [z for z in self.zombies if z.state == "captured" and z not in self.captured_zombies]
@@ -673,7 +1706,7 @@ class GameApp:
                 self.captured_zombies.append(z)
                 self.shake.start(frames=4, intensity=1)
 
-            elapsed = (pyxel.frame_count - self.stage_start_frame) / 60.0
+            elapsed = self.clock.seconds(self.stage_start_frame)
             time_left = max(0.0, self.stage_time_limit - elapsed)
             
             if time_left < 10.0 and not self.time_up_warning_played and time_left > 0:
@@ -683,14 +1716,14 @@ class GameApp:
             if time_left <= 0.0 and not self.time_up_zombified:
                 self.time_up_zombified = True
                 self.player.is_zombified = True
-                self.time_up_frame = pyxel.frame_count
+                self.time_up_frame = self.clock.ticks
                 
                 pyxel.stop()
                 pyxel.play(3, 10)
                 self.play_music_safe("STOP") 
 
             if self.time_up_zombified:
-                if pyxel.frame_count - self.time_up_frame > GAMEOVER_HOLD_TIME:
+                if self.clock.ticks - self.time_up_frame > GAMEOVER_HOLD_TIME:
                     self.fade.to(1.0, speed=0.06)
                     self.next_state_called = True
 
@@ -710,9 +1743,15 @@ class GameApp:
                 self.play_music_safe("STOP")
                 pyxel.play(3, 9)
 
+        elif self.state == "ENDLESS":
+            self.update_endless()
+
         elif self.state == "GO_TO_SANCT":
             self.update_march() # <-- 修正したメソッドを呼び出し
 
+            if self.stage != MAX_STAGE_PLAY + 1:
+                self.prefetch_stage(self.next_stage_number())
+
             sanctuary_x_min = WINDOW_W - SANCTUARY_W
             all_in_sanctuary = all(p.x >= sanctuary_x_min for p in self.players if p.is_main) and \
                                all(z.x >= sanctuary_x_min for z in self.captured_zombies)
@@ -737,7 +1776,7 @@ class GameApp:
             self.ending_timer += 1
 
             for p in self.dummy_players:
-                p.update(self.obstacles, controllable=False)
+                p.update(self.obstacles, controllable=False, tick=self.clock.ticks)
 
             if self.ending_timer < TRANSFORM_DURATION:
                 if self.ending_timer % 30 == 0:
@@ -770,6 +1809,7 @@ class GameApp:
             if self.ending_timer > TRANSFORM_DURATION + 90:
                 self.state = "CREDITS_ROLL"
                 self.credits_y = WINDOW_H
+                self.credits_texture.render()
                 self.fade.to(0.0, speed=0.015)
 
         elif self.state == "CREDITS_ROLL":
@@ -783,7 +1823,7 @@ class GameApp:
 
             if self.fade.alpha >= 0.99:
                 self.stage = 0
-                self.start_time_total = pyxel.frame_count / 60.0
+                self.start_time_total = self.clock.seconds()
                 self.state = "TITLE"
                 self.fade.to(0.0, speed=0.06)
                 self.play_music_safe("TITLE")
@@ -791,6 +1831,11 @@ class GameApp:
     # DRAW (変更なし)
     def draw(self):
         ox, oy = self.shake.get_offset()
+        # ステップとステップの間の位置で描く
+        if self.state == "VERSUS":
+            self.clock.lerp(self.versus.match.players, self.versus.match.zombies)
+        else:
+            self.clock.lerp(self.players, self.zombies)
 
         pyxel.cls(1)
 
@@ -798,7 +1843,7 @@ class GameApp:
             self.draw_title()
         elif self.state == "TUTORIAL":
             self.draw_tutorial()
-        elif self.state in ("PLAYING", "GO_TO_SANCT"):
+        elif self.state in ("PLAYING", "GO_TO_SANCT", "VERSUS", "ENDLESS"):
             pyxel.clip(0, UI_HEIGHT, WINDOW_W, WINDOW_H - UI_HEIGHT)
             pyxel.camera(ox, oy)
 
@@ -806,11 +1851,16 @@ class GameApp:
 
             pyxel.camera(0, 0)
             pyxel.clip()
-            self.draw_ui()
+            if self.state == "VERSUS":
+                self.draw_versus_ui()
+            elif self.state == "ENDLESS":
+                self.draw_endless_ui()
+            else:
+                self.draw_ui()
 
             if self.time_up_zombified:
                 s1 = "TIME UP!"
-                s2 = "GAME OVER"
+                s2 = f"BANKED: {self.banked}" if self.state == "ENDLESS" else "GAME OVER"
                 pyxel.text(center_text_x(s1), WINDOW_H // 2 - 8, s1, 8)
                 pyxel.text(center_text_x(s2), WINDOW_H // 2 + 8, s2, 7)
 
@@ -825,6 +1875,14 @@ class GameApp:
 
         self.fade.draw()
 
+        self.clock.restore()
+        if self.frame_start is not None:
+            self.quality.record(time.perf_counter() - self.frame_start)
+            self.frame_start = None
+
+        if self.alloc_profiler:
+            self.alloc_profiler.end_frame()
+
     def draw_title_logo(self, cx, cy):
         text1 = "DEMOCRACY"
         text2 = "OF THE DEAD"
@@ -851,7 +1909,10 @@ class GameApp:
         pyxel.rect(sanctuary_x, 0, SANCTUARY_W, WINDOW_H, 10)
         pyxel.rectb(sanctuary_x, 0, SANCTUARY_W, WINDOW_H, 12)
 
-        entities = list(self.players) + list(self.zombies)
+        if self.state == "VERSUS":
+            entities = list(self.versus.match.players) + list(self.versus.match.zombies)
+        else:
+            entities = list(self.players) + list(self.zombies)
         entities.sort(key=lambda e: e.y)
         for e in entities:
             e.draw()
@@ -861,102 +1922,145 @@ class GameApp:
             pyxel.text(center_text_x(s), WINDOW_H - 14, s, 2)
 
     def draw_ui(self):
-        pyxel.rect(0, 0, WINDOW_W, UI_HEIGHT, 0)
+        elapsed = self.clock.seconds(self.stage_start_frame)
+        time_left = max(0.0, self.stage_time_limit - elapsed)
+        color = 8 if time_left < 10 or self.time_up_zombified else 7
 
-        stage_text = f"Stage: {self.stage}/{MAX_STAGE_PLAY}"
-        if self.stage == MAX_STAGE_PLAY + 1:
-            stage_text = "Stage: FINAL"
+        # 表示する値 (残り時間は 0.1 秒単位) が変わったときだけ書き直す
+        key = (self.stage, len(self.captured_zombies), len(self.zombies), round(time_left, 1), color)
+        self.hud_layer.draw(0, 0, key, self.render_ui)
 
-        pyxel.text(4, 4, stage_text, 7)
+    def render_ui(self, img, ox, oy, key):
+        stage, captured_count, zombie_count, time_left, color = key
 
-        captured_count = len(self.captured_zombies)
-        pyxel.text(4, 12, f"Captured: {captured_count}/{len(self.zombies)}", 7)
+        stage_text = f"Stage: {stage}/{MAX_STAGE_PLAY}"
+        if stage == MAX_STAGE_PLAY + 1:
+            stage_text = "Stage: FINAL"
 
-        elapsed = (pyxel.frame_count - self.stage_start_frame) / 60.0
-        time_left = max(0.0, self.stage_time_limit - elapsed)
+        img.text(ox + 4, oy + 4, stage_text, 7)
+
+        img.text(ox + 4, oy + 12, f"Captured: {captured_count}/{zombie_count}", 7)
 
         time_text = f"Time: {time_left:.1f}s"
         t_x = WINDOW_W - len(time_text) * 4 - 4
 
+        img.text(ox + t_x, oy + 8, time_text, color)
+
+
+    def draw_endless_ui(self):
+        time_left = max(0.0, self.stage_time_limit - self.clock.seconds(self.stage_start_frame))
         color = 8 if time_left < 10 or self.time_up_zombified else 7
+        key = ("ENDLESS", self.banked, len(self.captured_zombies), round(time_left, 1), color)
+        self.hud_layer.draw(0, 0, key, self.render_endless_ui)
+
+    def render_endless_ui(self, img, ox, oy, key):
+        _, banked, captured_count, time_left, color = key
+        img.text(ox + 4, oy + 4, f"Banked: {banked}", 7)
+        img.text(ox + 4, oy + 12, f"Captured: {captured_count}", 7)
+
+        time_text = f"Time: {time_left:.1f}s"
+        img.text(ox + WINDOW_W - len(time_text) * 4 - 4, oy + 8, time_text, color)
+
+    def draw_versus_ui(self):
+        match = self.versus.match
+        winner = match.winner()
+        key = ("VERSUS", len(match.captured[0]), len(match.captured[1]), round(match.time_left(), 1))
+        self.hud_layer.draw(0, 0, key, self.render_versus_ui)
 
-        pyxel.text(t_x, 8, time_text, color)
+        if winner is not None:
+            s = "DRAW" if winner < 0 else "P%d WINS!" % (winner + 1)
+            pyxel.text(center_text_x(s), WINDOW_H // 2 - 4, s, match.players[winner].color if winner >= 0 else 7)
 
+    def render_versus_ui(self, img, ox, oy, key):
+        _, p1, p2, time_left = key
+        img.text(ox + 4, oy + 4, f"P1: {p1}", 11)
+        img.text(ox + 4, oy + 12, f"P2: {p2}", 8)
+
+        time_text = f"Time: {time_left:.1f}s"
+        img.text(ox + WINDOW_W - len(time_text) * 4 - 4, oy + 8, time_text, 8 if time_left < 10 else 7)
 
     def draw_title(self):
         pyxel.cls(0)
 
         self.draw_title_logo(WINDOW_W // 2, 22)
 
+        for i, (px, py, spd) in enumerate(self.title_particles):
+            ny = (py + (pyxel.frame_count % 40) * spd) % 30
+            pyxel.pset(px, ny + 10, 8 if (pyxel.frame_count + i) % 15 < 7 else 4)
+
+        # 文字は点滅が切り替わるときだけ書き直し、ロゴの上に重ねる (黒は透明)
+        self.screen_layer.draw(0, 0, ("TITLE", pyxel.frame_count % 30 < 15), self.render_title_text, 0)
+
+    def render_title_text(self, img, ox, oy, key):
+        _, blink = key
+
         begin_text = "- PRESS ENTER / GAMEPAD A/START TO BEGIN -"
         text_x = center_text_x(begin_text)
         text_y = 80
 
-        if pyxel.frame_count % 30 < 15:
-            pyxel.text(text_x, text_y, begin_text, 7)
-
-        for i, (px, py, spd) in enumerate(self.title_particles):
-            ny = (py + (pyxel.frame_count % 40) * spd) % 30
-            pyxel.pset(px, ny + 10, 8 if (pyxel.frame_count + i) % 15 < 7 else 4)
+        if blink:
+            img.text(ox + text_x, oy + text_y, begin_text, 7)
 
         diff_text = f"Initial Time: {BASE_TIME_LIMIT:.1f}s"
-        pyxel.text(center_text_x(diff_text), 92, diff_text, 7)
+        img.text(ox + center_text_x(diff_text), oy + 92, diff_text, 7)
 
         credit_y1 = 104
         credit_y2 = 112
         credit_text1 = "(C) Y.Kusanagi"
         credit_text2 = "Game Assembly by (C) M.Takahashi"
 
-        pyxel.text(center_text_x(credit_text1), credit_y1, credit_text1, 13)
-        pyxel.text(center_text_x(credit_text2), credit_y2, credit_text2, 13)
+        img.text(ox + center_text_x(credit_text1), oy + credit_y1, credit_text1, 13)
+        img.text(ox + center_text_x(credit_text2), oy + credit_y2, credit_text2, 13)
 
     def draw_tutorial(self):
-        pyxel.cls(0)
-        cx = WINDOW_W // 2
+        self.screen_layer.draw(0, 0, ("TUTORIAL", pyxel.frame_count % 30 < 15), self.render_tutorial_text)
+
+    def render_tutorial_text(self, img, ox, oy, key):
+        _, blink = key
 
         begin_text = "- PRESS RETURN / GAMEPAD A/START TO BEGIN -"
         text_x = center_text_x(begin_text)
         text_y = 4
 
-        if pyxel.frame_count % 30 < 15:
-            pyxel.text(text_x, text_y, begin_text, 8)
+        if blink:
+            img.text(ox + text_x, oy + text_y, begin_text, 8)
 
         t_title = "TUTORIAL"
-        pyxel.text(center_text_x(t_title), 16, t_title, 8)
+        img.text(ox + center_text_x(t_title), oy + 16, t_title, 8)
 
         t_line_start = center_text_x(t_title)
         t_line_end = t_line_start + len(t_title) * 4 - 1
-        pyxel.line(t_line_start, 24, t_line_end, 24, 7)
+        img.line(ox + t_line_start, oy + 24, ox + t_line_end, oy + 24, 7)
 
         y = 34
         t1_1 = "1. MOVE:"
         t1_2 = "Use ARROW keys / GAMEPAD DPAD."
-        pyxel.text(center_text_x(t1_2), y, t1_1, 7)
-        pyxel.text(center_text_x(t1_2), y + 6, t1_2, 7)
+        img.text(ox + center_text_x(t1_2), oy + y, t1_1, 7)
+        img.text(ox + center_text_x(t1_2), oy + y + 6, t1_2, 7)
 
         y = 50
         t2_1 = "2. CAPTURE:"
         t2_2 = "Touch ZOMBIES to capture them."
         t2_3 = "Captured ZOMBIES follow you."
-        pyxel.text(center_text_x(t2_2), y, t2_1, 7)
-        pyxel.text(center_text_x(t2_2), y + 6, t2_2, 7)
-        pyxel.text(center_text_x(t2_3), y + 12, t2_3, 7)
+        img.text(ox + center_text_x(t2_2), oy + y, t2_1, 7)
+        img.text(ox + center_text_x(t2_2), oy + y + 6, t2_2, 7)
+        img.text(ox + center_text_x(t2_3), oy + y + 12, t2_3, 7)
 
         y = 74
         t3_1 = "3. CLEAR:"
         t3_2 = "Capture ALL ZOMBIES and enter the"
         t3_3 = "SANCTUARY (right side) to clear."
-        pyxel.text(center_text_x(t3_2), y, t3_1, 7)
-        pyxel.text(center_text_x(t3_2), y + 6, t3_2, 7)
-        pyxel.text(center_text_x(t3_3), y + 12, t3_3, 7)
+        img.text(ox + center_text_x(t3_2), oy + y, t3_1, 7)
+        img.text(ox + center_text_x(t3_2), oy + y + 6, t3_2, 7)
+        img.text(ox + center_text_x(t3_3), oy + y + 12, t3_3, 7)
 
         y = 98
         t4_1 = "4. TIME LIMIT:"
         t4_2 = "Remaining time carries over."
         t4_3 = "Time up means GAME OVER."
-        pyxel.text(center_text_x(t4_2), y, t4_1, 8)
-        pyxel.text(center_text_x(t4_2), y + 6, t4_2, 8)
-        pyxel.text(center_text_x(t4_3), y + 12, t4_3, 8)
+        img.text(ox + center_text_x(t4_2), oy + y, t4_1, 8)
+        img.text(ox + center_text_x(t4_2), oy + y + 6, t4_2, 8)
+        img.text(ox + center_text_x(t4_3), oy + y + 12, t4_3, 8)
 
 
     def draw_ending_scene(self):
@@ -966,7 +2070,7 @@ class GameApp:
         pyxel.rect(WINDOW_W - SANCTUARY_W + ox, 0 + oy, SANCTUARY_W, WINDOW_H, 10)
 
         if self.ending_timer < TRANSFORM_DURATION and self.ending_timer % 3 == 0:
-            pyxel.rect(WINDOW_W - SANCTUARY_W + ox, 0 + oy, SANCTUARY_W, WINDOW_H, random.choice([8, 0, 3]))
+            pyxel.rect(WINDOW_W - SANCTUARY_W + ox, 0 + oy, SANCTUARY_W, WINDOW_H, fx_random.choice([8, 0, 3]))
 
         for p in self.players:
             pyxel.camera(ox, oy)
@@ -1005,10 +2109,7 @@ class GameApp:
             pyxel.text(t1_val_x, y, t1_val, 7)
 
     def draw_credits_roll(self):
-        y = self.credits_y
-        for height, text, color in CREDITS_CONTENT:
-            pyxel.text(center_text_x(text), y, text, color)
-            y += height
+        self.credits_texture.draw(self.credits_y)
         
         if self.show_final_score:
             s_y_start = WINDOW_H // 2 - 20
@@ -1022,4 +2123,5 @@ class GameApp:
 # ------------------------------------------------------------
 # アプリケーション起動
 # ------------------------------------------------------------
-GameApp()
\ No newline at end of file
+if __name__ == "__main__":
+    GameApp()
\ No newline at end of file
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+エンティティのベンチマーク (Pyxel 版 / Tkinter 版 共通)
+
+使い方:
+    python bench.py                      # 5 本すべて
+    python bench.py zonbigamekai01.py    # 指定したスクリプトだけ
+    python bench.py --count 800 --frames 60
+    python bench.py --kernels            # horde.py / swarm.py の NumPy 版と kernels.py (Numba) 版の速さの比較
+
+各スクリプトを (ウィンドウを開かずに) モジュールとして読み込み、
+    - Zombie / Player 1 体あたりのメモリ (tracemalloc で計測。粒子リストなども含む)
+    - Zombie.update 1 回あたりの時間 (count 体 x frames フレームを数回測って最小値)
+を表示する。変更の前後でこの表を比べる。
+
+--kernels では horde.py (DOD の配列版のゾンビ群) と swarm.py (Tkinter 版の 10 万体の群れ) を、
+test_kernels.py と同じ動かし方で NumPy の配列演算のままと kernels.py のコンパイル版で動かし、
+1 フレームあたりの時間と、最後の状態が一致するかを比べる (numba が必要)。
+"""
+
+import gc
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPTS = [
+    "DODBGMPADVER02.py",
+    "DODkasnseiver.py",
+    "ZOMBIKONTORORAKIYOU4.py",
+    "zonbikanseiban01.py",
+    "zonbigamekai01.py",
+]
+
+
+def load(script):
+    """ゲームスクリプトを __main__ 以外の名前で読み込む (GameApp / Game は起動しない)"""
+    path = os.path.join(HERE, script)
+    name = "bench_" + os.path.splitext(script)[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bytes_per_instance(make, count):
+    """make() を count 回呼んだときの 1 体あたりの確保量"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [make(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # objs 自体のリスト分を差し引く
+    return (after - before - sys.getsizeof(objs)) / count
+
+
+def is_tk(module):
+    return hasattr(module, "Agent")
+
+
+def make_entities(module, count):
+    """ゾンビの群れと、その目標 (プレイヤー) を返す。プレイヤーは捕獲されない距離に置く"""
+    if is_tk(module):
+        zombies = [module.Zombie(100 + i % 40 * 5, 40 + i // 40 * 10, "walker") for i in range(count)]
+        return zombies, (module.WINDOW_W - 10, module.WINDOW_H - 10)
+    zombies = [module.Zombie(4 + i % 20, module.UI_HEIGHT + 4 + i // 20 % 20) for i in range(count)]
+    player = module.Player(module.WINDOW_W - 30, module.WINDOW_H - 8, is_main=True)
+    return zombies, player
+
+
+def update_time(module, count, frames, repeat=5):
+    """Zombie.update 1 回あたりの秒数 (repeat 回測って最小値)"""
+    best = float("inf")
+    for _ in range(repeat):
+        zombies, target = make_entities(module, count)
+        if is_tk(module):
+            tx, ty = target
+            t0 = time.perf_counter()
+            for _ in range(frames):
+                for z in zombies:
+                    z.update(tx, ty)
+        else:
+            # 障害物の格子がある版 (zonbikanseiban01) はそれを渡す
+            obstacles = module.ObstacleGrid([]) if hasattr(module, "ObstacleGrid") else []
+            captured = []
+            # 群れの近傍マスがある版 (DOD) はゲームと同じく毎フレーム入れ直して渡す
+            neighbors = module.NeighborGrid() if hasattr(module, "NeighborGrid") else None
+            t0 = time.perf_counter()
+            for _ in range(frames):
+                if neighbors is None:
+                    for z in zombies:
+                        z.update(target, obstacles, captured)
+                else:
+                    neighbors.rebuild(zombies)
+                    for z in zombies:
+                        z.update(target, obstacles, captured, neighbors)
+        best = min(best, time.perf_counter() - t0)
+    return best / (count * frames)
+
+
+def horde_time(count, frames, use_kernels, repeat=3):
+    """horde.Horde.update 1 フレームあたりの秒数 (repeat 回測って最小値) と最後の状態 (pack)"""
+    import horde
+    import test_kernels
+    import kernels
+    saved = horde.kernels
+    horde.kernels = kernels if use_kernels else None
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            state = test_kernels.run_horde(count, frames)
+            best = min(best, time.perf_counter() - t0)
+        return best / frames, state
+    finally:
+        horde.kernels = saved
+
+
+def swarm_time(count, frames, use_kernels, repeat=3):
+    """swarm.step_slice 1 フレームあたりの秒数と最後の状態"""
+    import swarm
+    import test_kernels
+    import kernels
+    saved = swarm.kernels
+    swarm.kernels = kernels if use_kernels else None
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            state = test_kernels.run_swarm(count, frames)
+            best = min(best, time.perf_counter() - t0)
+        return best / frames, state
+    finally:
+        swarm.kernels = saved
+
+
+def main_kernels(frames):
+    import kernels
+    if not kernels.ENABLED:
+        print("numba がないので比べられない (horde.py / swarm.py は NumPy の配列演算で動く)")
+        return
+    # コンパイルの時間を測らないよう先に 1 回ずつ動かす
+    horde_time(64, 2, True, repeat=1)
+    swarm_time(64, 2, True, repeat=1)
+    print("%-8s %8s %12s %12s %9s %6s" % ("", "zombies", "numpy us", "numba us", "speedup", "same"))
+    for name, run, counts in (("horde", horde_time, (64, 240, 1000)), ("swarm", swarm_time, (1000, 100000))):
+        for count in counts:
+            t_np, s_np = run(count, frames, False)
+            t_jit, s_jit = run(count, frames, True)
+            print("%-8s %8d %12.1f %12.1f %8.2fx %6s" % (name, count, t_np * 1e6, t_jit * 1e6, t_np / t_jit,
+                                                         "yes" if s_np == s_jit else "NO"))
+
+
+def main():
+    args = sys.argv[1:]
+    count = 800
+    frames = 60
+    if "--count" in args:
+        count = int(args[args.index("--count") + 1])
+    if "--frames" in args:
+        frames = int(args[args.index("--frames") + 1])
+    if "--kernels" in args:
+        main_kernels(frames)
+        return
+    scripts = [a for a in args if a.endswith(".py")] or SCRIPTS
+
+    print("%-26s %12s %12s %16s" % ("script", "zombie B", "player B", "zombie.update us"))
+    for script in scripts:
+        try:
+            module = load(script)
+        except ImportError as e:
+            print("%-26s skipped (%s)" % (script, e))
+            continue
+        zb = bytes_per_instance(lambda i: module.Zombie(i, i), count)
+        pb = bytes_per_instance(lambda i: module.Player(i, i), count)
+        us = update_time(module, count, frames) * 1e6
+        print("%-26s %12.0f %12.0f %16.3f" % (script, zb, pb, us))
+
+
+if __name__ == "__main__":
+    main()
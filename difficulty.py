@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Tkinter 版 (zonbigamekai01.py) の難易度曲線 (画面なし・複数プロセス)
+
+ゾンビの数はステージで足し算 (BASE_ZOMBIES + (stage-1) * ZOMBIE_INCREASE_PER_STAGE)、
+ループで掛け算 (ZOMBIE_LOOP_MULTIPLIER ** loop, 上限 800 体) で増え、速さはループごとに 1 割上がる。
+どこで勝てなくなるか、どこでシミュレーションが重くなるかを見るため、(ステージ, ループ) ごとに
+旗を集めるボットに何十回もプレイさせ、1 つの表にまとめる。
+
+    zombie : そのステージのゾンビ数
+    clear% : 旗を集めきってステージをクリアした (生き残った) 割合。残りは死亡か --max-seconds 切れ
+    damage : 1 プレイあたりに減った HP の平均 (開始時は満タン)
+    secs   : クリアまでにかかったゲーム内の秒数 (中央値)
+    fps    : 1 プロセスあたりのシミュレーション速度 (描画なし・ボットの計算込み, 1 秒あたりのフレーム数)
+
+各プレイはスクリプトの Game.build_stage でステージを作り、Game.update の「playing」の処理
+(移動・衝突・旗) をそのまま回す。ボットはいちばん近い旗へ向かいつつ、近くのゾンビから離れる。
+実際のゲームでは HP がステージをまたいで持ち越されるが、ここでは (ステージ, ループ) ごとに
+満タンから始めて、そのステージ単体の難しさを測る。
+
+使い方:
+    python difficulty.py                          # ループ 1〜4 x ステージ 1〜5 を 20 回ずつ
+    python difficulty.py --seeds 100 --loops 6 --procs 8 --max-seconds 90
+"""
+
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from playtest import build, game
+
+SCRIPT = "zonbigamekai01.py"
+
+AVOID_RANGE = 40.0   # これより近いゾンビから離れる
+AVOID_WEIGHT = 1.0   # 旗へ向かう力 (長さ 1) に対する、ゾンビから離れる力の強さ
+KEY_THRESHOLD = 0.38 # 向きの成分がこれより大きければそのキーを押す (斜め 45 度の前後 22.5 度)
+PATIENCE = 5 * 30    # これだけのフレーム旗を取れなかったら、ゾンビを避けずに突っ込む
+
+
+class TkStage:
+    """Game の代わりに build_stage / update へ渡す入れ物 (「playing」で使う属性だけを持つ)"""
+
+    def __init__(self, g, stage, loop):
+        self.zombie_pool = g.EntityPool(g.Zombie)
+        px, py, flags, zombies = build(g.Game.build_stage(self, stage, loop))
+        self.player = g.Player(px, py)
+        self.flags = flags
+        self.zombies = zombies
+        self.target_flags = g.INITIAL_FLAGS + (stage - 1) * g.FLAG_INCREMENT
+        self.keys = {'left': False, 'right': False, 'up': False, 'down': False}
+        self.state = 'playing'
+        self.score = 0
+        self.clear_bonus = 0
+        self.start_time = time.time()
+        self.frame_count = 0
+        self.bot_flags = 0   # ボットが最後に見た取得済みの旗の数と、そこからのフレーム数
+        self.bot_waited = 0
+
+
+def steer(sim):
+    """いちばん近い旗へ向かい、近くのゾンビから離れるようにキーを押す"""
+    p = sim.player
+    flags = [f for f in sim.flags if not f.collected]
+    if p.collected_flags != sim.bot_flags:
+        sim.bot_flags = p.collected_flags
+        sim.bot_waited = 0
+    sim.bot_waited += 1
+    vx = vy = 0.0
+    if flags:
+        f = min(flags, key=lambda f: (f.x - p.x) ** 2 + (f.y - p.y) ** 2)
+        d = math.hypot(f.x - p.x, f.y - p.y) + 1e-6
+        vx = (f.x - p.x) / d
+        vy = (f.y - p.y) / d
+    # 無敵時間中と、旗の周りを囲まれてしばらく取れないときは、避けずにまっすぐ旗を取りに行く
+    avoid = p.invincible_timer == 0 and sim.bot_waited < PATIENCE
+    for z in (sim.zombies if avoid else ()):
+        dx = p.x - z.x
+        dy = p.y - z.y
+        d = math.hypot(dx, dy) + 1e-6
+        if d < AVOID_RANGE:
+            k = AVOID_WEIGHT * (AVOID_RANGE / d - 1.0) / d
+            vx += dx * k
+            vy += dy * k
+    length = math.hypot(vx, vy) + 1e-6
+    keys = sim.keys
+    keys['left'] = vx < -KEY_THRESHOLD * length
+    keys['right'] = vx > KEY_THRESHOLD * length
+    keys['up'] = vy < -KEY_THRESHOLD * length
+    keys['down'] = vy > KEY_THRESHOLD * length
+
+
+def play_stage(g, stage, loop, max_frames):
+    """1 ステージをボットでプレイする。(クリアしたか, 減った HP, フレーム数) を返す"""
+    sim = TkStage(g, stage, loop)
+    frames = 0
+    while sim.state == 'playing' and frames < max_frames:
+        steer(sim)
+        g.Game.update(sim)
+        frames += 1
+    damage = g.PLAYER_MAX_HP - max(0, sim.player.hp)
+    return sim.state == 'stage_clear', damage, frames
+
+
+def play(task):
+    """(ステージ, ループ) を seeds 回プレイする。ワーカープロセスで動く"""
+    stage, loop, seed, seeds, max_frames = task
+    g = game(SCRIPT)
+    results = []
+    t0 = time.perf_counter()
+    for i in range(seeds):
+        random.seed(seed + i)
+        results.append(play_stage(g, stage, loop, max_frames))
+    return stage, loop, results, time.perf_counter() - t0
+
+
+def zombie_count(g, stage, loop):
+    """build_stage と同じ式"""
+    stage_zombies = g.BASE_ZOMBIES + (stage - 1) * g.ZOMBIE_INCREASE_PER_STAGE
+    return int(min(int(stage_zombies * g.ZOMBIE_LOOP_MULTIPLIER ** loop), 800))
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    seeds = option("--seeds", 20)
+    loops = option("--loops", 4)
+    procs = option("--procs", multiprocessing.cpu_count())
+    seed = option("--seed", 0)
+    g = game(SCRIPT)
+    max_frames = option("--max-seconds", 60) * g.FPS
+
+    tasks = [(stage, loop, seed, seeds, max_frames)
+             for loop in range(loops) for stage in range(1, g.STAGE_COUNT + 1)]
+    table = {}
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(procs) as pool:
+        for stage, loop, results, secs in pool.imap_unordered(play, tasks):
+            table[(loop, stage)] = (results, secs)
+    print("%d seeds x %d cells, %d processes, %.1fs\n" % (seeds, len(tasks), procs, time.perf_counter() - t0))
+
+    print("%-5s %-5s %6s %7s %6s %6s %8s" % ("loop", "stage", "zombie", "clear%", "damage", "secs", "fps"))
+    for (loop, stage), (results, secs) in sorted(table.items()):
+        cleared = [frames for ok, _, frames in results if ok]
+        damage = sum(d for _, d, _ in results) / len(results)
+        frames = sum(f for _, _, f in results)
+        median = sorted(cleared)[len(cleared) // 2] / g.FPS if cleared else float("nan")
+        print("%-5d %-5d %6d %7.1f %6.2f %6.1f %8.0f" % (
+            loop + 1, stage, zombie_count(g, stage, loop), 100.0 * len(cleared) / len(results),
+            damage, median, frames / secs))
+
+
+if __name__ == "__main__":
+    main()
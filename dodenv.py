@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+DEMOCRACY OF THE DEAD の「捕獲 → 聖域へ行進」を、画面なしで N 面同時に進める環境 (NumPy)
+
+自動プレイのエージェントを学習・評価するためのもの。ゲーム本体 (pyxel.run) は使わず、
+N 面ぶんのプレイヤー・ゾンビの状態を (N,) / (N, ゾンビ数) の配列で持ち、全部の面を
+1 ステップ (1/30 秒) ずつ揃えて進める。ゾンビの動き (追跡・徘徊・群れ・聖域の境界・
+捕獲・隊列での追従) と行進は ZOMBIKONTORORAKIYOU4.py と同じ規則。
+
+使い方:
+    import dodenv
+    env = dodenv.VecEnv(256, stage=1)           # time_limit は面ごとの (N,) の配列でもよい
+    obs = env.reset(seed=0)
+    obs, reward, done, info = env.step(actions)   # actions: 0〜8 の整数配列 (長さ N)
+
+    行動 a は (縦 -1/0/+1) * 3 + (横 -1/0/+1) + 4。4 は「動かない」
+    obs  : "player" (N, 2), "zombies" (N, Z, 2), "captured" (N, Z), "time_left" (N,)
+    報酬 : 捕獲 1 体につき CAPTURE_REWARD、全員そろって聖域に着いたら SANCTUARY_REWARD
+    done : 聖域に着いた / 時間切れ。終わった面はその場で次のエピソードに入れ替わる
+
+    python dodenv.py [--envs 1024] [--steps 500] [--stage 1] [--no-flocking]   # 1 秒あたりのステップ数を表示
+
+速さ (env-steps/s, 1 コア, --envs 256〜4096 でほぼ同じ):
+    ステージ 1 (6 体)        約 25〜32 万  (--no-flocking で約 29〜65 万)
+    最終ステージ (30 体)     約 2.6 万     (--no-flocking で約 14 万)
+目標の「毎秒数十万ステップ」は、ゾンビの多い最終ステージでは一桁届いていない。
+律速は _flock の総当たり (ゾンビ数 × ゾンビ数 × N の配列を十数個作る) で、30 体では全体の約 8 割を占める。
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# --- ゲームスクリプト (ZOMBIKONTORORAKIYOU4.py) と同じ値 ---
+WINDOW_W = 160
+WINDOW_H = 120
+UI_HEIGHT = 20
+PLAYER_SPEED = 1.7
+PLAYER_R = 5
+ZOMBIE_R = 4
+SANCTUARY_W = 16
+ZOMBIE_COUNT_BASE = 6
+FINAL_STAGE_ZOMBIES = 30
+MAX_STAGE_PLAY = 5
+FOLLOW_DISTANCE = 12
+TRAIL_MAX_LENGTH = 200
+BASE_TIME_LIMIT = 18.0
+SIM_RATE = 30
+
+FOLLOW_RANGE = 45
+FOLLOW_ACCEL = 0.1
+WANDER_TURN_RATE = 0.02
+WANDER_SPEED = 0.5
+SPEED_FACTORS = (0.8, 1.0, 1.3)
+
+FLOCK_RADIUS = 12
+FLOCK_SEPARATION_RADIUS = 8
+FLOCK_SEPARATION = 0.03
+FLOCK_ALIGNMENT = 0.05
+FLOCK_COHESION = 0.002
+
+# --- 報酬 ---
+CAPTURE_REWARD = 1.0
+SANCTUARY_REWARD = 10.0
+
+# 行動 0〜8 → (横, 縦) の移動量。斜めはゲームと同じく 1/√2 倍
+_D = 1.0 / np.sqrt(2.0)
+ACTIONS = np.array([
+    (-_D, -_D), (0.0, -1.0), (_D, -_D),
+    (-1.0, 0.0), (0.0, 0.0), (1.0, 0.0),
+    (-_D, _D), (0.0, 1.0), (_D, _D),
+]) * PLAYER_SPEED
+
+
+def zombie_count_for(stage):
+    """ステージごとのゾンビ数 (ゲームの build_stage と同じ)"""
+    if stage == MAX_STAGE_PLAY + 1:
+        return FINAL_STAGE_ZOMBIES
+    return ZOMBIE_COUNT_BASE + (stage - 1) * 2
+
+
+class VecEnv:
+    """N 面の DOD を配列で持ち、全面を同時に 1 ステップずつ進める。
+    ゾンビの配列は (ゾンビ数, N) の並び (面が内側) で持つ。ゾンビ数は数体〜30 体と少ないので、
+    面の方向に長く並べた方が NumPy の 1 回の演算で処理できる要素が多く、ずっと速い"""
+
+    def __init__(self, n, stage=1, time_limit=BASE_TIME_LIMIT, zombies=None, flocking=True):
+        self.n = n
+        self.zombie_count = zombies if zombies is not None else zombie_count_for(stage)
+        self.time_limit = time_limit
+        self.flocking = flocking
+
+        self.min_x = ZOMBIE_R
+        self.max_x = WINDOW_W - 1 - ZOMBIE_R
+        self.min_y = UI_HEIGHT + ZOMBIE_R
+        self.max_y = WINDOW_H - 1 - ZOMBIE_R
+        self.wall_x = WINDOW_W - SANCTUARY_W - ZOMBIE_R  # ゾンビが聖域に入れない境界
+        self.sanctuary_x = WINDOW_W - SANCTUARY_W
+        self.march_x = WINDOW_W - SANCTUARY_W + 2        # 行進の目標 X 座標
+
+        z = self.zombie_count
+        self.px = np.zeros(n)
+        self.py = np.zeros(n)
+        self.x = np.zeros((z, n))
+        self.y = np.zeros((z, n))
+        self.vx = np.zeros((z, n))
+        self.vy = np.zeros((z, n))
+        self.speed = np.ones((z, n))
+        self.captured = np.zeros((z, n), dtype=bool)
+        self.rank = np.full((z, n), -1, dtype=np.int32)  # 捕獲された順番
+        self.captured_count = np.zeros(n, dtype=np.int32)
+        self.marching = np.zeros(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int32)          # エピソード開始からのステップ数
+
+        # プレイヤーの軌跡 (軌跡の長さ, N)。全面が同じ歩調で進むので、書き込み位置 (head) は 1 つで足りる
+        self.trail_x = np.zeros((TRAIL_MAX_LENGTH, n))
+        self.trail_y = np.zeros((TRAIL_MAX_LENGTH, n))
+        self.head = 0
+
+        self.columns = np.arange(n)
+        self.rng = np.random.default_rng()
+
+    # --- エピソードの開始 ---
+
+    def reset(self, seed=None):
+        """全面を新しいエピソードにして観測を返す"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._spawn(np.ones(self.n, dtype=bool))
+        return self.observe()
+
+    def _spawn(self, mask):
+        """mask の面にプレイヤーとゾンビを配置し直す (ゲームの build_stage と同じ配置)"""
+        k = int(mask.sum())
+        if k == 0:
+            return
+        z = self.zombie_count
+        rng = self.rng
+        self.px[mask] = WINDOW_W // 4
+        self.py[mask] = WINDOW_H // 2
+        self.x[:, mask] = rng.integers(0, WINDOW_W - SANCTUARY_W - 6, (z, k), endpoint=True)
+        self.y[:, mask] = rng.integers(UI_HEIGHT, WINDOW_H - 1, (z, k), endpoint=True)
+        self.vx[:, mask] = rng.uniform(-0.4, 0.4, (z, k))
+        self.vy[:, mask] = rng.uniform(-0.4, 0.4, (z, k))
+        self.speed[:, mask] = rng.choice(SPEED_FACTORS, (z, k))
+        self.captured[:, mask] = False
+        self.rank[:, mask] = -1
+        self.captured_count[mask] = 0
+        self.marching[mask] = False
+        self.steps[mask] = 0
+        self.trail_x[:, mask] = WINDOW_W // 4
+        self.trail_y[:, mask] = WINDOW_H // 2
+
+    # --- 1 ステップ ---
+
+    def step(self, actions):
+        """全面を 1 ステップ進める。(観測, 報酬, 終了フラグ, 情報) を返す。
+        終了した面は次のエピソードに入れ替わり、観測はその新しい面のもの"""
+        actions = np.asarray(actions)
+        playing = ~self.marching
+
+        # プレイヤー (行進中は操作できない)
+        move = ACTIONS[actions]
+        self.px = np.clip(self.px + np.where(playing, move[:, 0], 0.0), PLAYER_R, WINDOW_W - 1 - PLAYER_R)
+        self.py = np.clip(self.py + np.where(playing, move[:, 1], 0.0), UI_HEIGHT + PLAYER_R, WINDOW_H - 1 - PLAYER_R)
+        self.head = (self.head + 1) % TRAIL_MAX_LENGTH
+        self.trail_x[self.head] = self.px
+        self.trail_y[self.head] = self.py
+
+        # ゾンビ
+        self._follow_trail()
+        caught = self._update_free()
+        captures = caught.sum(axis=0)
+
+        # 全員捕獲した面は行進を始める
+        start = playing & (self.captured_count == self.zombie_count)
+        self.marching |= start
+        arrived = self._march()
+
+        self.steps += 1
+        time_left = self.time_limit - self.steps / SIM_RATE
+        time_up = playing & ~start & (time_left <= 0.0)
+
+        reward = captures * CAPTURE_REWARD + arrived * SANCTUARY_REWARD
+        done = arrived | time_up
+        info = {"captures": captures, "arrived": arrived, "time_up": time_up}
+        self._spawn(done)
+        return self.observe(), reward, done, info
+
+    def _update_free(self):
+        """捕獲されていないゾンビの捕獲判定・追跡・徘徊・群れ・移動。今ステップ捕獲された位置を返す"""
+        free = ~self.captured
+        dx = self.px - self.x
+        dy = self.py - self.y
+        d = np.hypot(dx, dy)
+
+        caught = free & (d < PLAYER_R + ZOMBIE_R)
+        moving = free & ~caught
+        if self.flocking:
+            fx, fy = self._flock(free)
+
+        # 追跡
+        follow = moving & (d < FOLLOW_RANGE)
+        near = follow & (d != 0)
+        inv = np.where(near, 1.0 / np.where(near, d, 1.0), 0.0) * FOLLOW_ACCEL
+        self.vx += dx * inv
+        self.vy += dy * inv
+
+        # 徘徊: 一定の確率で向きを変える
+        turn = moving & ~follow & (self.rng.random(self.x.shape) < WANDER_TURN_RATE)
+        k = int(turn.sum())
+        if k:
+            self.vx[turn] = self.rng.uniform(-WANDER_SPEED, WANDER_SPEED, k)
+            self.vy[turn] = self.rng.uniform(-WANDER_SPEED, WANDER_SPEED, k)
+
+        if self.flocking:
+            self.vx += np.where(moving, fx, 0.0)
+            self.vy += np.where(moving, fy, 0.0)
+
+        # 速度制限
+        v_len = np.hypot(self.vx, self.vy)
+        over = moving & (v_len > self.speed)
+        scale = np.where(over, self.speed / np.where(over, v_len, 1.0), 1.0)
+        self.vx *= scale
+        self.vy *= scale
+
+        # 聖域には入れない。もともと外側にいたゾンビは横方向の速度を失う
+        nx = self.x + self.vx
+        blocked = moving & (nx > self.wall_x)
+        self.vx[blocked & (self.x <= self.wall_x)] = 0.0
+        nx = np.where(blocked, self.x, nx)
+        self.x = np.where(moving, np.clip(nx, self.min_x, self.max_x), self.x)
+        self.y = np.where(moving, np.clip(self.y + self.vy, self.min_y, self.max_y), self.y)
+
+        # 捕獲: 面ごとに、ゾンビの並び順で順番を振る
+        if caught.any():
+            self.captured |= caught
+            self.vx[caught] = 0.0
+            self.vy[caught] = 0.0
+            order = self.captured_count + np.cumsum(caught, axis=0) - 1
+            self.rank = np.where(caught, order, self.rank)
+            self.captured_count += caught.sum(axis=0).astype(np.int32)
+        return caught
+
+    def _flock(self, free):
+        """面ごとの総当たりで、分離・整列・結合による速度の増分を求める (ゾンビ数が少ないので密に計算)。
+        組は (i, j, N) の配列にする。j 方向の合計は N 個ずつの行の足し算なので速い"""
+        # 捕獲済みは遠くへ置いて仲間から外す (同じ点に重なるので互いにも仲間にならない)
+        x = np.where(free, self.x, 1e4)
+        y = np.where(free, self.y, 1e4)
+        dx = x[:, None, :] - x[None, :, :]
+        dy = y[:, None, :] - y[None, :, :]
+        d2 = dx * dx + dy * dy
+        mates = (d2 < FLOCK_RADIUS * FLOCK_RADIUS) & (d2 != 0)
+        sep = mates & (d2 < FLOCK_SEPARATION_RADIUS * FLOCK_SEPARATION_RADIUS)
+
+        count = mates.sum(axis=1)
+        k = np.maximum(count, 1)
+        sx = (dx * sep).sum(axis=1)
+        sy = (dy * sep).sum(axis=1)
+        ax = (mates * self.vx).sum(axis=1) / k
+        ay = (mates * self.vy).sum(axis=1) / k
+        cx = (mates * x).sum(axis=1) / k
+        cy = (mates * y).sum(axis=1) / k
+
+        has = count > 0
+        fx = np.where(has, sx * FLOCK_SEPARATION + (ax - self.vx) * FLOCK_ALIGNMENT + (cx - self.x) * FLOCK_COHESION, 0.0)
+        fy = np.where(has, sy * FLOCK_SEPARATION + (ay - self.vy) * FLOCK_ALIGNMENT + (cy - self.y) * FLOCK_COHESION, 0.0)
+        return fx, fy
+
+    def _follow_trail(self):
+        """捕獲済みのゾンビを、捕獲順に応じた軌跡上の位置へ向かわせる"""
+        cap = self.captured
+        if not cap.any():
+            return
+        back = np.minimum(TRAIL_MAX_LENGTH - 1, (self.rank + 1) * FOLLOW_DISTANCE)
+        row = (self.head - back) % TRAIL_MAX_LENGTH
+        # 行進中の面は、ゲームと同じく軌跡がすべてプレイヤーの位置になっているものとして扱う
+        tx = np.where(self.marching, self.px, self.trail_x[row, self.columns])
+        ty = np.where(self.marching, self.py, self.trail_y[row, self.columns])
+
+        dx = tx - self.x
+        dy = ty - self.y
+        td = np.hypot(dx, dy)
+        far = cap & (td > 1.0)
+        k = np.where(far, self.speed / np.where(far, td, 1.0), 0.0)
+        self.vx = np.where(cap, dx * k, self.vx)
+        self.vy = np.where(cap, dy * k, self.vy)
+        self.x = np.where(cap, np.clip(self.x + self.vx, self.min_x, self.max_x), self.x)
+        self.y = np.where(cap, np.clip(self.y + self.vy, self.min_y, self.max_y), self.y)
+
+    def _march(self):
+        """行進中の面のプレイヤーと捕獲済みゾンビを聖域へ進める。全員が着いた面を返す"""
+        m = self.marching
+        if not m.any():
+            return m.copy()
+        speed = PLAYER_SPEED * 1.5
+        tx = self.march_x
+        self.px = np.where(m & (self.px < tx), self.px + np.minimum(speed, tx - self.px), self.px)
+        mz = m & self.captured & (self.x < tx)
+        self.x = np.where(mz, self.x + np.minimum(speed, tx - self.x), self.x)
+
+        sx = self.sanctuary_x
+        return m & (self.px >= sx) & np.all(~self.captured | (self.x >= sx), axis=0)
+
+    # --- 観測 ---
+
+    def observe(self):
+        """観測は面ごとの並び ((N, ...) の配列) で返す"""
+        return {
+            "player": np.stack([self.px, self.py], axis=1),
+            "zombies": np.stack([self.x.T, self.y.T], axis=2),
+            "captured": self.captured.T.copy(),
+            "time_left": np.maximum(0.0, self.time_limit - self.steps / SIM_RATE),
+        }
+
+
+def chase_policy(obs):
+    """いちばん近い未捕獲のゾンビへ向かう簡単な方策 (動作確認・ベンチマーク用)"""
+    player = obs["player"]
+    rel = obs["zombies"] - player[:, None, :]
+    d = np.where(obs["captured"], np.inf, np.hypot(rel[..., 0], rel[..., 1]))
+    target = rel[np.arange(len(player)), d.argmin(axis=1)]
+    sx = np.sign(np.where(np.abs(target[:, 0]) > 1, target[:, 0], 0)).astype(int)
+    sy = np.sign(np.where(np.abs(target[:, 1]) > 1, target[:, 1], 0)).astype(int)
+    return (sy + 1) * 3 + (sx + 1)
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    n = option("--envs", 1024)
+    steps = option("--steps", 500)
+    stage = option("--stage", 1)
+
+    env = VecEnv(n, stage=stage, flocking="--no-flocking" not in args)
+    obs = env.reset(seed=0)
+    episodes = arrived = 0
+    total = 0.0
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        obs, reward, done, info = env.step(chase_policy(obs))
+        total += reward.sum()
+        episodes += int(done.sum())
+        arrived += int(info["arrived"].sum())
+    dt = time.perf_counter() - t0
+    print("envs %d  zombies %d  steps %d  %.0f env-steps/s" % (n, env.zombie_count, steps, n * steps / dt))
+    print("episodes %d  cleared %d  reward/episode %.2f" % (episodes, arrived, total / max(1, episodes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+ゾンビ群の配列版 (DEMOCRACY OF THE DEAD 用, NumPy)
+
+DOD の Zombie.update と同じ処理 (距離判定・捕獲判定・追跡・徘徊の向き直し・
+群れの動き・速度制限・聖域の境界・画面端) を、捕獲されていない全ゾンビについて数回の
+配列演算でまとめて行う。捕獲済みのゾンビはプレイヤーの軌跡 (trail) から
+目標位置をまとめて取り出して追従させる。
+
+各ゲームスクリプトから任意で import される。numpy が無い環境 (ブラウザ版など) では
+import に失敗し、ゾンビは従来どおり 1 体ずつ Zombie.update で動く。
+numba があれば群れ・移動・隊列の追従は kernels.py のコンパイル版のループで計算する (結果は同じ)。
+
+使い方 (GameApp 側):
+    self.horde.load(self.zombies)          # ステージ開始時
+    captured = self.horde.update(player)   # 毎フレーム。今フレーム捕獲された添字の配列が返る
+    for i in captured: self.zombies[i].capture()   # 効果音・粒子はオブジェクト側で出す
+    self.horde.write_back(self.zombies)    # 描画用に座標・向き・状態を書き戻す
+    data = self.horde.pack()               # スナップショット (配列と乱数の状態)。unpack(data) で戻す
+"""
+
+import numpy as np
+
+try:
+    import kernels  # Numba で JIT コンパイルしたループ (任意)。numba が無ければ NumPy の配列演算で計算する
+    if not kernels.ENABLED:
+        kernels = None
+except ImportError:
+    kernels = None
+
+WANDER = 0
+FOLLOW = 1
+CAPTURED = 2
+STATE_NAMES = ("wander", "follow", "captured")
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+FOLLOW_RANGE = 45        # これより近いとプレイヤーを追う
+FOLLOW_ACCEL = 0.1       # 追跡時の加速
+WANDER_TURN_RATE = 0.02  # 徘徊中に向きを変える確率 (1 フレームあたり)
+WANDER_SPEED = 0.5       # 向きを変えたときの速度の範囲 (+-)
+
+# 群れの動き (ゲームスクリプトの FLOCK_* と同じ値)
+FLOCK_RADIUS = 12
+FLOCK_SEPARATION_RADIUS = 8
+FLOCK_SEPARATION = 0.03
+FLOCK_ALIGNMENT = 0.05
+FLOCK_COHESION = 0.002
+
+# pack() で書き出す配列の順番と型
+PACKED_ARRAYS = (("x", np.float64), ("y", np.float64), ("vx", np.float64), ("vy", np.float64),
+                 ("speed", np.float64), ("dir", np.int8), ("state", np.int8), ("rank", np.int32))
+
+
+class Horde:
+    """DOD のゾンビ群を配列で持つ。定数はゲームスクリプト側の値を渡す"""
+
+    def __init__(self, window_w, window_h, ui_height, sanctuary_w, player_r, zombie_r,
+                 follow_distance, seed=None):
+        self.min_x = zombie_r
+        self.max_x = window_w - 1 - zombie_r
+        self.min_y = ui_height + zombie_r
+        self.max_y = window_h - 1 - zombie_r
+        self.wall_x = window_w - sanctuary_w - zombie_r  # 聖域に入れない境界
+        self.capture_dist = player_r + zombie_r
+        self.follow_distance = follow_distance
+        self.rng = np.random.default_rng(seed)
+        self.load([])
+
+    def __len__(self):
+        return len(self.x)
+
+    def load(self, zombies):
+        """Zombie のリストから配列を作り直す (ステージ開始時に 1 回)"""
+        self.x = np.array([z.x for z in zombies], dtype=np.float64)
+        self.y = np.array([z.y for z in zombies], dtype=np.float64)
+        self.vx = np.array([z.vx for z in zombies], dtype=np.float64)
+        self.vy = np.array([z.vy for z in zombies], dtype=np.float64)
+        self.speed = np.array([z.speed_factor for z in zombies], dtype=np.float64)
+        self.dir = np.array([z.dir for z in zombies], dtype=np.int8)
+        self.state = np.array([STATE_CODES[z.state] for z in zombies], dtype=np.int8)
+        # 捕獲された順番 (captured_zombies 内の位置)。未捕獲は -1
+        self.rank = np.full(len(zombies), -1, dtype=np.int32)
+        self.captured_count = 0
+
+    def update(self, player):
+        """全ゾンビを 1 フレーム進め、今フレーム捕獲されたゾンビの添字を返す"""
+        captured = self.state == CAPTURED
+        if captured.any():
+            self._follow_trail(player, captured)
+
+        free = ~captured
+        dx = player.x - self.x
+        dy = player.y - self.y
+        d = np.hypot(dx, dy)
+
+        if player.is_zombified:
+            caught = np.zeros(len(self.x), dtype=bool)
+            moving = free
+        else:
+            caught = free & (d < self.capture_dist)
+            moving = free & ~caught
+            # 群れの力はこのステップ開始時の位置・速度から求め、追跡・徘徊の後に加える
+            fx, fy = self._flock(free)
+
+            # 追跡: 近いゾンビはプレイヤーに向かって加速する
+            follow = moving & (d < FOLLOW_RANGE)
+            self.state[follow] = FOLLOW
+            near = follow & (d != 0)
+            inv = 1.0 / np.where(near, d, 1.0)
+            self.vx[near] += dx[near] * inv[near] * FOLLOW_ACCEL
+            self.vy[near] += dy[near] * inv[near] * FOLLOW_ACCEL
+
+            # 徘徊: 一定の確率で向きを変える
+            wander = moving & ~follow
+            self.state[wander] = WANDER
+            turn = wander & (self.rng.random(len(self.x)) < WANDER_TURN_RATE)
+            n = int(turn.sum())
+            if n:
+                self.vx[turn] = self.rng.uniform(-WANDER_SPEED, WANDER_SPEED, n)
+                self.vy[turn] = self.rng.uniform(-WANDER_SPEED, WANDER_SPEED, n)
+
+            self.vx[moving] += fx[moving]
+            self.vy[moving] += fy[moving]
+
+        self._move_free(moving)
+
+        # 捕獲: 状態を変えて止める。順番は self.zombies の並び順 (従来どおり)
+        idx = np.flatnonzero(caught)
+        if len(idx):
+            self.state[idx] = CAPTURED
+            self.vx[idx] = 0.0
+            self.vy[idx] = 0.0
+            self.rank[idx] = np.arange(self.captured_count, self.captured_count + len(idx))
+            self.captured_count += len(idx)
+        return idx
+
+    def _flock(self, mask):
+        """mask のゾンビ同士の分離・整列・結合による速度の増分 (全員分の配列, mask 外は 0)。
+        FLOCK_RADIUS 四方のマスの番号で並べ替え、周囲 3x3 マスの相手だけを組にして調べる"""
+        fx = np.zeros(len(self.x))
+        fy = np.zeros(len(self.x))
+        idx = np.flatnonzero(mask)
+        n = len(idx)
+        if n < 2:
+            return fx, fy
+        x = self.x[idx]
+        y = self.y[idx]
+        vx = self.vx[idx]
+        vy = self.vy[idx]
+
+        # マス番号。列は左右に 1 つずつ余白をとり、隣の行へ回り込まないようにする
+        cols = int(self.max_x // FLOCK_RADIUS) + 3
+        key = (y // FLOCK_RADIUS).astype(np.int64) * cols + (x // FLOCK_RADIUS).astype(np.int64) + 1
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+
+        if kernels:
+            # 周囲 9 マスそれぞれについて、相手が並んでいる範囲 (order の lo 〜 hi) だけを求めて渡す
+            offsets = np.array([-cols - 1, -cols, -cols + 1, -1, 0, 1, cols - 1, cols, cols + 1])[:, None]
+            lo = np.searchsorted(sorted_key, key + offsets, "left")
+            hi = np.searchsorted(sorted_key, key + offsets, "right")
+            sub_x = np.empty(n)
+            sub_y = np.empty(n)
+            kernels.flock(x, y, vx, vy, order, lo, hi, FLOCK_RADIUS, FLOCK_SEPARATION_RADIUS,
+                          FLOCK_SEPARATION, FLOCK_ALIGNMENT, FLOCK_COHESION, sub_x, sub_y)
+            fx[idx] = sub_x
+            fy[idx] = sub_y
+            return fx, fy
+
+        pairs_i = []
+        pairs_j = []
+        for offset in (-cols - 1, -cols, -cols + 1, -1, 0, 1, cols - 1, cols, cols + 1):
+            lo = np.searchsorted(sorted_key, key + offset, "left")
+            count = np.searchsorted(sorted_key, key + offset, "right") - lo
+            total = int(count.sum())
+            if total == 0:
+                continue
+            # i ごとに、相手のマスに入っている j (並べ替え後の lo 〜 lo + count) を展開する
+            starts = np.cumsum(count) - count
+            pairs_i.append(np.repeat(np.arange(n), count))
+            pairs_j.append(order[np.repeat(lo - starts, count) + np.arange(total)])
+        i = np.concatenate(pairs_i)
+        j = np.concatenate(pairs_j)
+
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        d2 = dx * dx + dy * dy
+        near = (d2 < FLOCK_RADIUS * FLOCK_RADIUS) & (d2 != 0)  # 範囲外 / 自分自身を除く
+        i, j, dx, dy, d2 = i[near], j[near], dx[near], dy[near], d2[near]
+        sep = d2 < FLOCK_SEPARATION_RADIUS * FLOCK_SEPARATION_RADIUS
+
+        count = np.bincount(i, minlength=n)
+        has = count > 0
+        k = np.where(has, count, 1)
+        sx = np.bincount(i, weights=np.where(sep, dx, 0.0), minlength=n)
+        sy = np.bincount(i, weights=np.where(sep, dy, 0.0), minlength=n)
+        ax = np.bincount(i, weights=vx[j], minlength=n) / k
+        ay = np.bincount(i, weights=vy[j], minlength=n) / k
+        cx = np.bincount(i, weights=x[j], minlength=n) / k
+        cy = np.bincount(i, weights=y[j], minlength=n) / k
+
+        fx[idx] = np.where(has, sx * FLOCK_SEPARATION + (ax - vx) * FLOCK_ALIGNMENT + (cx - x) * FLOCK_COHESION, 0.0)
+        fy[idx] = np.where(has, sy * FLOCK_SEPARATION + (ay - vy) * FLOCK_ALIGNMENT + (cy - y) * FLOCK_COHESION, 0.0)
+        return fx, fy
+
+    def _move_free(self, mask):
+        """速度制限・聖域の境界・画面端の処理をして移動する"""
+        if kernels:
+            kernels.move_free(np.flatnonzero(mask), self.x, self.y, self.vx, self.vy, self.speed, self.dir,
+                              self.wall_x, self.min_x, self.max_x, self.min_y, self.max_y)
+            return
+        vx = self.vx[mask]
+        vy = self.vy[mask]
+        x = self.x[mask]
+        max_v = self.speed[mask]
+        v_len = np.hypot(vx, vy)
+        over = v_len > max_v
+        scale = np.where(over, max_v / np.where(over, v_len, 1.0), 1.0)
+        vx *= scale
+        vy *= scale
+
+        nx = x + vx
+        ny = self.y[mask] + vy
+        # 聖域には入れない。もともと外側にいたゾンビは横方向の速度を失う
+        blocked = nx > self.wall_x
+        vx[blocked & (x <= self.wall_x)] = 0.0
+        nx[blocked] = x[blocked]
+
+        self.vx[mask] = vx
+        self.vy[mask] = vy
+        self._set_dir(mask, vx, 0.0)
+        self.x[mask] = np.clip(nx, self.min_x, self.max_x)
+        self.y[mask] = np.clip(ny, self.min_y, self.max_y)
+
+    def _follow_trail(self, player, mask):
+        """捕獲済みのゾンビを、捕獲順に応じた軌跡上の位置へ向かわせる"""
+        trail = np.asarray(player.trail, dtype=np.float64)
+        target = np.minimum(len(trail) - 1, (self.rank[mask] + 1) * self.follow_distance)
+        tx = trail[target, 0]
+        ty = trail[target, 1]
+
+        if kernels:
+            kernels.follow(np.flatnonzero(mask), tx, ty, self.x, self.y, self.vx, self.vy, self.speed, self.dir,
+                           self.min_x, self.max_x, self.min_y, self.max_y)
+            return
+
+        x = self.x[mask]
+        y = self.y[mask]
+        dx = tx - x
+        dy = ty - y
+        td = np.hypot(dx, dy)
+        far = td > 1.0
+        k = np.where(far, self.speed[mask] / np.where(far, td, 1.0), 0.0)
+        vx = dx * k
+        vy = dy * k
+
+        self.vx[mask] = vx
+        self.vy[mask] = vy
+        self._set_dir(mask, vx, 0.1)
+        self.x[mask] = np.clip(x + vx, self.min_x, self.max_x)
+        self.y[mask] = np.clip(y + vy, self.min_y, self.max_y)
+
+    def _set_dir(self, mask, vx, dead_zone):
+        d = self.dir[mask]
+        d[vx > dead_zone] = 1
+        d[vx < -dead_zone] = -1
+        self.dir[mask] = d
+
+    def march(self, tx, speed):
+        """聖域への行進。捕獲済みのゾンビを目標 X 座標まで右へ進める"""
+        m = (self.state == CAPTURED) & (self.x < tx)
+        self.x[m] += np.minimum(speed, tx - self.x[m])
+        self.dir[m] = 1
+
+    def pack(self):
+        """全配列と乱数の状態をバイト列にする。unpack() で同じ状態に戻る"""
+        s = self.rng.bit_generator.state
+        head = np.array([len(self.x), self.captured_count, s["has_uint32"], s["uinteger"]], dtype=np.int64)
+        parts = [head.tobytes(), s["state"]["state"].to_bytes(16, "little"), s["state"]["inc"].to_bytes(16, "little")]
+        parts += [getattr(self, name).tobytes() for name, _ in PACKED_ARRAYS]
+        return b"".join(parts)
+
+    def unpack(self, data):
+        head = np.frombuffer(data, dtype=np.int64, count=4)
+        n = int(head[0])
+        self.captured_count = int(head[1])
+        s = self.rng.bit_generator.state
+        s["state"]["state"] = int.from_bytes(data[32:48], "little")
+        s["state"]["inc"] = int.from_bytes(data[48:64], "little")
+        s["has_uint32"] = int(head[2])
+        s["uinteger"] = int(head[3])
+        self.rng.bit_generator.state = s
+        pos = 64
+        for name, dtype in PACKED_ARRAYS:
+            a = np.frombuffer(data, dtype=dtype, count=n, offset=pos).copy()
+            setattr(self, name, a)
+            pos += a.nbytes
+
+    def write_back(self, zombies):
+        """描画に使う座標・向き・状態を Zombie オブジェクトへ書き戻す"""
+        for z, x, y, d, s in zip(zombies, self.x.tolist(), self.y.tolist(),
+                                 self.dir.tolist(), self.state.tolist()):
+            z.x = x
+            z.y = y
+            z.dir = d
+            z.state = STATE_NAMES[s]
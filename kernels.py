@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+ゾンビ群の配列版 (horde.py / swarm.py) の内側のループ (任意で Numba による JIT コンパイル)
+
+horde.py と swarm.py は NumPy の配列演算でゾンビ群をまとめて進める。配列演算は 1 回ごとに
+一時配列を作るので、群れの組 (ペア) の展開のように演算の数が多い部分はそれが重い。
+ここではその部分を配列全体を回す 1 本のループとして書き、numba が入っていれば numba.njit で
+コンパイルする。numba が無ければ horde.py / swarm.py は今までの NumPy のコードで計算する
+(ブラウザ版などはそのまま動く)。
+
+どの関数も NumPy 版と同じ式・同じ足し算の順番で計算するので、結果は 1 ビットも変わらない。
+純 Python 版は kernels.PYTHON[名前] でいつでも取り出せる。test_kernels.py が NumPy 版・
+純 Python 版・コンパイル版を同じ乱数の種で動かして一致を確かめ、bench.py --kernels が速さを比べる。
+
+    flock        horde.py の Horde._flock (群れの分離・整列・結合)
+    move_free    horde.py の Horde._move_free (速度制限・聖域の境界・画面端)
+    follow       horde.py の Horde._follow_trail (捕獲済みゾンビが隊列の目標へ向かう)
+    chase        swarm.py の step_slice (zonbigamekai01 の Zombie.update: プレイヤーへまっすぐ進む)
+
+乱数を使う部分 (徘徊の向き直し) は NumPy の乱数の並びを変えないよう horde.py 側に残す。
+1 体ずつ動かすゲームスクリプトの Zombie.update・Obstacle.collide・粒子はここを使わない
+(1 回の呼び出しの手間の方が中身の計算より大きく、かえって遅くなる)。
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+ENABLED = numba is not None
+PYTHON = {}  # 名前 → 純 Python 版
+
+
+def kernel(fn):
+    """純 Python 版を PYTHON に残し、numba があればコンパイルした版を返す"""
+    PYTHON[fn.__name__] = fn
+    if numba is None:
+        return fn
+    return numba.njit(cache=True)(fn)
+
+
+@kernel
+def flock(x, y, vx, vy, order, lo, hi, radius, sep_radius, separation, alignment, cohesion, fx, fy):
+    """i 番目のゾンビの仲間は、マス番号で並べ替えた order[lo[k, i]:hi[k, i]] (周囲 9 マスの k ごと)。
+    分離・整列・結合による速度の増分を fx, fy に書き込む"""
+    r2 = radius * radius
+    s2 = sep_radius * sep_radius
+    for i in range(len(x)):
+        xi = x[i]
+        yi = y[i]
+        count = 0
+        sx = 0.0
+        sy = 0.0
+        ax = 0.0
+        ay = 0.0
+        cx = 0.0
+        cy = 0.0
+        for k in range(lo.shape[0]):
+            for m in range(lo[k, i], hi[k, i]):
+                j = order[m]
+                dx = xi - x[j]
+                dy = yi - y[j]
+                d2 = dx * dx + dy * dy
+                if d2 < r2 and d2 != 0:
+                    count += 1
+                    if d2 < s2:
+                        sx += dx
+                        sy += dy
+                    ax += vx[j]
+                    ay += vy[j]
+                    cx += x[j]
+                    cy += y[j]
+        if count:
+            fx[i] = sx * separation + (ax / count - vx[i]) * alignment + (cx / count - xi) * cohesion
+            fy[i] = sy * separation + (ay / count - vy[i]) * alignment + (cy / count - yi) * cohesion
+        else:
+            fx[i] = 0.0
+            fy[i] = 0.0
+
+
+@kernel
+def move_free(idx, x, y, vx, vy, speed, direction, wall_x, min_x, max_x, min_y, max_y):
+    """idx のゾンビの速度を speed に抑えて 1 ステップ進める。wall_x より右 (聖域) へは進めない"""
+    for i in idx:
+        xi = x[i]
+        ux = vx[i]
+        uy = vy[i]
+        v_len = np.hypot(ux, uy)
+        if v_len > speed[i]:
+            scale = speed[i] / v_len
+            ux *= scale
+            uy *= scale
+        nx = xi + ux
+        ny = y[i] + uy
+        if nx > wall_x:
+            if xi <= wall_x:
+                ux = 0.0
+            nx = xi
+        vx[i] = ux
+        vy[i] = uy
+        if ux > 0.0:
+            direction[i] = 1
+        elif ux < 0.0:
+            direction[i] = -1
+        x[i] = min(max(nx, min_x), max_x)
+        y[i] = min(max(ny, min_y), max_y)
+
+
+@kernel
+def follow(idx, tx, ty, x, y, vx, vy, speed, direction, min_x, max_x, min_y, max_y):
+    """idx[k] のゾンビを目標 (tx[k], ty[k]) へ速さ speed で向かわせる (1 px 以内なら止まる)"""
+    for k in range(len(idx)):
+        i = idx[k]
+        dx = tx[k] - x[i]
+        dy = ty[k] - y[i]
+        td = np.hypot(dx, dy)
+        s = speed[i] / td if td > 1.0 else 0.0
+        ux = dx * s
+        uy = dy * s
+        vx[i] = ux
+        vy[i] = uy
+        if ux > 0.1:
+            direction[i] = 1
+        elif ux < -0.1:
+            direction[i] = -1
+        x[i] = min(max(x[i] + ux, min_x), max_x)
+        y[i] = min(max(y[i] + uy, min_y), max_y)
+
+
+@kernel
+def chase(x, y, speed, px, py, min_x, max_x, min_y, max_y):
+    """全ゾンビを (px, py) へまっすぐ speed だけ進め、画面内に収める。
+    最も近いゾンビとの距離の 2 乗を返す (ゾンビがいなければ inf)"""
+    best = np.inf
+    for i in range(len(x)):
+        dx = px - x[i]
+        dy = py - y[i]
+        s = speed[i] / (np.hypot(dx, dy) + 1e-6)
+        nx = min(max(x[i] + dx * s, min_x), max_x)
+        ny = min(max(y[i] + dy * s, min_y), max_y)
+        x[i] = nx
+        y[i] = ny
+        dx = nx - px
+        dy = ny - py
+        d2 = dx * dx + dy * dy
+        if d2 < best:
+            best = d2
+    return best
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+2 人対戦のロールバック (DEMOCRACY OF THE DEAD の --versus 用)
+
+相手の入力を待たずに「前と同じボタンを押し続けている」と予測して進め、実際の入力が
+遅れて届いて予測と違っていたら、そのフレームの状態 (スナップショット) まで戻して
+今のフレームまで計算し直す。遅延を感じさせないための仕組みなので、入力だけで結果が
+1 ビットも違わずに決まるゲーム (step / save / load を持つもの) が相手になる。
+
+    match.step(inputs, replay)  1 フレーム進める。inputs は人数ぶんの入力 (整数のビット列)。
+                                replay は計算し直しのとき True (効果音を鳴らさないなど)
+    match.save() / load(data)   状態をバイト列にする / 戻す
+
+入力の送受信は Transport を差し替えて使う。LoopbackTransport は同じプロセス内の
+2 つの端点で、遅延と揺らぎを付けられる (ローカル対戦・テスト用)。
+
+各ゲームスクリプトから任意で import される。ブラウザ版 (index.html) はスクリプト 1 本しか
+読み込まないため、import に失敗したら対戦モードは無効になる。
+
+使い方:
+    python netplay.py                            # DOD 3 本で、2 つの端点の結果の一致と計算し直しの時間を調べる
+    python netplay.py --latency 8 --jitter 4 --frames 1200
+"""
+
+import random
+import sys
+import time
+import zlib
+
+INPUT_DELAY = 2     # 自分の入力を何フレーム後に使うか (この分は相手に届くのを待たずに済む)
+MAX_ROLLBACK = 12   # 確定していない入力がこれより多くたまったら、相手を待って止まる
+CHECKSUM_HISTORY = 120  # 確定した状態のチェックサムを何フレーム分残すか (相手と比べて同期ずれを見つける)
+
+
+class Transport:
+    """入力の送受信。send(frame, player, value) で相手へ送り、poll() で届いた
+    (frame, player, value) の並びを受け取る。ネットワーク版はこれを継承して作る"""
+
+    def send(self, frame, player, value):
+        raise NotImplementedError
+
+    def poll(self):
+        raise NotImplementedError
+
+
+class LoopbackTransport(Transport):
+    """同じプロセス内の端点。pair() で作った 2 つの間で、送った入力が poll() の回数で
+    latency (+ 0〜jitter) 回後に届く。揺らぎがあると届く順番が入れ替わることもある"""
+
+    def __init__(self, latency=0, jitter=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.peer = None
+        self.queue = []   # (届く時刻, frame, player, value)
+        self.clock = 0
+
+    @classmethod
+    def pair(cls, latency=0, jitter=0, seed=None):
+        a = cls(latency, jitter, seed)
+        b = cls(latency, jitter, None if seed is None else seed + 1)
+        a.peer = b
+        b.peer = a
+        return a, b
+
+    def send(self, frame, player, value):
+        delay = self.latency + (self.rng.randint(0, self.jitter) if self.jitter else 0)
+        self.peer.queue.append((self.peer.clock + delay, frame, player, value))
+
+    def poll(self):
+        self.clock += 1
+        ready = [m for m in self.queue if m[0] <= self.clock]
+        if ready:
+            self.queue = [m for m in self.queue if m[0] > self.clock]
+        return [(frame, player, value) for _, frame, player, value in ready]
+
+
+class Rollback:
+    """match を入力の予測とロールバックで進める。local は自分のプレイヤー番号"""
+
+    def __init__(self, match, local, transport, players=2, delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK):
+        self.match = match
+        self.local = local
+        self.transport = transport
+        self.players = players
+        self.delay = delay
+        self.max_rollback = max_rollback
+        self.frame = 0          # 次に進めるフレーム
+        # 確定した入力 (フレーム → 値)。最初の delay フレームは誰も何も押していない
+        self.inputs = [{f: 0 for f in range(delay)} for _ in range(players)]
+        self.known = [delay] * players  # プレイヤーごとに、これより前のフレームの入力はすべて届いている
+        self.used = {}          # フレーム → そのとき使った入力の組 (予測を含む)
+        self.states = {}        # フレーム → そのフレームを進める前の状態
+        self.checksums = {}     # フレーム → 確定した状態の CRC32
+        # 統計
+        self.rollbacks = 0
+        self.replayed = 0
+        self.max_replay = 0
+        self.stalls = 0
+
+    def confirmed(self):
+        """これより前のフレームは全員の入力が確定している"""
+        return min(self.known)
+
+    def receive(self, player, frame, value):
+        inputs = self.inputs[player]
+        inputs[frame] = value
+        known = self.known[player]
+        while known in inputs:
+            known += 1
+        self.known[player] = known
+
+    def predict(self, frame):
+        """frame で使う入力の組。届いていない入力は、最後に確定した入力が続いているとみなす"""
+        out = []
+        for p in range(self.players):
+            value = self.inputs[p].get(frame)
+            if value is None:
+                value = self.inputs[p][self.known[p] - 1]
+            out.append(value)
+        return tuple(out)
+
+    def advance(self, local_input):
+        """1 フレーム進める。相手の入力を待つために止まったときは False を返す"""
+        if self.frame + self.delay not in self.inputs[self.local]:
+            self.receive(self.local, self.frame + self.delay, local_input)
+            self.transport.send(self.frame + self.delay, self.local, local_input)
+
+        # 届いた入力のうち、予測と違っていたものの最も古いフレームまで戻す
+        rollback_to = self.frame
+        for frame, player, value in self.transport.poll():
+            if frame in self.inputs[player]:
+                continue
+            self.receive(player, frame, value)
+            used = self.used.get(frame)
+            if used is not None and used[player] != value:
+                rollback_to = min(rollback_to, frame)
+        if rollback_to < self.frame:
+            self.replay(rollback_to)
+
+        if self.frame - self.confirmed() >= self.max_rollback:
+            self.stalls += 1
+            return False
+        self.states[self.frame] = self.match.save()
+        self.used[self.frame] = inputs = self.predict(self.frame)
+        self.match.step(inputs, False)
+        self.frame += 1
+        self.forget()
+        return True
+
+    def replay(self, start):
+        """start の状態に戻し、今のフレームまで (分かった入力で) 計算し直す"""
+        self.match.load(self.states[start])
+        for frame in range(start, self.frame):
+            if frame != start:
+                self.states[frame] = self.match.save()
+            self.used[frame] = inputs = self.predict(frame)
+            self.match.step(inputs, True)
+        n = self.frame - start
+        self.rollbacks += 1
+        self.replayed += n
+        self.max_replay = max(self.max_replay, n)
+
+    def forget(self):
+        """確定したフレームの状態と入力は、もう戻らないので捨てる (最後の 1 つは予測に使うので残す)"""
+        keep = self.confirmed() - 1
+        for frame in [f for f in self.states if f < keep]:
+            self.checksums[frame] = zlib.crc32(self.states.pop(frame))
+            self.used.pop(frame, None)
+        for frame in [f for f in self.checksums if f < keep - CHECKSUM_HISTORY]:
+            del self.checksums[frame]
+        for inputs in self.inputs:
+            for frame in [f for f in inputs if f < keep]:
+                del inputs[frame]
+
+    def summary(self):
+        return "frame %d / rollbacks %d / replayed %d (max %d) / stalls %d" % (
+            self.frame, self.rollbacks, self.replayed, self.max_replay, self.stalls)
+
+
+def chase_input(match, player, pad_bits):
+    """いちばん近い、まだ捕まっていないゾンビへ向かう入力 (ベンチマーク用のボット)"""
+    left, right, up, down = pad_bits
+    p = match.players[player]
+    free = [z for z in match.zombies if z.state != "captured"]
+    if not free:
+        return 0
+    z = min(free, key=lambda z: (z.x - p.x) ** 2 + (z.y - p.y) ** 2)
+    value = 0
+    if z.x < p.x - 1:
+        value |= left
+    elif z.x > p.x + 1:
+        value |= right
+    if z.y < p.y - 1:
+        value |= up
+    elif z.y > p.y + 1:
+        value |= down
+    return value
+
+
+def run_pair(g, frames, latency, jitter, seed):
+    """2 つの端点 (それぞれ自分の VersusMatch を持つ) を frames フレーム進め、
+    (両者の確定状態のチェックサムが一致したか, 1 フレームの最大時間, 端点 A) を返す"""
+    a_link, b_link = LoopbackTransport.pair(latency, jitter, seed)
+    a = Rollback(g.VersusMatch(seed), 0, a_link)
+    b = Rollback(g.VersusMatch(seed), 1, b_link)
+    bits = (g.PAD_LEFT, g.PAD_RIGHT, g.PAD_UP, g.PAD_DOWN)
+    worst = 0.0
+    for _ in range(frames):
+        for session in (a, b):
+            t0 = time.perf_counter()
+            session.advance(chase_input(session.match, session.local, bits))
+            worst = max(worst, time.perf_counter() - t0)
+    common = set(a.checksums) & set(b.checksums)
+    same = bool(common) and all(a.checksums[f] == b.checksums[f] for f in common)
+    return same, worst, a
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    frames = option("--frames", 900)
+    latency = option("--latency", 6)
+    jitter = option("--jitter", 4)
+    import bench
+    print("frames %d  latency %d  jitter %d" % (frames, latency, jitter))
+    print("%-26s %5s %9s %10s %9s %8s" % ("script", "same", "rollbacks", "max replay", "worst ms", "budget"))
+    for script in bench.SCRIPTS:
+        try:
+            g = bench.load(script)
+        except ImportError as e:
+            print("%-26s skipped (%s)" % (script, e))
+            continue
+        if not hasattr(g, "VersusMatch"):
+            continue
+        g.Zombie.muted = True  # pyxel.init していないので効果音は鳴らせない
+        budget = 1.0 / g.SIM_RATE  # Pyxel の 1 フレーム (fps = SIM_RATE)
+        same, worst, a = run_pair(g, frames, latency, jitter, 0)
+        print("%-26s %5s %9d %10d %9.2f %7.0f%%" % (
+            script, "yes" if same else "NO", a.rollbacks, a.max_replay, worst * 1e3, 100.0 * worst / budget))
+
+        # 最大まで巻き戻したときの時間 (MAX_ROLLBACK フレームの計算し直し + 1 フレーム)
+        match = g.VersusMatch(0)
+        for _ in range(300):
+            match.step((chase_input(match, 0, (g.PAD_LEFT, g.PAD_RIGHT, g.PAD_UP, g.PAD_DOWN)), 0), False)
+        snapshot = match.save()
+        secs = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            match.load(snapshot)
+            for _ in range(MAX_ROLLBACK):
+                match.save()
+                match.step((0, 0), True)
+            match.save()
+            match.step((0, 0), False)
+            secs = min(secs, time.perf_counter() - t0)
+        print("%-26s replay of %d frames: %.2fms (%.0f%% of budget)" % (
+            "", MAX_ROLLBACK, secs * 1e3, 100.0 * secs / budget))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+計測ツール (Pyxel 版 / Tkinter 版 共通)
+
+各ゲームスクリプトから任意で import される。ブラウザ版 (index.html) は
+スクリプト 1 本しか読み込まないため、import に失敗したら計測機能は無効になる。
+
+使い方:
+    python DODBGMPADVER02.py --alloc-profile
+        ゲームステートごとのメモリ確保を tracemalloc で集計し、
+        alloc_report.txt に書き出す (ステートが変わるたび + 終了時)
+
+    python DODBGMPADVER02.py --gc-stats
+        GC ペーシング (既定で有効) の停止時間を終了時に表示する。
+        --no-gc-pacing で Python 標準の自動 GC に戻す。
+
+    python DODBGMPADVER02.py --hitch-log
+        サブシステム別のフレーム時間を記録し、しきい値 (33ms) を超えたフレームが
+        あると直前数秒分の記録・ステート・スタックを hitch_log.txt に追記する。
+        Pyxel 版は F3 でフレーム時間のオーバーレイを表示する (Q: はゲーム側の描画の品質の段階)。
+
+    python DODBGMPADVER02.py --pool-stats
+        ステージ開始ごとに Zombie / Player プールの使用数の最大値と生成数を表示する。
+        (Tkinter 版はステージ開始時のログに常に POOL=最大値/生成数 を出す)
+"""
+
+import atexit
+import collections
+import gc
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+
+def flag(name):
+    """コマンドライン引数にフラグが含まれているか"""
+    return name in sys.argv[1:]
+
+
+# ------------------------------------------------------------
+# ステート別アロケーション計測
+# ------------------------------------------------------------
+class AllocProfiler:
+    """
+    ゲームステート (TITLE, PLAYING, GO_TO_SANCT, ENDING, CREDITS_ROLL ...) ごとに
+    1 フレームあたりのメモリ確保量と、確保の多い行 (allocation site) を集計する。
+
+    毎フレーム先頭で tracemalloc のトレースを消去するため、
+    - peak: フレーム内で確保され同時に生きていた最大バイト数 (一時リスト・文字列を含む)
+    - kept: フレーム内で確保され、フレーム終了時にも残っているバイト数
+            (作り直されたパーティクルリストや trail など、毎フレームの入れ替え分)
+    をそれぞれ計測できる。確保箇所は sample_every フレームごとのスナップショットで集計する。
+    """
+
+    def __init__(self, out_path="alloc_report.txt", top=8, sample_every=15, nframe=1):
+        self.out_path = out_path
+        self.top = top
+        self.sample_every = sample_every
+        self.stats = {}  # state -> {"frames", "peak", "kept", "samples", "sites"}
+        self.state = None
+        self.frame_index = 0
+        self.filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        tracemalloc.start(nframe)
+        atexit.register(self.write_report)
+
+    @classmethod
+    def from_argv(cls):
+        """--alloc-profile 指定時のみ有効化する"""
+        return cls() if flag("--alloc-profile") else None
+
+    def begin_frame(self, state):
+        """update の先頭で呼ぶ"""
+        if state != self.state:
+            if self.state is not None:
+                self.write_report()
+            self.state = state
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+
+    def end_frame(self):
+        """draw の末尾で呼ぶ"""
+        if self.state is None:
+            return
+        kept, peak = tracemalloc.get_traced_memory()
+        s = self.stats.get(self.state)
+        if s is None:
+            s = self.stats[self.state] = {"frames": 0, "peak": 0, "kept": 0, "samples": 0, "sites": {}}
+        s["frames"] += 1
+        s["peak"] += peak
+        s["kept"] += kept
+
+        self.frame_index += 1
+        if self.frame_index % self.sample_every == 0:
+            snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+            s["samples"] += 1
+            sites = s["sites"]
+            for st in snapshot.statistics("lineno"):
+                frame = st.traceback[0]
+                key = (frame.filename, frame.lineno)
+                size, count = sites.get(key, (0, 0))
+                sites[key] = (size + st.size, count + st.count)
+
+    def report(self):
+        lines = ["=== allocation profile (tracemalloc) ==="]
+        lines.append("%-14s %8s %14s %14s" % ("state", "frames", "peak B/frame", "kept B/frame"))
+        for state, s in self.stats.items():
+            n = max(1, s["frames"])
+            lines.append("%-14s %8d %14.1f %14.1f" % (state, s["frames"], s["peak"] / n, s["kept"] / n))
+
+        for state, s in self.stats.items():
+            if not s["sites"]:
+                continue
+            lines.append("")
+            lines.append("[%s] top allocation sites (kept bytes / blocks per frame)" % state)
+            ranked = sorted(s["sites"].items(), key=lambda kv: kv[1][0], reverse=True)
+            for (filename, lineno), (size, count) in ranked[:self.top]:
+                name = filename.replace("\\", "/").rsplit("/", 1)[-1]
+                lines.append("  %-28s %10.1f B %8.1f blk" % (
+                    "%s:%d" % (name, lineno), size / s["samples"], count / s["samples"]))
+        return "\n".join(lines)
+
+    def write_report(self):
+        text = self.report()
+        with open(self.out_path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        return text
+
+
+# ------------------------------------------------------------
+# GC ペーシング
+# ------------------------------------------------------------
+class GCPacer:
+    """
+    プレイ中の世代別 GC による引っかかりをなくすため、GC を実行するタイミングを制御する。
+
+    - プレイ中から演出 (行進・フェード・ステージクリア画面など) に移った最初のフレームで、
+      凍結を解いて全体回収する。ステージ生成直後 (spawn_stage / reset_stage) に stage_built() を
+      呼ぶと、生き残ったオブジェクトを gc.freeze() で永続世代へ移すだけにする
+      (ステージの切り替わりのフレームに全体回収の停止を載せない)。
+      以降の回収は新しく作られたオブジェクトだけを対象にする。
+    - active_states (プレイ中のステート。ゲームごとに渡す) は自動 GC を止める。ただし第 0 世代の未回収数が
+      valve を超えたら安全弁として第 0 世代だけ回収する。
+    - それ以外のステート (フェード、ステージクリア画面、クレジット等) で
+      第 0 世代を毎フレーム、第 1 / 第 2 世代を間隔をあけて少しずつ回収する。
+
+    すべての回収 (手動・安全弁) の停止時間を gc.callbacks で計測し、
+    フレームごとの合計を last_pause_ms に残す。
+    """
+
+    def __init__(self, active_states, mid_every=30, full_every=600, valve=20000):
+        self.active_states = active_states
+        self.mid_every = mid_every
+        self.full_every = full_every
+        self.valve = valve
+
+        self.idle_frames = 0
+        self.was_active = True  # 直前のフレームがプレイ中だったか (最初のフレームも演出の始まりとみなす)
+        self.swept = False      # 凍結を解いて全体回収し、まだ凍結していないか
+        self.frame_pause = 0.0  # 現在フレームの停止時間 (秒)
+        self.last_pause_ms = 0.0  # 直前フレームの停止時間 (ミリ秒)
+        self.max_pause_ms = 0.0
+        self.total_pause_ms = 0.0
+        self.collections = [0, 0, 0]
+        self.frames = 0
+        self._gc_start = 0.0
+
+        gc.disable()
+        gc.callbacks.append(self._on_gc)
+        if flag("--gc-stats"):
+            atexit.register(lambda: print(self.report()))
+
+    @classmethod
+    def from_argv(cls, active_states):
+        """既定で有効。--no-gc-pacing 指定時は無効"""
+        return None if flag("--no-gc-pacing") else cls(active_states)
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+        else:
+            self.frame_pause += time.perf_counter() - self._gc_start
+            self.collections[info["generation"]] += 1
+
+    def sweep(self):
+        """凍結を解いて前ステージのゴミを全体回収する (演出に入った最初のフレームで frame() から呼ぶ)"""
+        gc.unfreeze()
+        gc.collect()
+        self.swept = True
+
+    def stage_built(self):
+        """ステージ生成直後に呼ぶ。長寿命オブジェクトを凍結する。
+        回収は sweep() で済ませてあるので、ここでは凍結だけ (回収していなければ凍結もしない。
+        練習モードのやり直しなど、演出を挟まずに次のステージを作ったとき)"""
+        if self.swept:
+            gc.freeze()
+            self.swept = False
+
+    def frame(self, state):
+        """毎フレーム update の先頭で呼ぶ"""
+        pause_ms = self.frame_pause * 1000.0
+        self.frame_pause = 0.0
+        self.last_pause_ms = pause_ms
+        self.total_pause_ms += pause_ms
+        if pause_ms > self.max_pause_ms:
+            self.max_pause_ms = pause_ms
+        self.frames += 1
+
+        if state in self.active_states:
+            self.idle_frames = 0
+            self.was_active = True
+            if gc.get_count()[0] > self.valve:
+                gc.collect(0)
+            return
+
+        # 演出に入った最初のフレームで全体回収する (次のステージの生成はまだ先)
+        if self.was_active:
+            self.was_active = False
+            self.sweep()
+            return
+
+        # 演出中: 世代ごとに間隔をあけて少しずつ回収する
+        self.idle_frames += 1
+        if self.idle_frames % self.full_every == 0:
+            gc.collect(2)
+        elif self.idle_frames % self.mid_every == 0:
+            gc.collect(1)
+        else:
+            gc.collect(0)
+
+    def report(self):
+        return "gc pacing: frames=%d  collections(gen0/1/2)=%d/%d/%d  total=%.1fms  max=%.2fms  frozen=%d" % (
+            self.frames, self.collections[0], self.collections[1], self.collections[2],
+            self.total_pause_ms, self.max_pause_ms, gc.get_freeze_count())
+
+
+# ------------------------------------------------------------
+# ヒッチ (長いフレーム) 記録
+# ------------------------------------------------------------
+class HitchRecorder:
+    """
+    フレームごとのサブシステム別時間 (update / draw / spawn / audio / gc) を
+    リングバッファに残し、しきい値を超えたフレームが出たら原因の手がかりをログに書き出す。
+
+    attach() でゲームのメソッドと pyxel の音声関数を計測用ラッパーに差し替えるので、
+    ゲーム側の処理を書き換える必要はない。区間は入れ子を考慮した排他時間で集計する
+    (spawn_stage 中の時間は update に含めない)。
+    フレームが長引いている間は監視スレッドがメインスレッドのスタックを採取する。
+    """
+
+    SECTIONS = ("update", "draw", "spawn", "audio", "gc")
+    METHOD_SECTIONS = {
+        "spawn_stage": "spawn",
+        "reset_stage": "spawn",
+        "play_music_safe": "audio",
+    }
+    AUDIO_FUNCS = ("play", "playm", "stop")
+
+    def __init__(self, threshold_ms=33.0, window_frames=180, log_path="hitch_log.txt", poll_ms=4.0):
+        self.threshold = threshold_ms / 1000.0
+        self.ring = collections.deque(maxlen=window_frames)
+        self.log_path = log_path
+        self.poll = poll_ms / 1000.0
+
+        self.frame_no = 0
+        self.state = None
+        self.times = dict.fromkeys(self.SECTIONS, 0.0)
+        self.stack = []
+        self._t = 0.0
+        self.frame_start = None  # 監視スレッドが参照する (None = フレーム外)
+        self.sample = None
+        self.hitches = 0
+        self.last_ms = 0.0
+        self.overlay = False
+        self.pyxel = None
+        self.app = None
+
+        self.main_ident = threading.get_ident()
+        gc.callbacks.append(self._on_gc)
+        threading.Thread(target=self._watch, name="hitch-watchdog", daemon=True).start()
+
+    @classmethod
+    def from_argv(cls):
+        """--hitch-log 指定時のみ有効化する"""
+        return cls() if flag("--hitch-log") else None
+
+    # --- 計測対象の差し替え ---
+    def attach(self, app, pyxel_module=None):
+        """app.update / app.draw をフレーム境界として、その他の重い処理を区間として計測する"""
+        self.app = app
+        update, draw = app.update, app.draw
+
+        def frame_update(*args, **kwargs):
+            self.begin_frame(getattr(app, "state", None))
+            self._push("update")
+            try:
+                return update(*args, **kwargs)
+            finally:
+                self._pop()
+
+        def frame_draw(*args, **kwargs):
+            self._push("draw")
+            try:
+                return draw(*args, **kwargs)
+            finally:
+                self._pop()
+                if self.overlay and self.pyxel:
+                    self.draw_overlay()
+                self.end_frame()
+
+        app.update = frame_update
+        app.draw = frame_draw
+        for name, section in self.METHOD_SECTIONS.items():
+            if hasattr(app, name):
+                setattr(app, name, self.wrap(getattr(app, name), section))
+
+        if pyxel_module is not None:
+            self.pyxel = pyxel_module
+            for name in self.AUDIO_FUNCS:
+                setattr(pyxel_module, name, self.wrap(getattr(pyxel_module, name), "audio"))
+
+    def wrap(self, fn, section):
+        def timed(*args, **kwargs):
+            self._push(section)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._pop()
+        return timed
+
+    # --- 区間の排他時間 ---
+    def _push(self, section):
+        now = time.perf_counter()
+        if self.stack:
+            self.times[self.stack[-1]] += now - self._t
+        self.stack.append(section)
+        self._t = now
+
+    def _pop(self):
+        now = time.perf_counter()
+        self.times[self.stack.pop()] += now - self._t
+        self._t = now
+
+    def _on_gc(self, phase, info):
+        if self.frame_start is None:
+            return
+        if phase == "start":
+            self._push("gc")
+        elif self.stack and self.stack[-1] == "gc":
+            self._pop()
+
+    # --- フレーム境界 ---
+    def begin_frame(self, state):
+        self.state = state
+        self.times = dict.fromkeys(self.SECTIONS, 0.0)
+        self.stack = []
+        self.sample = None
+        if self.pyxel and self.pyxel.btnp(self.pyxel.KEY_F3):
+            self.overlay = not self.overlay
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        total = time.perf_counter() - self.frame_start
+        self.frame_start = None
+        self.frame_no += 1
+        self.last_ms = total * 1000.0
+        row = (self.frame_no, self.state, total, self.times)
+        self.ring.append(row)
+        if total > self.threshold:
+            self.hitches += 1
+            self.dump(row)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll)
+            start = self.frame_start
+            if start is None or self.sample is not None:
+                continue
+            elapsed = time.perf_counter() - start
+            if elapsed < self.threshold:
+                continue
+            frame = sys._current_frames().get(self.main_ident)
+            if frame is not None:
+                section = self.stack[-1] if self.stack else "?"
+                self.sample = (elapsed, section, traceback.format_stack(frame))
+
+    # --- 出力 ---
+    def dump(self, row):
+        frame_no, state, total, times = row
+        cause = max(times, key=times.get)
+        lines = ["=== HITCH frame %d: %.1f ms (threshold %.1f ms) state=%s cause=%s %.1f ms ===" % (
+            frame_no, total * 1000.0, self.threshold * 1000.0, state, cause, times[cause] * 1000.0)]
+        lines.append("%8s %-14s %8s " % ("frame", "state", "total") +
+                     " ".join("%8s" % name for name in self.SECTIONS))
+        for f, st, tot, ts in self.ring:
+            lines.append("%8d %-14s %8.2f " % (f, st, tot * 1000.0) +
+                         " ".join("%8.2f" % (ts[name] * 1000.0) for name in self.SECTIONS))
+        if self.sample:
+            elapsed, section, stack = self.sample
+            lines.append("stack sample at %.1f ms (section: %s):" % (elapsed * 1000.0, section))
+            lines.extend(line.rstrip("\n") for line in stack)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+
+    def overlay_text(self):
+        s = "%.1fms H:%d" % (self.last_ms, self.hitches)
+        # 描画の品質の段階 (ゲーム側に QualityGovernor があるとき)
+        quality = getattr(self.app, "quality", None)
+        if quality is not None:
+            s += " Q:%d" % quality.tier
+        return s
+
+    def draw_overlay(self):
+        s = self.overlay_text()
+        w = self.pyxel.width
+        self.pyxel.rect(w - len(s) * 4 - 2, 0, len(s) * 4 + 2, 7, 0)
+        self.pyxel.text(w - len(s) * 4 - 1, 1, s, 7)
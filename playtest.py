@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+自動プレイによるタイムリミットの検証 (Pyxel 版, 画面なし・複数プロセス)
+
+版ごとにタイムリミットの値がばらばら (BASE_TIME_LIMIT 18 秒と 45 秒、
+FINAL_STAGE_TIME_LIMIT_MIN 4.5 秒と 20 秒、zonbikanseiban01 の STAGE_TIME_TABLES) なので、
+決まった動きをするボットに何千回もプレイさせ、ステージ・周回ごとのクリア率と
+クリア時の残り時間の分布を出す。
+
+ボット: いちばん近い未捕獲のゾンビへ向かい、全員捕獲したら聖域への行進 (自動) を待つ
+    - DOD 系 (DODBGMPADVER02 / DODkasnseiver / ZOMBIKONTORORAKIYOU4):
+      dodenv.VecEnv (ZOMBIKONTORORAKIYOU4 と同じ規則) に各版のタイムリミットを入れて、
+      ラン数ぶんの面をまとめて進める。捕獲時の残り時間が次のステージへ持ち越される
+    - zonbikanseiban01: スクリプトの Player / Zombie / ObstacleGrid / FlowField と
+      GameApp.build_stage / update_march をそのまま使う。ボットは別の FlowField で
+      ねらったゾンビまでの道を引き、障害物を回り込む。全ステージを終えると次の周回へ進む
+
+ゲームは 1 度時間切れになるとタイトルへ戻るので、1 ランは時間切れになるまで
+(zonbikanseiban01 は --loops 周まで) 続く。各ランは乱数の種 (--seed + 番号) で再現できる。
+
+使い方:
+    python playtest.py                                   # 4 本すべて 200 ランずつ
+    python playtest.py zonbikanseiban01.py --runs 2000 --loops 4
+    python playtest.py --runs 5000 --procs 8 --seed 0
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+
+import bench
+
+SCRIPTS = [
+    "DODBGMPADVER02.py",
+    "DODkasnseiver.py",
+    "ZOMBIKONTORORAKIYOU4.py",
+    "zonbikanseiban01.py",
+]
+
+CHUNK = 25              # 1 タスク (プロセスに 1 回渡す分) のラン数
+MAX_MARCH_STEPS = 600   # 行進がこれ以上かかったら聖域に着けなかったものとする
+
+_games = {}
+
+
+def game(script):
+    """ゲームスクリプトを読み込む (プロセスごとに 1 回)"""
+    if script not in _games:
+        _games[script] = bench.load(script)
+    return _games[script]
+
+
+def is_dod(module):
+    return hasattr(module, "BASE_TIME_LIMIT")
+
+
+# ------------------------------------------------------------
+# DOD 系
+# ------------------------------------------------------------
+
+def play_dod(script, seed, runs):
+    """runs 回のランを dodenv でまとめて進める。(周回, ステージ, 制限時間, クリアしたか, 残り時間) のリストを返す"""
+    import numpy as np
+    import dodenv
+
+    g = game(script)
+    records = []
+    limit = np.full(runs, float(g.BASE_TIME_LIMIT))
+    for stage in range(1, g.MAX_STAGE_PLAY + 2):
+        if stage == g.MAX_STAGE_PLAY + 1:
+            limit = np.maximum(g.FINAL_STAGE_TIME_LIMIT_MIN, limit)
+        n = len(limit)
+        env = dodenv.VecEnv(n, stage=stage, time_limit=limit)
+        obs = env.reset(seed=[seed, stage])
+
+        # 終わった面はすぐ次のエピソードに入れ替わるので、最初のエピソードだけを見る
+        finished = np.zeros(n, dtype=bool)
+        cleared = np.zeros(n, dtype=bool)
+        marched = np.zeros(n, dtype=bool)
+        left = np.zeros(n)
+        while not finished.all():
+            obs, _, done, info = env.step(dodenv.chase_policy(obs))
+            # ゲームと同じく、全員を捕獲した時点の残り時間を次のステージへ持ち越す
+            start = ~finished & env.marching & ~marched
+            left[start] = limit[start] - env.steps[start] / dodenv.SIM_RATE
+            marched |= start
+            cleared |= ~finished & info["arrived"]
+            finished |= done
+
+        for t, ok, rest in zip(limit.tolist(), cleared.tolist(), left.tolist()):
+            records.append((1, stage, t, ok, rest if ok else 0.0))
+        limit = left[cleared]
+        if not len(limit):
+            break
+    return records
+
+
+# ------------------------------------------------------------
+# zonbikanseiban01
+# ------------------------------------------------------------
+
+class KanStage:
+    """GameApp の代わりに build_stage / update_march へ渡す入れ物 (使う属性だけを持つ)"""
+
+    def __init__(self, g):
+        self.player_pool = g.EntityPool(g.Player)
+        self.zombie_pool = g.EntityPool(g.Zombie)
+        self.player = None
+        self.captured_zombies = []
+        self.marching = False
+
+
+def build(generator):
+    """build_stage (ジェネレータ) を最後まで回して、完成した配置を返す"""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as e:
+            return e.value
+
+
+MOVES = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+STALL_STEPS = 30    # このステップ数のあいだ STALL_RANGE px 以内から出られなかったら、行き詰まったとみなす
+STALL_RANGE = 8
+DETOUR_STEPS = 20   # 行き詰まったら、でたらめな方向へこのステップ数だけ歩いて抜け出す
+
+
+class KanBot:
+    """いちばん近い未捕獲のゾンビへ向かうボット (zonbikanseiban01 用)。
+    障害物はプレイヤーの半径で作った FlowField で回り込む"""
+
+    def __init__(self, g, obstacles, grid):
+        self.g = g
+        self.grid = grid
+        self.route = g.FlowField(obstacles, g.PLAYER_R + 1)
+        self.anchor = (0.0, 0.0)
+        self.stall = 0
+        self.detour = 0
+        self.detour_move = (0, 0)
+
+    def move(self, player, zombies):
+        """このステップの方向キーの入力 (dx, dy)"""
+        px, py = player.x, player.y
+        ax, ay = self.anchor
+        if (px - ax) ** 2 + (py - ay) ** 2 > STALL_RANGE * STALL_RANGE:
+            self.anchor = (px, py)
+            self.stall = 0
+        else:
+            self.stall += 1
+        if self.detour:
+            self.detour -= 1
+            return self.detour_move
+        if self.stall > STALL_STEPS:
+            # 壁の角や 2 体のゾンビの間で行ったり来たりしている
+            self.stall = 0
+            self.detour = DETOUR_STEPS
+            self.detour_move = random.choice(MOVES)
+            return self.detour_move
+
+        free = [z for z in zombies if z.state != "captured"]
+        if not free:
+            return 0, 0
+        g = self.g
+        target = min(free, key=lambda z: (z.x - px) ** 2 + (z.y - py) ** 2)
+        dx = target.x - px
+        dy = target.y - py
+        d = (dx * dx + dy * dy) ** 0.5
+        if d == 0:
+            return 0, 0
+
+        self.route.update(target.x, target.y)
+        ux, uy = self.route.steer(px, py, dx / d, dy / d)
+
+        # 8 方向の入力を実際に動かしてみて、その向きにいちばん進めるものを選ぶ
+        # (壁に正面から押し付けたまま止まらず、滑って回り込む)
+        sp = g.PLAYER_SPEED * player.speed_factor
+        best = (0, 0)
+        best_gain = 0.0
+        for kx, ky in MOVES:
+            nx, ny, _, _ = g.resolve_move(px, py, px + kx * sp, py + ky * sp, g.PLAYER_R, self.grid)
+            nx = g.clamp(nx, g.PLAYER_R, g.WINDOW_W - 1 - g.PLAYER_R)
+            ny = g.clamp(ny, g.UI_HEIGHT + g.PLAYER_R, g.WINDOW_H - 1 - g.PLAYER_R)
+            gain = (nx - px) * ux + (ny - py) * uy
+            if gain > best_gain:
+                best, best_gain = (kx, ky), gain
+        return best
+
+
+def play_kan_stage(g, sim, stage, speed_factor, limit):
+    """1 ステージをボットでプレイする。(クリアしたか, 全員捕獲した時点の残り時間) を返す"""
+    obstacles, player, dummy_players, zombies = build(g.GameApp.build_stage(sim, stage, speed_factor))
+    grid = g.ObstacleGrid(obstacles)
+    flow = g.FlowField(obstacles)
+    bot = KanBot(g, obstacles, grid)
+    captured = []
+    sim.player = player
+    sim.captured_zombies = captured
+    sim.marching = False
+
+    result = None
+    ticks = 0
+    while result is None:
+        player.prev_x, player.prev_y = player.x, player.y
+        dx, dy = bot.move(player, zombies)
+        if dx or dy:
+            sp = g.PLAYER_SPEED * player.speed_factor
+            player.x, player.y, _, _ = g.resolve_move(player.x, player.y, player.x + dx * sp,
+                                                      player.y + dy * sp, g.PLAYER_R, grid)
+        player.update(grid, controllable=False)  # 画面端の制限と軌跡
+        flow.update(player.x, player.y)
+        for z in zombies:
+            z.update(player, grid, captured, flow)
+        for z in zombies:
+            if z.state == "captured" and z not in captured:
+                captured.append(z)
+
+        # ゲームと同じく、全員捕獲と同じステップで時間切れになったら時間切れが優先
+        elapsed = ticks / g.SIM_RATE
+        if elapsed >= limit:
+            result = (False, 0.0)
+        elif len(captured) == len(zombies):
+            result = (True, limit - elapsed)
+        ticks += 1
+
+    if result[0]:
+        # 聖域への行進 (時間は数えない)
+        sim.marching = True
+        sanctuary_x = g.WINDOW_W - g.SANCTUARY_W
+        for _ in range(MAX_MARCH_STEPS):
+            player.update(grid, controllable=False)
+            for z in zombies:
+                z.update(player, grid, captured, flow)
+            g.GameApp.update_march(sim)
+            if player.x >= sanctuary_x and all(z.x >= sanctuary_x for z in captured):
+                break
+        else:
+            result = (False, 0.0)
+
+    sim.player_pool.release([player] + dummy_players)
+    sim.zombie_pool.release(zombies)
+    return result
+
+
+def play_kan(script, seed, runs, loops):
+    """runs 回のランを 1 回ずつプレイする。返り値は play_dod と同じ形"""
+    g = game(script)
+    tables = g.STAGE_TIME_TABLES
+    records = []
+    for i in range(runs):
+        random.seed(seed + i)
+        sim = KanStage(g)
+        for loop in range(loops):
+            speed_factor = 1.0 + loop * 0.2  # spawn_stage と同じ (cleared_count = loop)
+            tt = tables[min(loop, len(tables) - 1)]
+            ok = True
+            for stage in range(1, g.MAX_STAGE_PLAY + 2):
+                ok, left = play_kan_stage(g, sim, stage, speed_factor, tt[stage])
+                records.append((loop + 1, stage, tt[stage], ok, left))
+                if not ok:
+                    break
+            if not ok:
+                break
+    return records
+
+
+# ------------------------------------------------------------
+# 実行と集計
+# ------------------------------------------------------------
+
+def play(task):
+    script, seed, runs, loops = task
+    if is_dod(game(script)):
+        return script, play_dod(script, seed, runs)
+    return script, play_kan(script, seed, runs, loops)
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(script, records, runs):
+    g = game(script)
+    if is_dod(g):
+        print("%s  BASE_TIME_LIMIT %.1f  BONUS_TIME_AFTER_CLEAR %.1f  FINAL_STAGE_TIME_LIMIT_MIN %.1f" % (
+            script, g.BASE_TIME_LIMIT, g.BONUS_TIME_AFTER_CLEAR, g.FINAL_STAGE_TIME_LIMIT_MIN))
+    else:
+        print("%s  STAGE_TIME_TABLES %s" % (script, [t[1:] for t in g.STAGE_TIME_TABLES]))
+
+    table = {}
+    for loop, stage, limit, ok, left in records:
+        row = table.setdefault((loop, stage), ([], []))
+        row[0].append(limit)
+        if ok:
+            row[1].append(left)
+    print("  %-5s %-5s %7s %6s %7s %8s %6s %6s" % ("loop", "stage", "limit", "runs", "clear%", "left p10", "p50", "p90"))
+    for (loop, stage), (limits, lefts) in sorted(table.items()):
+        print("  %-5d %-5d %7.1f %6d %7.1f %8.1f %6.1f %6.1f" % (
+            loop, stage, percentile(limits, 0.5), len(limits), 100.0 * len(lefts) / len(limits),
+            percentile(lefts, 0.1), percentile(lefts, 0.5), percentile(lefts, 0.9)))
+    final = game(script).MAX_STAGE_PLAY + 1
+    cleared = sum(1 for loop, stage, _, ok, _ in records if loop == 1 and stage == final and ok)
+    print("  1 周クリア %d / %d (%.1f%%)" % (cleared, runs, 100.0 * cleared / runs))
+    print()
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    runs = option("--runs", 200)
+    loops = option("--loops", 4)
+    procs = option("--procs", multiprocessing.cpu_count())
+    seed = option("--seed", 0)
+    scripts = [a for a in args if a.endswith(".py")] or SCRIPTS
+
+    tasks = []
+    for script in scripts:
+        for start in range(0, runs, CHUNK):
+            tasks.append((script, seed + start, min(CHUNK, runs - start), loops))
+
+    results = {script: [] for script in scripts}
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(procs) as pool:
+        for script, records in pool.imap_unordered(play, tasks):
+            results[script].extend(records)
+    print("%d runs x %d scripts, %d processes, %.1fs\n" % (runs, len(scripts), procs, time.perf_counter() - t0))
+
+    for script in scripts:
+        report(script, results[script], runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+DOD のエンドレスモード (--endless) の耐久試験 (画面なし)
+
+ゲームスクリプトの GameApp をそのまま (ウィンドウを開かずに) 起動し、ボットにエンドレスモードを
+長時間プレイさせる。ゲーム内の 1 分ごとに
+    zombies  : 画面上のゾンビ数 (捕獲済みを含む)
+    created  : Zombie プールがこれまでに生成した数 (使い回せていれば途中で増えなくなる)
+    particles: 全エンティティの粒子の合計
+    trail    : プレイヤーの軌跡の長さ
+    objects  : GC が追跡しているオブジェクト数 (gc.freeze で永続世代へ移した分を含む)
+    rss      : プロセスの最大常駐メモリ (MB)
+    p50/p99  : 1 フレーム (update + draw) の時間 (ms)
+    worst    : その 1 分でいちばん遅かったフレームの時間 (ms)。プレイ中の GC の停止などはここに出る
+を表示し、最後に前半と後半の最大値を比べて、メモリと 1 フレームの手間が頭打ちになっているかを判定する
+(短すぎると判定できないので MIN_MINUTES 分以上回す)。
+時間切れで終わらないよう、持ち時間は無限にする。ボットは近くのゾンビを捕まえ、
+列が長くなったら聖域へ預けに行く。
+
+使い方:
+    python soak.py                                  # DODBGMPADVER02.py をゲーム内 60 分
+    python soak.py --minutes 10 ZOMBIKONTORORAKIYOU4.py
+"""
+
+import gc
+import os
+import random
+import resource
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")  # ウィンドウを開かない
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pyxel
+
+import bench
+
+BANK_AT = 6          # 列がこの数になったら預けに行く
+MIN_MINUTES = 10     # 頭打ちかどうかを判定する最短の長さ (ゲーム内の分)
+
+
+class Bot:
+    """pyxel.btn の代わり。GameApp を見て、押しているキーを決める"""
+
+    def __init__(self, g):
+        self.g = g
+        self.app = None
+        self.held = set()
+        self.pressed = set()  # このフレームで押し始めたキー (btnp)
+        self.banking = False
+
+    def btn(self, key):
+        return key in self.held
+
+    def btnp(self, key, *args, **kwargs):
+        return key in self.pressed
+
+    def decide(self):
+        before = set(self.held)
+        self.choose()
+        self.pressed = self.held - before
+
+    def choose(self):
+        g, app = self.g, self.app
+        held = self.held
+        held.clear()
+        if app.state in ("TITLE", "TUTORIAL"):
+            # 押しっぱなしだと btnp は 1 回しか効かないので、1 フレームおきに押し直す
+            if pyxel.KEY_RETURN not in self.pressed:
+                held.add(pyxel.KEY_RETURN)
+            return
+        if app.state != "ENDLESS":
+            return
+        p = app.player
+        if len(app.captured_zombies) >= BANK_AT:
+            self.banking = True
+        elif not app.captured_zombies:
+            self.banking = False
+        free = [z for z in app.zombies if z.state != "captured"]
+        if self.banking or not free:
+            tx, ty = g.WINDOW_W - g.SANCTUARY_W // 2, p.y
+        else:
+            z = min(free, key=lambda z: (z.x - p.x) ** 2 + (z.y - p.y) ** 2)
+            tx, ty = z.x, z.y
+        if tx < p.x - 1:
+            held.add(pyxel.KEY_LEFT)
+        elif tx > p.x + 1:
+            held.add(pyxel.KEY_RIGHT)
+        if ty < p.y - 1:
+            held.add(pyxel.KEY_UP)
+        elif ty > p.y + 1:
+            held.add(pyxel.KEY_DOWN)
+
+
+def sample(app, frame_times):
+    particles = 0
+    for e in app.players + app.zombies:
+        particles += len(getattr(e, "captured_particles", ()))
+        particles += len(getattr(e, "dust_particles", ()))
+        particles += len(getattr(e, "transform_particles", ()))
+    frame_times.sort()
+    p50 = frame_times[len(frame_times) // 2] * 1e3
+    p99 = frame_times[int(len(frame_times) * 0.99)] * 1e3
+    worst = frame_times[-1] * 1e3
+    return (len(app.zombies), app.zombie_pool.created, particles, len(app.player.trail),
+            len(gc.get_objects()) + gc.get_freeze_count(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+            p50, p99, worst)
+
+
+def main():
+    args = sys.argv[1:]
+    minutes = int(args[args.index("--minutes") + 1]) if "--minutes" in args else 60
+    scripts = [a for a in args if a.endswith(".py")] or ["DODBGMPADVER02.py"]
+    script = scripts[0]
+
+    random.seed(0)
+    g = bench.load(script)
+    g.ENDLESS_TIME_LIMIT = float("inf")
+    bot = Bot(g)
+    pyxel.btn = bot.btn
+    pyxel.btnp = bot.btnp
+    frames_per_minute = g.SIM_RATE * 60  # 描画 1 フレームで 1 ステップ (pyxel.init の fps = SIM_RATE)
+    rows = []
+
+    def run(update, draw, *run_args, **run_kwargs):
+        app = bot.app = update.__self__  # GameApp.__init__ が pyxel.run(self.update, self.draw) で渡すメソッド
+        app.clock.steps = lambda: 1
+        while app.state != "ENDLESS":
+            bot.decide()
+            update()
+        print("%s: endless mode, %d game minutes" % (script, minutes))
+        print("%-4s %7s %8s %9s %6s %8s %7s %7s %7s %8s %6s" % (
+            "min", "zombies", "created", "particles", "trail", "objects", "rss MB", "p50 ms", "p99 ms", "worst ms",
+            "banked"))
+        t0 = time.perf_counter()
+        for minute in range(1, minutes + 1):
+            frame_times = []
+            for _ in range(frames_per_minute):
+                bot.decide()
+                f0 = time.perf_counter()
+                update()
+                draw()
+                frame_times.append(time.perf_counter() - f0)
+            row = sample(app, frame_times)
+            rows.append(row)
+            print("%-4d %7d %8d %9d %6d %8d %7.1f %7.2f %7.2f %8.2f %6d" % ((minute,) + row + (app.banked,)))
+        print("%.1fs" % (time.perf_counter() - t0))
+        raise SystemExit(0)
+
+    pyxel.run = run
+    sys.argv = [script, "--endless"]
+    try:
+        g.GameApp()
+    except SystemExit:
+        pass
+
+    if len(rows) < MIN_MINUTES:
+        print("too short to judge (need --minutes %d or more)" % MIN_MINUTES)
+        return
+
+    # 後半の最大値が前半の最大値を超えて増え続けていないか
+    first = rows[:len(rows) // 2]
+    second = rows[len(rows) // 2:]
+
+    def peak(part, column):
+        return max(row[column] for row in part)
+
+    created_growth = peak(second, 1) - peak(first, 1)
+    objects_growth = (peak(second, 4) - peak(first, 4)) / max(1, peak(first, 4))
+    rss_growth = (peak(second, 5) - peak(first, 5)) / max(1.0, peak(first, 5))
+    print("peak first half → second half: created +%d, objects %+.1f%%, rss %+.1f%%, p99 %.2f → %.2f ms, "
+          "worst %.2f → %.2f ms" % (created_growth, objects_growth * 100, rss_growth * 100,
+                                    peak(first, 7), peak(second, 7), peak(first, 8), peak(second, 8)))
+    bounded = created_growth <= 0 and objects_growth < 0.05 and rss_growth < 0.05
+    print("bounded" if bounded else "NOT bounded")
+
+
+if __name__ == "__main__":
+    main()
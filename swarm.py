@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Tkinter 版 (zonbigamekai01.py) のゾンビ群を、共有メモリの配列にして複数プロセスで動かす (NumPy)
+
+10 万体を超えるような負荷試験・デモ用 (画面なし)。配列にしても 1 コアでは足りないので、
+    - ゾンビの座標と速さは multiprocessing.shared_memory の (3, N) の配列に置く
+    - ワーカープロセスはそれぞれ担当の範囲 (スライス) だけを Zombie.update と同じ式で進め、
+      自分の範囲でいちばんプレイヤーに近いゾンビとの距離 (の 2 乗) を書き込む
+    - 親プロセスはプレイヤー・旗・衝突 (被弾と無敵時間) を受け持つ
+    - 1 フレームに 2 回 Barrier で足並みをそろえる:
+      親がプレイヤーの位置を書く → [開始] → 全ワーカーが 1 ステップ → [完了] → 親が衝突と旗を判定
+ゾンビどうしは影響し合わないので、ワーカーの間で受け渡すものは無い。
+
+使い方:
+    python swarm.py                                    # 10 万体。ワーカー 1, 2, 4, ... CPU 数 で速さを比べる
+    python swarm.py --zombies 200000 --frames 300 --workers 4
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+try:
+    import kernels  # Numba で JIT コンパイルしたループ (任意)。numba が無ければ NumPy の配列演算で計算する
+    if not kernels.ENABLED:
+        kernels = None
+except ImportError:
+    kernels = None
+
+from difficulty import TkStage
+from playtest import game
+
+SCRIPT = "zonbigamekai01.py"
+
+# 制御用の共有配列の並び: プレイヤー X, プレイヤー Y, 終了フラグ, ワーカーごとの最小距離の 2 乗
+CTRL_PX = 0
+CTRL_PY = 1
+CTRL_STOP = 2
+CTRL_MIN_D2 = 3
+
+KIND_WEIGHTS = (0.7, 0.25, 0.05)  # walker, shambler, sprinter の割合 (build_stage と同じ)
+KIND_SPEEDS = (1.0, 0.7, 1.3)     # 種類ごとの速さの倍率 (Zombie.reset と同じ)
+
+
+def step_slice(x, y, speed, px, py, lo_x, hi_x, lo_y, hi_y):
+    """Zombie.update と同じ動き (プレイヤーへまっすぐ進み、画面内に収める)。
+    最も近いゾンビとの距離の 2 乗を返す"""
+    if kernels:
+        return kernels.chase(x, y, speed, px, py, lo_x, hi_x, lo_y, hi_y)
+    dx = px - x
+    dy = py - y
+    k = speed / (np.hypot(dx, dy) + 1e-6)
+    x += dx * k
+    y += dy * k
+    np.clip(x, lo_x, hi_x, out=x)
+    np.clip(y, lo_y, hi_y, out=y)
+    if not len(x):
+        return np.inf
+    dx = x - px
+    dy = y - py
+    return float((dx * dx + dy * dy).min())
+
+
+def _worker(index, entities_name, ctrl_name, count, lo, hi, bounds, barrier):
+    """ワーカープロセス。[lo, hi) のゾンビを毎フレーム 1 ステップ進める"""
+    entities_shm = shared_memory.SharedMemory(name=entities_name)
+    ctrl_shm = shared_memory.SharedMemory(name=ctrl_name)
+    entities = np.ndarray((3, count), dtype=np.float64, buffer=entities_shm.buf)
+    ctrl = np.ndarray(CTRL_MIN_D2 + index + 1, dtype=np.float64, buffer=ctrl_shm.buf)
+    x = entities[0, lo:hi]
+    y = entities[1, lo:hi]
+    speed = entities[2, lo:hi]
+    try:
+        while True:
+            barrier.wait()
+            if ctrl[CTRL_STOP]:
+                break
+            ctrl[CTRL_MIN_D2 + index] = step_slice(x, y, speed, ctrl[CTRL_PX], ctrl[CTRL_PY], *bounds)
+            barrier.wait()
+    finally:
+        # 配列 (共有メモリへのビュー) を先に捨てないと close できない
+        del entities, ctrl, x, y, speed
+        entities_shm.close()
+        ctrl_shm.close()
+
+
+class SharedHorde:
+    """count 体のゾンビを共有メモリに置き、workers 個のプロセスで分けて進める。
+    workers が 0 なら親プロセスだけで進める (比べるための基準)"""
+
+    def __init__(self, g, count, workers, loop=0, seed=None):
+        self.count = count
+        self.workers = workers
+        half = g.ZOMBIE_SIZE / 2
+        self.bounds = (half, g.WINDOW_W - half, half, g.WINDOW_H - half)
+
+        self.entities_shm = shared_memory.SharedMemory(create=True, size=3 * count * 8)
+        self.ctrl_shm = shared_memory.SharedMemory(create=True, size=(CTRL_MIN_D2 + max(1, workers)) * 8)
+        self.entities = np.ndarray((3, count), dtype=np.float64, buffer=self.entities_shm.buf)
+        self.ctrl = np.ndarray(CTRL_MIN_D2 + max(1, workers), dtype=np.float64, buffer=self.ctrl_shm.buf)
+        self.ctrl[:] = 0.0
+
+        # 配置と速さは build_stage / Zombie.reset と同じ規則
+        rng = np.random.default_rng(seed)
+        self.entities[0] = rng.integers(g.WINDOW_W - 80, g.WINDOW_W - 20, count, endpoint=True)
+        self.entities[1] = rng.integers(20, g.WINDOW_H - 20, count, endpoint=True)
+        kind = rng.choice(len(KIND_SPEEDS), count, p=KIND_WEIGHTS)
+        self.entities[2] = g.ZOMBIE_BASE_SPEED * (1.0 + loop * 0.1) * np.take(KIND_SPEEDS, kind)
+
+        self.procs = []
+        if workers:
+            self.barrier = multiprocessing.Barrier(workers + 1)
+            edges = np.linspace(0, count, workers + 1).astype(int)
+            for i in range(workers):
+                p = multiprocessing.Process(target=_worker, daemon=True, args=(
+                    i, self.entities_shm.name, self.ctrl_shm.name, count,
+                    int(edges[i]), int(edges[i + 1]), self.bounds, self.barrier))
+                p.start()
+                self.procs.append(p)
+
+    def step(self, px, py):
+        """全ゾンビを 1 ステップ進め、プレイヤーにいちばん近いゾンビとの距離の 2 乗を返す"""
+        if not self.workers:
+            e = self.entities
+            return step_slice(e[0], e[1], e[2], px, py, *self.bounds)
+        self.ctrl[CTRL_PX] = px
+        self.ctrl[CTRL_PY] = py
+        self.barrier.wait()  # 開始
+        self.barrier.wait()  # 全ワーカーの完了
+        return float(self.ctrl[CTRL_MIN_D2:].min())
+
+    def close(self):
+        if self.procs:
+            self.ctrl[CTRL_STOP] = 1.0
+            self.barrier.wait()
+            for p in self.procs:
+                p.join()
+            self.procs = []
+        del self.entities, self.ctrl
+        for shm in (self.entities_shm, self.ctrl_shm):
+            shm.close()
+            shm.unlink()
+
+
+def run(g, count, workers, frames, seed=0):
+    """ステージ 1 を frames フレーム進め、(1 秒あたりのフレーム数, 被弾回数, 取った旗の数) を返す。
+    プレイヤーは旗へまっすぐ向かうだけ。HP が尽きても止めずに数え続ける"""
+    random.seed(seed)
+    stage = TkStage(g, 1, 0)
+    player = stage.player
+    keys = stage.keys
+    hit_d2 = ((g.ZOMBIE_SIZE + g.PLAYER_SIZE) / 2) ** 2
+    hits = 0
+
+    horde = SharedHorde(g, count, workers, seed=seed)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            flags = [f for f in stage.flags if not f.collected]
+            if flags:
+                f = min(flags, key=lambda f: (f.x - player.x) ** 2 + (f.y - player.y) ** 2)
+                keys['left'] = f.x < player.x - 2
+                keys['right'] = f.x > player.x + 2
+                keys['up'] = f.y < player.y - 2
+                keys['down'] = f.y > player.y + 2
+            player.update(keys)
+
+            # 衝突 (Game.update と同じく、当たったら無敵時間の間は減らない)
+            if horde.step(player.x, player.y) < hit_d2 and player.invincible_timer == 0:
+                player.hp -= 1
+                player.invincible_timer = g.INVINCIBILITY_FRAMES
+                hits += 1
+
+            for f in stage.flags:
+                if not f.collected and g.dist((player.x, player.y), (f.x, f.y)) < 14:
+                    f.collected = True
+                    player.collected_flags += 1
+        secs = time.perf_counter() - t0
+    finally:
+        horde.close()
+    return frames / secs, hits, player.collected_flags
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    count = option("--zombies", 100000)
+    frames = option("--frames", 200)
+    cores = multiprocessing.cpu_count()
+    if "--workers" in args:
+        counts = sorted({1, option("--workers", 1)})  # 効率は 1 ワーカーとの比で出す
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cores:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cores:
+            counts.append(cores)
+
+    g = game(SCRIPT)
+    print("zombies %d  frames %d  cores %d" % (count, frames, cores))
+    base, _, _ = run(g, count, 0, frames)
+    print("%-8s %10s %9s %11s" % ("workers", "frames/s", "speedup", "efficiency"))
+    print("%-8s %10.1f %9s %11s" % ("0 (main)", base, "-", "-"))
+    one = None
+    for workers in counts:
+        fps, hits, flags = run(g, count, workers, frames)
+        one = one or fps
+        print("%-8d %10.1f %8.2fx %10.0f%%" % (workers, fps, fps / one, 100.0 * fps / one / workers))
+    print("hits %d  flags %d (last run)" % (hits, flags))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+kernels.py の経路と NumPy の経路が同じ結果になることを確かめる (pytest)
+
+horde.py / swarm.py を同じ乱数の種から
+    NumPy の配列演算 (kernels なし) / kernels の純 Python 版 / kernels のコンパイル版 (numba があるときだけ)
+で動かし、全ゾンビの座標・速度・向き・状態が 1 ビットも違わないことを見る。
+
+    python -m pytest -q test_kernels.py
+"""
+
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import horde
+import kernels
+import swarm
+
+# DOD (ゲームスクリプト) と同じ値
+WINDOW_W = 160
+WINDOW_H = 120
+UI_HEIGHT = 20
+SANCTUARY_W = 16
+PLAYER_R = 5
+ZOMBIE_R = 4
+FOLLOW_DISTANCE = 12
+TRAIL_MAX_LENGTH = 200
+
+PATHS = ["numpy", "python", "numba"]
+
+
+def use_path(monkeypatch, path):
+    """horde.py / swarm.py が使う kernels を path の経路に差し替える"""
+    if path == "numpy":
+        impl = None
+    elif path == "python":
+        impl = SimpleNamespace(**kernels.PYTHON)
+    else:
+        pytest.importorskip("numba")
+        impl = kernels
+    monkeypatch.setattr(horde, "kernels", impl)
+    monkeypatch.setattr(swarm, "kernels", impl)
+
+
+def run_horde(count=240, frames=240, seed=0):
+    """プレイヤーが画面を 8 の字に回ってゾンビを捕まえていく。最後の状態 (pack) を返す"""
+    rng = np.random.default_rng(seed)
+    zombies = [SimpleNamespace(x=float(rng.uniform(ZOMBIE_R, WINDOW_W - SANCTUARY_W - ZOMBIE_R)),
+                               y=float(rng.uniform(UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)),
+                               vx=float(rng.uniform(-0.4, 0.4)), vy=float(rng.uniform(-0.4, 0.4)),
+                               speed_factor=float(rng.choice([0.8, 1.0, 1.3])), dir=1, state="wander")
+               for _ in range(count)]
+    h = horde.Horde(WINDOW_W, WINDOW_H, UI_HEIGHT, SANCTUARY_W, PLAYER_R, ZOMBIE_R, FOLLOW_DISTANCE, seed=seed)
+    h.load(zombies)
+    player = SimpleNamespace(x=80.0, y=70.0, is_zombified=False, trail=[(80.0, 70.0)] * TRAIL_MAX_LENGTH)
+    captured = 0
+    for t in range(frames):
+        player.x = 80.0 + 60.0 * math.sin(t * 0.03)
+        player.y = 70.0 + 40.0 * math.sin(t * 0.06)
+        player.trail.insert(0, (player.x, player.y))
+        del player.trail[TRAIL_MAX_LENGTH:]
+        captured += len(h.update(player))
+    return h.pack(), captured
+
+
+def run_swarm(count=5000, frames=60, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 640, count)
+    y = rng.uniform(0, 480, count)
+    speed = rng.choice([1.26, 1.8, 2.34], count)
+    nearest = []
+    for t in range(frames):
+        nearest.append(swarm.step_slice(x, y, speed, 320.0 + 200.0 * math.cos(t * 0.1), 240.0, 6.0, 634.0, 6.0, 474.0))
+    return x.tobytes() + y.tobytes(), nearest
+
+
+@pytest.mark.parametrize("path", PATHS[1:])
+def test_horde_matches_numpy(monkeypatch, path):
+    use_path(monkeypatch, "numpy")
+    expected, captured = run_horde()
+    assert captured > 0  # 捕獲・隊列の経路も通っている
+    use_path(monkeypatch, path)
+    assert run_horde() == (expected, captured)
+
+
+@pytest.mark.parametrize("path", PATHS[1:])
+def test_swarm_matches_numpy(monkeypatch, path):
+    use_path(monkeypatch, "numpy")
+    expected = run_swarm()
+    use_path(monkeypatch, path)
+    assert run_swarm() == expected
+
+
+def test_swarm_empty_slice(monkeypatch):
+    for path in ("numpy", "python"):
+        use_path(monkeypatch, path)
+        assert swarm.step_slice(np.empty(0), np.empty(0), np.empty(0), 0.0, 0.0, 6.0, 634.0, 6.0, 474.0) == np.inf
@@ -12,8 +12,14 @@ Tkinter ゾンビゲーム (Thonny などで動く) - 難易度上昇版
 import tkinter as tk
 import random
 import math
+import sys
 import time
 
+try:
+    import perfkit  # 計測ツール (任意)
+except ImportError:
+    perfkit = None
+
 # --- ゲーム設定 ---
 WINDOW_W = 640
 WINDOW_H = 480
@@ -28,6 +34,16 @@ CLEAR_TIME = 10 * FPS     # 10秒
 GAMEOVER_TIME = 3 * FPS   # 3秒
 ENDING_TIME = 10 * FPS    # 10秒
 
+# --- 早送り (テスト用) ---
+# 描画 1 フレームあたりに進めるステップ数。T キーで順に切り替え、起動時は --turbo 2|8|max で指定する。
+# 1 ステップの動き (game_speed) は変えずにステップの回数を増やすので、当たり判定は等速と同じ
+TURBO_MAX = 0             # 画面を描かず、1 フレームの時間の中で進められるだけ進める
+TURBO_SPEEDS = (1, 2, 8, TURBO_MAX)
+TURBO_MAX_BUDGET = TICK_MS / 1000.0 * 0.8  # TURBO_MAX で 1 フレームに使う時間 (残りはキー入力の処理に回す)
+
+# プレイ中のステート。この間は GC を止めておく (perfkit.GCPacer)
+GC_ACTIVE_STATES = ("playing",)
+
 # --- 難易度設定 ---
 INITIAL_FLAGS = 3   
 FLAG_INCREMENT = 2  
@@ -64,6 +80,9 @@ def dist(a, b): return math.hypot(a[0]-b[0], a[1]-b[1])
 # ----------------------------
 # Agent 基底
 class Agent:
+    # 属性を固定して __dict__ を持たせない (ゾンビは最大 800 体になるためメモリと属性アクセスを軽くする)
+    __slots__ = ("x", "y", "size")
+
     def __init__(self, x, y, size):
         self.x = float(x)
         self.y = float(y)
@@ -72,6 +91,8 @@ class Agent:
 # ----------------------------
 # プレイヤー（人間）
 class Player(Agent):
+    __slots__ = ("color", "stamina", "max_speed", "collected_flags", "hp", "invincible_timer", "angle")
+
     def __init__(self, x, y):
         super().__init__(x, y, PLAYER_SIZE)
         self.color = PLAYER_COLOR
@@ -141,8 +162,16 @@ class Player(Agent):
 # ----------------------------
 # ゾンビ
 class Zombie(Agent):
+    __slots__ = ("kind", "color", "base_speed", "phase")
+
     def __init__(self, x, y, kind="walker", difficulty_level=0):
         super().__init__(x, y, ZOMBIE_SIZE)
+        self.reset(x, y, kind, difficulty_level)
+
+    def reset(self, x, y, kind="walker", difficulty_level=0):
+        """プールから再利用するときも、新規生成と同じ状態に初期化する"""
+        self.x = float(x)
+        self.y = float(y)
         self.kind = kind
         self.color = ZOMBIE_COLOR
         
@@ -188,6 +217,8 @@ class Zombie(Agent):
 # ----------------------------
 # 旗（フラッグ）
 class Flag:
+    __slots__ = ("x", "y", "collected")
+
     def __init__(self, x, y):
         self.x = x; self.y = y
         self.collected = False
@@ -198,6 +229,79 @@ class Flag:
         canvas.create_rectangle(x-4, y-8, x-2, y+8, fill="#BBB000", outline="")
         canvas.create_polygon(x-1, y-8, x+10, y-4, x-1, y, fill=FLAG_COLOR, outline="")
 
+# ----------------------------
+# 次ステージの先行生成
+class StagePrefetch:
+    """次のステージの配置を、クリア画面など演出中のフレームに分けて前もって生成しておく"""
+
+    def __init__(self, budget=0.004, discard=None):
+        self.budget = budget  # 1 フレームあたりに使ってよい生成時間 (秒)
+        self.key = None
+        self.builder = None
+        self.layout = None
+        self.discard = discard  # 使わずに捨てる完成済みの配置を受け取る (借りたエンティティをプールへ返す)
+
+    def step(self, key, make_builder, budget=None):
+        """演出中に毎フレーム呼ぶ。key (ステージ番号など) が変わったら作り直す"""
+        if key != self.key:
+            self.cancel()
+            self.key = key
+            self.builder = make_builder()
+            self.layout = None
+        if self.layout is not None:
+            return
+        end = time.perf_counter() + (self.budget if budget is None else budget)
+        try:
+            while time.perf_counter() < end:
+                next(self.builder)
+        except StopIteration as e:
+            self.layout = e.value
+
+    def take(self, key, make_builder):
+        """ステージ開始時に呼ぶ。生成が終わっていなければ残りをこの場で生成する"""
+        while key != self.key or self.layout is None:
+            self.step(key, make_builder, budget=float("inf"))
+        layout = self.layout
+        self.key = self.builder = self.layout = None
+        return layout
+
+    def cancel(self):
+        """生成途中・生成済みの配置を捨てる (key が変わったときなど)。
+        生成途中のジェネレータは close() で止め (借りた分はジェネレータが返す)、完成済みの配置は discard に渡す"""
+        if self.layout is not None:
+            if self.discard:
+                self.discard(self.layout)
+        elif self.builder is not None:
+            self.builder.close()
+        self.key = self.builder = self.layout = None
+
+# ----------------------------
+# エンティティのプール
+class EntityPool:
+    """Zombie を使い回すプール。ステージ切り替えで捨てたインスタンスを回収し、
+    次に acquire されたとき reset() でその場で初期化し直す"""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0     # これまでに生成したインスタンス数 (= プールの大きさ)
+        self.high_water = 0  # 同時に使用中だった数の最大値
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+        in_use = self.created - len(self.free)
+        if in_use > self.high_water:
+            self.high_water = in_use
+        return obj
+
+    def release(self, objs):
+        self.free.extend(objs)
+
 # ----------------------------
 # ゲームクラス
 class Game:
@@ -222,6 +326,7 @@ class Game:
         root.bind("<KeyPress>", self.on_key_down)
         root.bind("<KeyRelease>", self.on_key_up)
         root.bind("<space>", self.on_space)
+        root.bind("<t>", self.on_turbo)
 
         # world
         self.player = Player(40, WINDOW_H//2)
@@ -229,6 +334,21 @@ class Game:
         self.flags = []
         self.target_flags = 0 
         self.clear_bonus = 0 # ステージクリア時のスコアボーナス
+        self.stage_prefetch = StagePrefetch(discard=self.release_layout)
+        self.zombie_pool = EntityPool(Zombie) # ステージをまたいでゾンビを使い回す
+
+        # 早送り (--turbo 2|8|max)
+        args = sys.argv[1:]
+        turbo = args[args.index("--turbo") + 1] if "--turbo" in args else "1"
+        self.turbo = TURBO_MAX if turbo == "max" else max(1, int(turbo))
+        self.turbo_steps = self.turbo  # 直前の描画フレームで進めたステップ数
+
+        # GC ペーシング (--no-gc-pacing で無効)
+        self.gc_pacer = perfkit.GCPacer.from_argv(GC_ACTIVE_STATES) if perfkit else None
+        # ヒッチ記録 (--hitch-log)
+        self.hitch = perfkit.HitchRecorder.from_argv() if perfkit else None
+        if self.hitch:
+            self.hitch.attach(self)
 
         # 初期化
         self.reset_stage(initial=True)
@@ -264,6 +384,11 @@ class Game:
         elif self.state == 'ending':
             self.start_new_loop()
 
+    def on_turbo(self, e):
+        # 早送りの速さを 1x → 2x → 8x → 最大 → 1x の順に切り替える
+        i = TURBO_SPEEDS.index(self.turbo) if self.turbo in TURBO_SPEEDS else 0
+        self.turbo = TURBO_SPEEDS[(i + 1) % len(TURBO_SPEEDS)]
+
     # --- 状態遷移ヘルパー ---
     def start_game(self):
         self.state = 'playing'
@@ -300,29 +425,21 @@ class Game:
     def reset_stage(self, initial=False):
         """ステージの初期化。ゾンビの数をステージクリアごとに増やす"""
 
-        # 1. パラメータの計算 (ゾンビ数の増加ロジック)
-        
-        # ステージ進行によるゾンビ数の増加 (加算)
-        stage_zombies = BASE_ZOMBIES + (self.stage - 1) * ZOMBIE_INCREASE_PER_STAGE
-        
-        # ループレベルによるゾンビ数の増加 (乗算)
-        loop_multiplier = ZOMBIE_LOOP_MULTIPLIER ** self.global_difficulty
-        
-        # 最終的なゾンビ数
-        zcount = int(stage_zombies * loop_multiplier)
-        zcount = int(min(zcount, 800)) # 最大ゾンビ数に制限
-        
+        # 1. 配置の生成 (演出中に生成済みならそれを使う)
+        # 前のステージのゾンビはプールに戻し、新しい配置で再利用する
+        self.zombie_pool.release(self.zombies)
+        self.zombies = []
+        key = (self.stage, self.global_difficulty)
+        px, py, flags, zombies = self.stage_prefetch.take(key, lambda: self.build_stage(*key))
+        zcount = len(zombies)
         self.target_flags = INITIAL_FLAGS + (self.stage - 1) * FLAG_INCREMENT
         
         # 2. ワールドのリセット
         self.canvas.configure(bg=BG_COLORS[(self.stage-1) % len(BG_COLORS)])
-        self.flags = []
-        self.zombies = []
+        self.flags = flags
+        self.zombies = zombies
 
         # 3. プレイヤーの配置と状態リセット
-        px = random.randint(40, 120)
-        py = random.randint(WINDOW_H//2 - 40, WINDOW_H//2 + 40)
-        
         self.player.x = px
         self.player.y = py
         self.player.collected_flags = 0
@@ -330,16 +447,43 @@ class Game:
         if initial:
             self.player.hp = PLAYER_MAX_HP
         self.player.invincible_timer = 0
+            
+        print(f"STAGE {self.stage} (LOOP {self.global_difficulty + 1}): ZOMBIES={zcount}, FLAGS={self.target_flags}, "
+              f"POOL={self.zombie_pool.high_water}/{self.zombie_pool.created}")
+
+        if self.gc_pacer:
+            self.gc_pacer.stage_built()
+
+    def build_stage(self, stage, global_difficulty):
+        """ステージの配置 (プレイヤー位置・旗・ゾンビ) を生成するジェネレータ。
+        ゾンビ 1 体ごとに yield し、完成した配置を返す"""
+
+        # ステージ進行によるゾンビ数の増加 (加算)
+        stage_zombies = BASE_ZOMBIES + (stage - 1) * ZOMBIE_INCREASE_PER_STAGE
+        
+        # ループレベルによるゾンビ数の増加 (乗算)
+        loop_multiplier = ZOMBIE_LOOP_MULTIPLIER ** global_difficulty
+        
+        # 最終的なゾンビ数
+        zcount = int(stage_zombies * loop_multiplier)
+        zcount = int(min(zcount, 800)) # 最大ゾンビ数に制限
+        
+        target_flags = INITIAL_FLAGS + (stage - 1) * FLAG_INCREMENT
+
+        # プレイヤーの配置
+        px = random.randint(40, 120)
+        py = random.randint(WINDOW_H//2 - 40, WINDOW_H//2 + 40)
         
-        # 4. 旗の配置 (HUDエリアを避けるロジックを維持)
+        # 旗の配置 (HUDエリアを避けるロジックを維持)
         
         # HUD表示エリアの制限 (上から120px、左右から40pxの領域は避ける)
         HUD_SAFE_MARGIN_Y_TOP = 120 
         HUD_SAFE_MARGIN_X = 40  
         
+        flags = []
         placed = 0
         attempts = 0
-        while placed < self.target_flags and attempts < 1000:
+        while placed < target_flags and attempts < 1000:
             attempts += 1
             # Xは画面端を避けてランダム
             fx = random.randint(HUD_SAFE_MARGIN_X, WINDOW_W - HUD_SAFE_MARGIN_X)
@@ -349,24 +493,40 @@ class Game:
             # 1. プレイヤー初期位置から離す
             if dist((fx, fy), (px, py)) < 150: continue
 
-            self.flags.append(Flag(fx, fy))
+            flags.append(Flag(fx, fy))
             placed += 1
 
-        # 5. ゾンビの生成
-        for i in range(zcount):
-            zx = random.randint(WINDOW_W - 80, WINDOW_W - 20)
-            zy = random.randint(20, WINDOW_H - 20)
-            
-            r = random.random()
-            if r < 0.7: kind = "walker"
-            elif r < 0.95: kind = "shambler"
-            else: kind = "sprinter"
-            
-            # Zombie生成時に現在のループレベルを渡す (速度に影響)
-            zombie = Zombie(zx, zy, kind, self.global_difficulty)
-            self.zombies.append(zombie)
-            
-        print(f"STAGE {self.stage} (LOOP {self.global_difficulty + 1}): ZOMBIES={zcount}, FLAGS={self.target_flags}")
+        # ゾンビの生成
+        zombies = []
+        try:
+            for i in range(zcount):
+                zx = random.randint(WINDOW_W - 80, WINDOW_W - 20)
+                zy = random.randint(20, WINDOW_H - 20)
+                
+                r = random.random()
+                if r < 0.7: kind = "walker"
+                elif r < 0.95: kind = "shambler"
+                else: kind = "sprinter"
+                
+                # Zombie生成時にループレベルを渡す (速度に影響)
+                zombies.append(self.zombie_pool.acquire(zx, zy, kind, global_difficulty))
+                yield
+        except GeneratorExit:
+            # 生成途中で捨てられた (StagePrefetch.cancel) ので、ここまでに借りた分を返す
+            self.zombie_pool.release(zombies)
+            raise
+
+        return px, py, flags, zombies
+
+    def release_layout(self, layout):
+        """build_stage の配置を使わずに捨てるとき、借りたゾンビをプールへ返す"""
+        px, py, flags, zombies = layout
+        self.zombie_pool.release(zombies)
+
+    def prefetch_stage(self, stage, global_difficulty):
+        """演出中に次ステージの配置を少しずつ生成する"""
+        key = (stage, global_difficulty)
+        self.stage_prefetch.step(key, lambda: self.build_stage(*key))
 
 
     # --- main loop ---
@@ -374,19 +534,43 @@ class Game:
         if not self.running:
             return
         
-        self.frame_count += 1
-        self.frame += 1
-
-        self.update()
+        if self.gc_pacer:
+            self.gc_pacer.frame(self.state)
+
+        if self.turbo == TURBO_MAX:
+            end = time.perf_counter() + TURBO_MAX_BUDGET
+            steps = 0
+            while steps == 0 or time.perf_counter() < end:
+                self.step(extra=steps > 0)
+                steps += 1
+        else:
+            steps = self.turbo
+            for i in range(steps):
+                self.step(extra=i > 0)
+        self.turbo_steps = steps
         self.draw()
         
         self.root.after(TICK_MS, self.loop)
 
+    def step(self, extra=False):
+        """1 ステップ進める。早送り中は描画 1 フレームの間に何度も呼ばれる。
+        extra はそのフレームの 2 回目以降のステップ。実時間は進んでいないので、クリアタイム
+        (time.time() - start_time) が 1 ステップ分進むように start_time を前へずらす"""
+        if extra:
+            self.start_time -= 1.0 / FPS
+        self.frame_count += 1
+        self.frame += 1
+        self.update()
+
     def update(self):
         # 演出画面のタイマー制御
         if self.state == 'title' and self.frame_count >= TITLE_TIME:
             self.start_game()
         elif self.state == 'stage_clear':
+            # クリア演出中に次ステージを先行生成
+            if self.stage < STAGE_COUNT:
+                self.prefetch_stage(self.stage + 1, self.global_difficulty)
+
             if self.frame_count < CLEAR_TIME:
                 # スコアを徐々に加算するアニメーション
                 target_score = self.score + self.clear_bonus
@@ -402,12 +586,14 @@ class Game:
         elif self.state == 'game_over':
             # ゲームオーバー時にハイスコアを更新
             self.high_score = max(self.high_score, self.score)
+            self.prefetch_stage(1, 0)
             if self.frame_count >= GAMEOVER_TIME:
                 self.reset_game()
         
         elif self.state == 'ending':
              # エンディング時にハイスコアを更新
             self.high_score = max(self.high_score, self.score)
+            self.prefetch_stage(1, self.global_difficulty + 1)
             if self.frame_count >= ENDING_TIME:
                 self.start_new_loop()
 
@@ -453,6 +639,10 @@ class Game:
 
     # --- draw ---
     def draw(self):
+        if self.turbo == TURBO_MAX:
+            self.draw_turbo()
+            return
+
         self.canvas.delete("all")
         
         # --- TITLE SCREEN (10秒演出) ---
@@ -611,6 +801,19 @@ class Game:
             # クレジット表示
             self.canvas.create_text(WINDOW_W//2, WINDOW_H - 20, text="(C)M.TAKAHASHI", fill="#999999", font=("Helvetica", 10))
 
+        # 早送りの表示
+        if self.turbo > 1:
+            self.canvas.create_text(WINDOW_W-8, WINDOW_H-8, anchor='se', text=f"TURBO x{self.turbo}", fill="#FF6666", font=("Helvetica", 12, "bold"))
+
+    def draw_turbo(self):
+        """早送り (最大) 中は画面を描かず、どこまで進んだかだけを文字で出す"""
+        self.canvas.delete("all")
+        self.canvas.configure(bg="#000000")
+        self.canvas.create_text(WINDOW_W//2, WINDOW_H//2 - 20, text="TURBO MAX (T: 1x)", fill="#FF6666", font=("Helvetica", 24, "bold"))
+        status = f"{self.state.upper()}  STAGE {self.stage}/{STAGE_COUNT}  LOOP {self.global_difficulty + 1}  " \
+                 f"HP {self.player.hp}  SCORE {self.score}  {self.turbo_steps} STEPS/FRAME"
+        self.canvas.create_text(WINDOW_W//2, WINDOW_H//2 + 20, text=status, fill=HUD_COLOR, font=("Helvetica", 12))
+
 # ----------------------------
 # 実行
 if __name__ == "__main__":
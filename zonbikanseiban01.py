@@ -1,6 +1,12 @@
 import pyxel
 import random
 import math
+import time
+
+try:
+    import perfkit  # 計測ツール (任意)。ブラウザ版では読み込まれない
+except ImportError:
+    perfkit = None
 
 # --- 定数 ---
 WINDOW_W = 160
@@ -19,6 +25,10 @@ TRAIL_MAX_LENGTH = 200
 FINAL_SCENE_HOLD_TIME = 180
 UI_HEIGHT = 20
 CREDITS_SPEED = 0.5 
+# クレジットを前もって書いておくイメージバンク (0 番はタイトル画像)
+CREDITS_IMAGE_BANK = 1
+# HUD とタイトル・チュートリアルの文字を書いておくイメージバンク
+TEXT_IMAGE_BANK = 2
 
 # TIME UP! や GAME OVER の表示時間 (フレーム単位, 3秒 = 180フレーム)
 GAME_OVER_HOLD_FRAMES = 180 
@@ -28,6 +38,36 @@ FINAL_STAGE_ZOMBIES = 30
 FINAL_STAGE_OBSTACLES = 13
 FINAL_STAGE_TIME_LIMIT = 20 
 
+# タイムリミット (秒)。クリア回数 (cleared_count) ごとに 1 行、4周目以降は最後の行を使う
+# 0, St1, St2, St3, St4, St5, St6
+STAGE_TIME_TABLES = [
+    [0, 40, 35, 25, 25, 25, 20],  # 1周目
+    [0, 20, 20, 20, 20, 20, 20],  # 2周目: 全ステージ 20秒
+    [0, 15, 15, 15, 15, 15, 15],  # 3周目: 全ステージ 15秒
+    [0, 10, 10, 10, 10, 10, 10],  # 4周目以降: 全ステージ 10秒 (最難関)
+]
+
+# シミュレーションの刻み (1 秒あたりのステップ数)。速度やフレーム数の定数はすべてこの 1 ステップ基準で、
+# 元の Pyxel の 30fps (1 フレーム 1 回の update) に合わせてある
+SIM_RATE = 30
+# 描画が遅れたとき 1 回の update で追いつくステップ数の上限 (これ以上はスローモーションになる)
+MAX_CATCH_UP_STEPS = 5
+# プレイ中のステート。この間は GC を止めておく (perfkit.GCPacer)
+GC_ACTIVE_STATES = ("PLAYING",)
+
+# 描画の品質の自動調整: 1 フレーム (update + draw) の時間が予算に近づいたら、見た目だけの演出を段階的に
+# 軽くし、余裕が戻ったら元に戻す。段階 (tier) が上がるほど軽い。現在の段階は --hitch-log の表示 (F3) に出る
+QUALITY_BUDGET = 1.0 / SIM_RATE  # 1 フレームの予算 (pyxel.init の fps = SIM_RATE)
+QUALITY_SMOOTHING = 0.1          # フレーム時間の移動平均の重み
+QUALITY_SLOW = 0.8               # 平均が予算のこの割合を超えたら「重い」
+QUALITY_FAST = 0.5               # 平均が予算のこの割合を下回ったら「余裕がある」
+QUALITY_DOWN_FRAMES = 15         # 重いフレームがこれだけ続いたら 1 段軽くする
+QUALITY_UP_FRAMES = 90           # 余裕のあるフレームがこれだけ続いたら 1 段戻す (行ったり来たりしないよう長めに)
+QUALITY_TIER_EFFECTS = 1         # フェードを 1 枚で描き、ゾンビのちらつきを描かない
+QUALITY_TIER_SHADOW = 2          # 影を 1 つの円にする
+QUALITY_TIER_PARTICLES = 3       # 砂ぼこり・捕獲の粒子を半分だけ出す
+QUALITY_TIERS = 3
+
 # --- クレジット ---
 CREDITS_CONTENT = [
     (16, "DEMOCRACY OF THE DEAD", 8),
@@ -62,10 +102,57 @@ def clamp(v, a, b):
 def dist(ax, ay, bx, by):
     return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
 
+# 描画の演出 (ちらつき・画面の揺れ) に使う乱数。シミュレーションの random の並びを描画の回数で変えない
+fx_random = random.Random()
+
+# --- 連続 (スイープ) 判定 ---
+# 1 ステップの移動量が半径に近づくと、移動後の位置だけを調べる判定では相手をすり抜ける。
+# 移動の線分そのものを調べ、最初に当たる時刻 t (0〜1, 線分上の割合) を求める。
+
+def segment_circle_time(ax, ay, bx, by, cx, cy, r):
+    """点が A→B と動くとき、中心 C・半径 r の円に最初に入る時刻 t を返す。入らなければ None"""
+    dx, dy = bx - ax, by - ay
+    fx, fy = ax - cx, ay - cy
+    c = fx * fx + fy * fy - r * r
+    if c < 0:
+        return 0.0  # 最初から円の中
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = fx * dx + fy * dy
+    disc = b * b - a * c
+    if b >= 0 or disc < 0:
+        return None  # 遠ざかっている / かすりもしない
+    t = (-b - disc ** 0.5) / a
+    return t if t <= 1.0 else None
+
+def segment_box_time(ax, ay, bx, by, left, top, right, bottom):
+    """点が A→B と動くとき、箱 [left, right] x [top, bottom] に最初に入る時刻 t を返す (スラブ法)"""
+    t_enter, t_exit = 0.0, 1.0
+    for p, d, lo, hi in ((ax, bx - ax, left, right), (ay, by - ay, top, bottom)):
+        if d == 0:
+            if p < lo or p > hi:
+                return None
+            continue
+        t0 = (lo - p) / d
+        t1 = (hi - p) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > t_enter:
+            t_enter = t0
+        if t1 < t_exit:
+            t_exit = t1
+        if t_enter > t_exit:
+            return None
+    return t_enter
+
 # ------------------------------------------------------------
 # 障害物
 # ------------------------------------------------------------
 class Obstacle:
+    # 属性を固定して __dict__ を持たせない (インスタンスのメモリを減らし、属性アクセスを速くする)
+    __slots__ = ("x", "y", "w", "h", "color")
+
     def __init__(self, x, y, w, h, color=5):
         self.x, self.y, self.w, self.h = x, y, w, h
         self.color = color
@@ -94,21 +181,228 @@ class Obstacle:
         cy = clamp(y, self.y, self.y + self.h)
         return (x - cx) ** 2 + (y - cy) ** 2 < r * r
 
+    def sweep(self, x0, y0, x1, y1, r):
+        """半径 r の円が (x0, y0) → (x1, y1) と動くとき、最初に障害物に触れる時刻 t (0〜1) を返す。
+        触れなければ None。最初から重なっている場合は、抜け出す動きなら None を返す"""
+        if self.collide(x0, y0, r):
+            return 0.0 if self.collide(x1, y1, r) else None
+        # 円と箱の接触 = 中心が「r だけ角を丸めて広げた箱」に入ること。
+        # 角丸の箱は、縦長・横長の 2 つの箱と 4 隅の円に分けて、いちばん早い時刻をとる
+        left, top = self.x, self.y
+        right, bottom = self.x + self.w, self.y + self.h
+        hits = [
+            segment_box_time(x0, y0, x1, y1, left - r, top, right + r, bottom),
+            segment_box_time(x0, y0, x1, y1, left, top - r, right, bottom + r),
+        ]
+        for cx, cy in ((left, top), (right, top), (left, bottom), (right, bottom)):
+            hits.append(segment_circle_time(x0, y0, x1, y1, cx, cy, r))
+        hits = [t for t in hits if t is not None]
+        return min(hits) if hits else None
+
+
+class ObstacleGrid:
+    """障害物の粗い判定 (ブロードフェーズ) 用の格子。
+    各マスに、そのマスに (角丸の広がりを含めて) かかりうる障害物を登録しておき、
+    移動の範囲が通るマスの障害物だけを細かい判定 (sweep) に回す"""
+    CELL = 16
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+        self.cells = {}
+        c = self.CELL
+        # エンティティの半径ぶん広げて登録する (プレイヤーの半径が最大)
+        pad = PLAYER_R + 1
+        for ob in obstacles:
+            for cy in range(int(ob.y - pad) // c, int(ob.y + ob.h + pad) // c + 1):
+                for cx in range(int(ob.x - pad) // c, int(ob.x + ob.w + pad) // c + 1):
+                    self.cells.setdefault((cx, cy), []).append(ob)
+
+    def __iter__(self):
+        return iter(self.obstacles)
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def query(self, x0, y0, x1, y1):
+        """(x0, y0) → (x1, y1) の移動が通るマスにある障害物のリスト (重複なし)"""
+        c = self.CELL
+        left, right = int(min(x0, x1)) // c, int(max(x0, x1)) // c
+        top, bottom = int(min(y0, y1)) // c, int(max(y0, y1)) // c
+        cells = self.cells
+        if left == right and top == bottom:
+            return cells.get((left, top), ())
+        found = []
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                for ob in cells.get((cx, cy), ()):
+                    if ob not in found:
+                        found.append(ob)
+        return found
+
+
+def first_hit(candidates, x0, y0, x1, y1, r):
+    """候補の障害物のうち、いちばん早く触れる時刻 t を返す。どれにも触れなければ None"""
+    first = None
+    for ob in candidates:
+        t = ob.sweep(x0, y0, x1, y1, r)
+        if t is not None and (first is None or t < first):
+            first = t
+    return first
+
+
+def resolve_move(x, y, nx, ny, r, grid):
+    """半径 r の円を (x, y) → (nx, ny) へ動かし、障害物との衝突を解決した位置を返す。
+    X → Y の順に軸ごとに進め、その軸でいちばん早く触れる障害物の手前で止める
+    (もう一方の軸はそのまま進むので、壁や角に沿って滑る)。
+    戻り値は (x, y, X 方向で当たったか, Y 方向で当たったか)"""
+    candidates = grid.query(x, y, nx, ny)
+    hit_x = hit_y = False
+    if not candidates:
+        return nx, ny, hit_x, hit_y
+    if nx != x:
+        t = first_hit(candidates, x, y, nx, y, r)
+        if t is not None:
+            nx = x + (nx - x) * max(0.0, t - 0.01)
+            hit_x = True
+        x = nx
+    if ny != y:
+        t = first_hit(candidates, x, y, x, ny, r)
+        if t is not None:
+            ny = y + (ny - y) * max(0.0, t - 0.01)
+            hit_y = True
+        y = ny
+    return x, y, hit_x, hit_y
+
+
+class FlowField:
+    """プレイヤーへの距離場 (ステージ全体を 8px のマスに分けたもの)。
+    プレイヤーのいるマスから幅優先探索 (BFS) でマスごとの歩数を求め、
+    各マスに「歩数が 1 つ少ない隣のマス」への向きを入れておく。
+    ゾンビは自分のマスの向きを引くだけ (O(1)) で障害物を回り込める。
+    探索し直すのはプレイヤーが別のマスへ移ったときだけ。
+    r は通り抜ける丸の半径 (ふつうはゾンビ。自動プレイのボットはプレイヤーの半径で作る)"""
+    CELL = 8
+
+    def __init__(self, obstacles, r=ZOMBIE_R):
+        c = self.CELL
+        self.cols = cols = (WINDOW_W + c - 1) // c
+        self.rows = rows = (WINDOW_H + c - 1) // c
+        n = cols * rows
+
+        # ゾンビの中心が入れないマス (マスの中心が、ゾンビの半径ぶん広げた障害物・画面外・聖域に入る)
+        min_x, max_x = r, WINDOW_W - SANCTUARY_W - r
+        min_y, max_y = UI_HEIGHT + r, WINDOW_H - 1 - r
+        blocked = []
+        for i in range(n):
+            cx = (i % cols) * c + c / 2
+            cy = (i // cols) * c + c / 2
+            blocked.append(not (min_x <= cx <= max_x and min_y <= cy <= max_y)
+                           or any(ob.collide(cx, cy, r) for ob in obstacles))
+        self.blocked = blocked
+
+        # マスごとの隣 (入れるマスだけ)。斜めは両側の縦横のマスが空いているときだけ (角をすり抜けない)
+        s = 0.5 ** 0.5
+        self.links = links = []
+        for i in range(n):
+            col, row = i % cols, i // cols
+            near = []
+            for dc, dr, ux, uy in ((1, 0, 1.0, 0.0), (-1, 0, -1.0, 0.0), (0, 1, 0.0, 1.0), (0, -1, 0.0, -1.0),
+                                   (1, 1, s, s), (1, -1, s, -s), (-1, 1, -s, s), (-1, -1, -s, -s)):
+                nc, nr = col + dc, row + dr
+                if not (0 <= nc < cols and 0 <= nr < rows):
+                    continue
+                j = nr * cols + nc
+                if blocked[j]:
+                    continue
+                if dc and dr and (blocked[row * cols + nc] or blocked[nr * cols + col]):
+                    continue
+                near.append((j, ux, uy))
+            links.append(near)
+
+        self.goal = -1
+        self.steps = [-1] * n
+        self.dirs = [None] * n
+        self.rebuilds = 0
+
+    def cell(self, x, y):
+        c = self.CELL
+        return clamp(int(y) // c, 0, self.rows - 1) * self.cols + clamp(int(x) // c, 0, self.cols - 1)
+
+    def update(self, x, y):
+        """プレイヤーの位置 (x, y) に合わせる。マスが変わっていなければ何もしない"""
+        goal = self.cell(x, y)
+        if goal == self.goal:
+            return
+        self.goal = goal
+        self.rebuilds += 1
+
+        links = self.links
+        steps = [-1] * len(links)
+        steps[goal] = 0
+        queue = [goal]
+        for i in queue:  # 末尾に足しながら回す (BFS)
+            k = steps[i] + 1
+            for j, _, _ in links[i]:
+                if steps[j] < 0:
+                    steps[j] = k
+                    queue.append(j)
+        self.steps = steps
+
+        # 向き: 歩数が最小の隣たちへの向きの平均。まっすぐ向かっても最短 (歩数 = マスの距離) のマスは
+        # None にしておき、ゾンビはプレイヤーへ直接向かう
+        cols = self.cols
+        gc, gr = goal % cols, goal // cols
+        dirs = []
+        for i, near in enumerate(links):
+            k = steps[i]
+            if k >= 0 and k <= max(abs(i % cols - gc), abs(i // cols - gr)):
+                dirs.append(None)
+                continue
+            best = -1
+            sx = sy = 0.0
+            for j, ux, uy in near:
+                kj = steps[j]
+                if kj < 0:
+                    continue
+                if best < 0 or kj < best:
+                    best, sx, sy = kj, ux, uy
+                elif kj == best:
+                    sx += ux
+                    sy += uy
+            length = (sx * sx + sy * sy) ** 0.5
+            dirs.append((sx / length, sy / length) if best >= 0 and length > 0 else None)
+        self.dirs = dirs
+
+    def steer(self, x, y, ux, uy):
+        """(x, y) にいるゾンビの進む向き。回り込みが要らなければ (ux, uy) (プレイヤーへの向き) をそのまま返す"""
+        d = self.dirs[self.cell(x, y)]
+        return d if d is not None else (ux, uy)
+
 
 # ------------------------------------------------------------
 # プレイヤー
 # ------------------------------------------------------------
 class Player:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "dir", "walk_frame", "color", "is_main", "is_zombified",
+                 "temp_color", "dust_particles", "transform_particles", "speed_factor", "trail")
+
     def __init__(self, x, y, is_main=True, color_override=None, speed_factor=1.0):
+        self.dust_particles = []
+        self.transform_particles = []
+        self.reset(x, y, is_main, color_override, speed_factor)
+
+    def reset(self, x, y, is_main=True, color_override=None, speed_factor=1.0):
+        """プールから再利用するときも、新規生成と同じ状態に初期化する"""
         self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y  # 描画補間用 (ひとつ前のステップの位置)
         self.dir = 1
         self.walk_frame = 0
         self.color = color_override if color_override is not None else 11
         self.is_main = is_main
         self.is_zombified = False
         self.temp_color = None
-        self.dust_particles = []
-        self.transform_particles = []
+        self.dust_particles.clear()
+        self.transform_particles.clear()
         self.speed_factor = speed_factor
 
         if self.is_main:
@@ -116,7 +410,10 @@ class Player:
         else:
             self.trail = None
 
-    def update(self, obstacles, controllable=True):
+    def update(self, obstacles, controllable=True, tick=None):
+        """tick はシミュレーションのステップ数 (砂ぼこりを出す間隔に使う)。省略時は pyxel.frame_count"""
+        if tick is None:
+            tick = pyxel.frame_count
         # 変異時のパーティクル更新
         for p in self.transform_particles:
             p[0] += p[2]
@@ -144,22 +441,16 @@ class Player:
             nx = self.x + dx * sp
             ny = self.y + dy * sp
 
-            hit = False
-            for ob in obstacles:
-                if ob.collide(nx, ny, PLAYER_R):
-                    if not ob.collide(self.x, ny, PLAYER_R):
-                        nx = self.x
-                    elif not ob.collide(nx, self.y, PLAYER_R):
-                        ny = self.y
-                    else:
-                        hit = True
-                    break
-            if not hit:
-                self.x, self.y = nx, ny
-
-            if pyxel.frame_count % 3 == 0:
-                self.dust_particles.append([self.x + random.randint(-2, 2), self.y + random.randint(2, 4),
-                                             random.uniform(-0.5, 0.5), random.uniform(-0.5, 0), 6, 15])
+            # 移動の線分で障害物を調べる (速度が上がってもすり抜けない)。
+            # 近くの障害物すべてに対して軸ごとに解決するので、角や隙間でも壁に沿って滑る
+            self.x, self.y, _, _ = resolve_move(self.x, self.y, nx, ny, PLAYER_R, obstacles)
+
+            if tick % 3 == 0:
+                # 間引くときも乱数は同じだけ引く (描画の品質でシミュレーションの random の並びを変えない)
+                p = [self.x + random.randint(-2, 2), self.y + random.randint(2, 4),
+                     random.uniform(-0.5, 0.5), random.uniform(-0.5, 0), 6, 15]
+                if quality.emits(tick // 3):
+                    self.dust_particles.append(p)
 
             if dx > 0:
                 self.dir = 1
@@ -170,8 +461,9 @@ class Player:
         self.y = clamp(self.y, UI_HEIGHT + PLAYER_R, WINDOW_H - 1 - PLAYER_R)
 
         if self.is_main:
+            # 同じリストの中で入れ替える (毎ステップ新しいリストを作らない)
             self.trail.insert(0, (self.x, self.y))
-            self.trail = self.trail[:TRAIL_MAX_LENGTH]
+            del self.trail[TRAIL_MAX_LENGTH:]
 
         for p in self.dust_particles:
             p[0] += p[2]
@@ -192,7 +484,8 @@ class Player:
             pyxel.pset(int(p[0]), int(p[1]), p[4])
 
         # 影
-        pyxel.circ(x, y + 3, 4, 0)
+        if quality.tier < QUALITY_TIER_SHADOW:
+            pyxel.circ(x, y + 3, 4, 0)
         pyxel.circ(x, y + 3, 3, 1)
 
         if self.is_zombified:
@@ -243,8 +536,17 @@ class Player:
 # ゾンビ
 # ------------------------------------------------------------
 class Zombie:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "vx", "vy", "dir", "state", "speed_factor", "base_color",
+                 "bite_frame", "captured_particles")
+
     def __init__(self, x, y, speed_factor=1.0):
+        self.captured_particles = []
+        self.reset(x, y, speed_factor)
+
+    def reset(self, x, y, speed_factor=1.0):
+        """プールから再利用するときも、新規生成と同じ状態に初期化する"""
         self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y  # 描画補間用 (ひとつ前のステップの位置)
         self.vx = random.uniform(-0.4, 0.4)
         self.vy = random.uniform(-0.4, 0.4)
         self.dir = 1
@@ -252,9 +554,9 @@ class Zombie:
         self.speed_factor = speed_factor
         self.base_color = random.choice([3, 11, 4])
         self.bite_frame = 0
-        self.captured_particles = []
+        self.captured_particles.clear()
 
-    def update(self, player, obstacles, captured_zombies):
+    def update(self, player, obstacles, captured_zombies, flow=None):
         px, py = player.x, player.y
         d = dist(self.x, self.y, px, py)
 
@@ -306,22 +608,22 @@ class Zombie:
             self.y = clamp(self.y, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
             return
 
-        # プレイヤーとの接触判定（捕獲）
-        if d < PLAYER_R + ZOMBIE_R and self.state != "captured":
-            self.state = "captured"
-            self.vx = 0
-            self.vy = 0
-            for _ in range(random.randint(5, 10)):
-                self.captured_particles.append(
-                    [self.x, self.y, random.uniform(-1, 1), random.uniform(-1, -0.5), random.choice([7, 8, 3]), 30])
+        # プレイヤーとの接触判定（捕獲）。このステップのプレイヤーの移動の線分で調べる
+        if d < PLAYER_R + ZOMBIE_R or segment_circle_time(
+                player.prev_x, player.prev_y, px, py, self.x, self.y, PLAYER_R + ZOMBIE_R) is not None:
+            self.capture()
             return
 
         # プレイヤー追跡ロジック
         if d < 45:
             self.state = "follow"
+            ux, uy = (px - self.x) / d, (py - self.y) / d
+            if flow is not None:
+                # 障害物があれば距離場の向きで回り込む
+                ux, uy = flow.steer(self.x, self.y, ux, uy)
             # 速度を更新する際の増分に self.speed_factor を適用
-            self.vx += (px - self.x) / d * 0.1 * self.speed_factor
-            self.vy += (py - self.y) / d * 0.1 * self.speed_factor
+            self.vx += ux * 0.1 * self.speed_factor
+            self.vy += uy * 0.1 * self.speed_factor
         else:
             self.state = "wander"
             if random.random() < 0.02:
@@ -338,18 +640,24 @@ class Zombie:
         nx = self.x + self.vx
         ny = self.y + self.vy
 
-        blocked = any(ob.collide(nx, ny, ZOMBIE_R) for ob in obstacles)
-
-        # 聖域境界での移動制限
+        # 聖域境界での移動制限 (横方向だけ止め、縦にはそのまま動ける)
         sanctuary_boundary = WINDOW_W - SANCTUARY_W
         if nx > sanctuary_boundary - ZOMBIE_R:
             if self.x <= sanctuary_boundary - ZOMBIE_R:
                 self.vx = 0
             nx = self.x
-            blocked = True
 
-        if not blocked:
-            self.x, self.y = nx, ny
+        # 障害物はプレイヤーと同じく軸ごとに解決し、当たった軸の速度だけを失う
+        ox, oy = self.x, self.y
+        self.x, self.y, hit_x, hit_y = resolve_move(ox, oy, nx, ny, ZOMBIE_R, obstacles)
+        if hit_x:
+            self.vx = 0
+        if hit_y:
+            self.vy = 0
+
+        # 自分の移動でプレイヤーを通り過ぎた場合も捕獲する
+        if segment_circle_time(ox, oy, self.x, self.y, px, py, PLAYER_R + ZOMBIE_R) is not None:
+            self.capture()
 
         if self.vx > 0:
             self.dir = 1
@@ -359,6 +667,16 @@ class Zombie:
         self.x = clamp(self.x, ZOMBIE_R, WINDOW_W - 1 - ZOMBIE_R)
         self.y = clamp(self.y, UI_HEIGHT + ZOMBIE_R, WINDOW_H - 1 - ZOMBIE_R)
 
+    def capture(self):
+        """捕獲された瞬間の処理"""
+        self.state = "captured"
+        self.vx = 0
+        self.vy = 0
+        for i in range(random.randint(5, 10)):
+            p = [self.x, self.y, random.uniform(-1, 1), random.uniform(-1, -0.5), random.choice([7, 8, 3]), 30]
+            if quality.emits(i):
+                self.captured_particles.append(p)
+
     def draw(self):
         x, y = int(self.x), int(self.y)
 
@@ -366,7 +684,8 @@ class Zombie:
             pyxel.pset(int(p[0]), int(p[1]), p[4])
 
         # 影
-        pyxel.circ(x, y + 3, 4, 0)
+        if quality.tier < QUALITY_TIER_SHADOW:
+            pyxel.circ(x, y + 3, 4, 0)
         pyxel.circ(x, y + 3, 3, 1)
 
         c = 7 if self.state == "captured" else self.base_color
@@ -374,7 +693,8 @@ class Zombie:
         # 胴体
         pyxel.rect(x - 3, y - 3, 6, 6, c)
         pyxel.rect(x - 2, y - 2, 4, 4, c + 1)
-        pyxel.pset(x + random.randint(-2, 2), y + random.randint(-2, 2), 8)
+        if quality.tier < QUALITY_TIER_EFFECTS:
+            pyxel.pset(x + fx_random.randint(-2, 2), y + fx_random.randint(-2, 2), 8)
 
         # 頭部
         pyxel.circ(x, y - 5, 2, c)
@@ -387,6 +707,8 @@ class Zombie:
 # フェード・シェイク
 # ------------------------------------------------------------
 class Fade:
+    __slots__ = ("alpha", "target", "speed", "active")
+
     def __init__(self):
         self.alpha = 0.0
         self.target = 0.0
@@ -419,8 +741,8 @@ class Fade:
         if self.alpha <= 0.01:
             return
         
-        # アルファ値に応じて黒い矩形を重ねて描画する
-        layers = int(self.alpha * 8) + 1
+        # アルファ値に応じて黒い矩形を重ねて描画する (矩形は不透明なので、軽くするときは 1 枚で済ませる)
+        layers = 1 if quality.tier >= QUALITY_TIER_EFFECTS else int(self.alpha * 8) + 1
         
         # 画面全体に半透明の黒を重ねることで、ゲーム画面を暗く見せる効果
         # この効果は、TIME UP/GAME OVER表示中に画面を少し暗く保つために使用します。
@@ -429,6 +751,8 @@ class Fade:
 
 
 class Shake:
+    __slots__ = ("timer", "intensity")
+
     def __init__(self):
         self.timer = 0
         self.intensity = 0
@@ -444,8 +768,242 @@ class Shake:
     def get_offset(self):
         if self.timer <= 0:
             return 0, 0
-        return (random.randint(-self.intensity, self.intensity),
-                random.randint(-self.intensity, self.intensity))
+        return (fx_random.randint(-self.intensity, self.intensity),
+                fx_random.randint(-self.intensity, self.intensity))
+
+
+class QualityGovernor:
+    """1 フレームの時間の移動平均を見て、見た目だけの演出の段階 (tier) を上げ下げする"""
+
+    def __init__(self, budget=QUALITY_BUDGET):
+        self.budget = budget
+        self.tier = 0
+        self.avg = 0.0
+        self.slow = 0      # 重いフレームが続いた数
+        self.fast = 0      # 余裕のあるフレームが続いた数
+
+    def record(self, secs):
+        """1 フレームにかかった時間 (秒) を渡す"""
+        self.avg += (secs - self.avg) * QUALITY_SMOOTHING
+        if self.avg > self.budget * QUALITY_SLOW:
+            self.slow += 1
+            self.fast = 0
+        elif self.avg < self.budget * QUALITY_FAST:
+            self.fast += 1
+            self.slow = 0
+        else:
+            self.slow = self.fast = 0
+        if self.slow >= QUALITY_DOWN_FRAMES and self.tier < QUALITY_TIERS:
+            self.tier += 1
+            self.slow = 0
+        elif self.fast >= QUALITY_UP_FRAMES and self.tier > 0:
+            self.tier -= 1
+            self.fast = 0
+
+    def emits(self, i):
+        """i 番目の粒子を出すか"""
+        return self.tier < QUALITY_TIER_PARTICLES or i % 2 == 0
+
+# 描画の品質 (GameApp が毎フレームの時間を記録し、各エンティティの描画と粒子の生成が参照する)
+quality = QualityGovernor()
+
+
+class SimClock:
+    """シミュレーションを固定の dt (1/SIM_RATE 秒) で進める時計。
+    Pyxel が update を呼ぶ間隔が乱れても (重いブラウザなど)、落ちたフレームの分は
+    追加のステップで追いつくので、移動もタイマーも実時間どおりに進む"""
+
+    def __init__(self, rate=SIM_RATE, max_steps=MAX_CATCH_UP_STEPS):
+        self.dt = 1.0 / rate
+        self.max_steps = max_steps
+        self.acc = 0.0
+        self.last = None
+        self.ticks = 0     # 進めたステップ数。タイマーは pyxel.frame_count ではなくこれで測る
+        self.alpha = 0.0   # 描画の補間率 (前のステップの位置 → 今のステップの位置)
+        self.saved = []
+
+    def steps(self):
+        """今回の update で進めるステップ数を返す"""
+        now = time.perf_counter()
+        elapsed = self.dt if self.last is None else now - self.last
+        self.last = now
+        # ほぼ 1 ステップ分なら揃える (時間の揺らぎで 0 回・2 回と交互にならないように)
+        if abs(elapsed - self.dt) < self.dt * 0.1:
+            elapsed = self.dt
+        self.acc += elapsed
+        n = int(self.acc / self.dt)
+        if n > self.max_steps:
+            # 長く止まっていた分 (ウィンドウ移動など) は追いかけない
+            n = self.max_steps
+            self.acc = 0.0
+        else:
+            self.acc -= n * self.dt
+        self.alpha = self.acc / self.dt
+        return n
+
+    def seconds(self, since=0):
+        """since (ticks) からの経過時間 (秒)"""
+        return (self.ticks - since) / SIM_RATE
+
+    def remember(self, *groups):
+        """ステップの頭で呼ぶ。補間用に今の位置を覚えておく"""
+        for group in groups:
+            for e in group:
+                e.prev_x = e.x
+                e.prev_y = e.y
+
+    def lerp(self, *groups):
+        """描画の間だけ、座標を前のステップと今のステップの間の位置に置き換える"""
+        a = self.alpha
+        saved = self.saved
+        for group in groups:
+            for e in group:
+                x, y = e.x, e.y
+                saved.append((e, x, y))
+                e.x = e.prev_x + (x - e.prev_x) * a
+                e.y = e.prev_y + (y - e.prev_y) * a
+
+    def restore(self):
+        """lerp() で置き換えた座標をシミュレーションの値に戻す"""
+        for e, x, y in self.saved:
+            e.x = x
+            e.y = y
+        self.saved.clear()
+
+
+class TextLayer:
+    """変化の少ない文字 (HUD・タイトル・チュートリアル) をイメージバンクの一角に書いておき、
+    毎フレームは blt で写すだけにする。表示する値の組 (key) が変わったときだけ書き直す"""
+
+    def __init__(self, bank, u, v, w, h):
+        self.bank = bank
+        self.u, self.v, self.w, self.h = u, v, w, h
+        self.key = None
+
+    def draw(self, x, y, key, render, colkey=None):
+        """key が前回と違えば render(img, ox, oy, key) で書き直してから (x, y) に写す。
+        render は画面の座標に (ox, oy) を足した位置へ img.text などで描く"""
+        if key != self.key:
+            img = pyxel.images[self.bank]
+            img.clip(self.u, self.v, self.w, self.h)
+            img.rect(self.u, self.v, self.w, self.h, 0)
+            render(img, self.u - x, self.v - y, key)
+            img.clip()
+            self.key = key
+        if colkey is None:
+            pyxel.blt(x, y, self.bank, self.u, self.v, self.w, self.h)
+        else:
+            pyxel.blt(x, y, self.bank, self.u, self.v, self.w, self.h, colkey)
+
+
+class CreditsTexture:
+    """クレジットの全行を、イメージバンクに 1 回だけ書いておく (エンディングに入るとき)。
+    ロール中は画面に見えている範囲を blt で 1 回写すだけなので、行数が増えても重くならない"""
+
+    def __init__(self, bank=CREDITS_IMAGE_BANK):
+        self.bank = bank
+        self.height = 0  # 書いた高さ (0 = まだ書いていない)
+
+    def render(self):
+        # 最後の文字の行の下端まで (末尾の空行は書かない)
+        height = 0
+        y = 0
+        for line_height, text, _ in CREDITS_CONTENT:
+            if text:
+                height = y + pyxel.FONT_HEIGHT
+            y += line_height
+        img = pyxel.images[self.bank]
+        self.height = min(height, img.height)
+        img.rect(0, 0, WINDOW_W, self.height, 0)
+        y = 0
+        for line_height, text, color in CREDITS_CONTENT:
+            if text:
+                img.text((WINDOW_W - len(text) * 4) // 2, y, text, color)
+            y += line_height
+
+    def draw(self, top):
+        """テクスチャの上端を画面の Y 座標 top に合わせ、見えている部分だけ写す"""
+        top = math.floor(top)
+        src_y = max(0, -top)
+        dst_y = max(0, top)
+        h = min(self.height - src_y, WINDOW_H - dst_y)
+        if h > 0:
+            pyxel.blt(0, dst_y, self.bank, 0, src_y, WINDOW_W, h)
+
+
+class StagePrefetch:
+    """次のステージの配置を、フェードなど演出中のフレームに分けて前もって生成しておく"""
+
+    def __init__(self, budget=0.002, discard=None):
+        self.budget = budget  # 1 フレームあたりに使ってよい生成時間 (秒)
+        self.key = None
+        self.builder = None
+        self.layout = None
+        self.discard = discard  # 使わずに捨てる完成済みの配置を受け取る (借りたエンティティをプールへ返す)
+
+    def step(self, key, make_builder, budget=None):
+        """演出中に毎フレーム呼ぶ。key (ステージ番号など) が変わったら作り直す"""
+        if key != self.key:
+            self.cancel()
+            self.key = key
+            self.builder = make_builder()
+            self.layout = None
+        if self.layout is not None:
+            return
+        end = time.perf_counter() + (self.budget if budget is None else budget)
+        try:
+            while time.perf_counter() < end:
+                next(self.builder)
+        except StopIteration as e:
+            self.layout = e.value
+
+    def take(self, key, make_builder):
+        """ステージ開始時に呼ぶ。生成が終わっていなければ残りをこの場で生成する"""
+        while key != self.key or self.layout is None:
+            self.step(key, make_builder, budget=float("inf"))
+        layout = self.layout
+        self.key = self.builder = self.layout = None
+        return layout
+
+    def cancel(self):
+        """生成途中・生成済みの配置を捨てる (key が変わったときなど)。
+        生成途中のジェネレータは close() で止め (借りた分はジェネレータが返す)、完成済みの配置は discard に渡す"""
+        if self.layout is not None:
+            if self.discard:
+                self.discard(self.layout)
+        elif self.builder is not None:
+            self.builder.close()
+        self.key = self.builder = self.layout = None
+
+
+class EntityPool:
+    """Zombie / Player を使い回すプール。ステージ切り替えで捨てたインスタンスを回収し、
+    次に acquire されたとき reset() でその場で初期化し直す"""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0     # これまでに生成したインスタンス数 (= プールの大きさ)
+        self.high_water = 0  # 同時に使用中だった数の最大値
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+        in_use = self.created - len(self.free)
+        if in_use > self.high_water:
+            self.high_water = in_use
+        return obj
+
+    def release(self, objs):
+        self.free.extend(objs)
+
+    def summary(self):
+        return "%s: peak %d / created %d / free %d" % (
+            self.cls.__name__, self.high_water, self.created, len(self.free))
 
 
 # ------------------------------------------------------------
@@ -453,7 +1011,8 @@ class Shake:
 # ------------------------------------------------------------
 class GameApp:
     def __init__(self):
-        pyxel.init(WINDOW_W, WINDOW_H, title="DEMOCRACY OF THE DEAD")
+        # 描画もシミュレーションと同じ刻みで回す (遅れたフレームだけ SimClock が追加のステップで追いつく)
+        pyxel.init(WINDOW_W, WINDOW_H, title="DEMOCRACY OF THE DEAD", fps=SIM_RATE)
         # パレット（簡易）
         try:
             pyxel.pal(1, 4)
@@ -470,6 +1029,14 @@ class GameApp:
 
         self.fade = Fade()
         self.shake = Shake()
+        self.stage_prefetch = StagePrefetch(discard=self.release_layout)
+        self.clock = SimClock()
+        self.quality = quality
+        self.frame_start = None
+        self.enter_latched = False
+        # ステージをまたいで使い回すエンティティ
+        self.zombie_pool = EntityPool(Zombie)
+        self.player_pool = EntityPool(Player)
 
         self.state = "TITLE"
         self.stage = 0
@@ -482,6 +1049,8 @@ class GameApp:
         self.players = []
         self.zombies = []
         self.obstacles = []
+        self.obstacle_grid = ObstacleGrid([])
+        self.flow_field = FlowField([])
         self.dummy_players = []
 
         self.captured_zombies = []
@@ -497,6 +1066,10 @@ class GameApp:
         self.credits_duration = 0
         for height, _, _ in CREDITS_CONTENT:
             self.credits_duration += height
+        self.credits_texture = CreditsTexture()
+        # 上端の UI 帯と、タイトル / チュートリアルの文字 (同時には出ないので 1 枚を共用)
+        self.hud_layer = TextLayer(TEXT_IMAGE_BANK, 0, 0, WINDOW_W, UI_HEIGHT)
+        self.screen_layer = TextLayer(TEXT_IMAGE_BANK, 0, UI_HEIGHT, WINDOW_W, WINDOW_H)
 
         self.title_particles = [(random.randint(0, WINDOW_W), random.randint(0, 18), random.random() * 1.4) for _ in
                                      range(28)]
@@ -508,6 +1081,17 @@ class GameApp:
         # gameover_step: 0: 待機, 1: Time Up表示, 2: Game Over表示, 3: タイトルへフェードアウト
         self.gameover_step = 0 
 
+        # 計測モード (--alloc-profile)
+        self.alloc_profiler = perfkit.AllocProfiler.from_argv() if perfkit else None
+        # GC ペーシング (--no-gc-pacing で無効)
+        self.gc_pacer = perfkit.GCPacer.from_argv(GC_ACTIVE_STATES) if perfkit else None
+        # ヒッチ記録 (--hitch-log)
+        self.hitch = perfkit.HitchRecorder.from_argv() if perfkit else None
+        # プール使用状況の表示 (--pool-stats)
+        self.pool_stats = perfkit.flag("--pool-stats") if perfkit else False
+        if self.hitch:
+            self.hitch.attach(self, pyxel)
+
         pyxel.run(self.update, self.draw)
 
     # ステージ生成 (Stage 1-5 および Stage 6(FINAL) の初期化を兼ねる)
@@ -516,144 +1100,134 @@ class GameApp:
         zombie_base_speed_factor = 1.0 + (self.cleared_count * 0.2)
         
         # タイムリミット設定 (クリア回数に応じた時間の短縮)
-        # 0, St1, St2, St3, St4, St5, St6
-        if self.cleared_count == 0:
-            # 1周目
-            tt = [0, 40, 35, 25, 25, 25, 20]
-        elif self.cleared_count == 1:
-            # 2周目: 全ステージ 20秒
-            tt = [0, 20, 20, 20, 20, 20, 20]
-        elif self.cleared_count == 2:
-            # 3周目: 全ステージ 15秒
-            tt = [0, 15, 15, 15, 15, 15, 15]
-        else:
-            # 4周目以降: 全ステージ 10秒 (最難関)
-            tt = [0, 10, 10, 10, 10, 10, 10]
-        
-        # ステージ数をインクリメント
-        self.stage += 1
+        tt = STAGE_TIME_TABLES[min(self.cleared_count, len(STAGE_TIME_TABLES) - 1)]
         
-        # --- Stage 6 (FINAL) の初期化ロジック (無限再帰を解消) ---
-        if self.stage > MAX_STAGE_PLAY:
-            self.stage = MAX_STAGE_PLAY + 1 # 確実に Stage 6 に設定
-            # Stage 6 のタイムリミットを適用
-            self.stage_time_limit = tt[self.stage] if self.stage < len(tt) else 0 
-            
-            self.obstacles = []
-            
-            # 障害物の生成 (13個)
-            obstacle_count = FINAL_STAGE_OBSTACLES
-            for _ in range(obstacle_count):
-                w = random.randint(8, 22)
-                h = random.randint(6, 14)
-                x = random.randint(6, WINDOW_W - SANCTUARY_W - w - 6)
-                y = random.randint(UI_HEIGHT + 6, WINDOW_H - h - 6)
-                self.obstacles.append(Obstacle(x, y, w, h, color=4))
-
-            # プレイヤー初期位置
-            spawn_x, spawn_y = WINDOW_W // 4, WINDOW_H // 2
-            # 障害物と重ならないように調整
-            for _ in range(40): 
-                if not any(o.collide(spawn_x, spawn_y, PLAYER_R + 2) for o in self.obstacles):
-                    break
-                spawn_x = random.randint(PLAYER_R + 4, WINDOW_W - SANCTUARY_W - PLAYER_R - 4)
-                spawn_y = random.randint(UI_HEIGHT + PLAYER_R + 4, WINDOW_H - PLAYER_R - 4)
-
-            self.players = []
-            # メインプレイヤーに速度係数を渡す
-            self.player = Player(spawn_x, spawn_y, is_main=True, speed_factor=zombie_base_speed_factor)
-            self.players.append(self.player)
-
-            self.dummy_players = []
-            sanctuary_pos_x = WINDOW_W - SANCTUARY_W + 8
-            # ダミープレイヤー（色で識別）を配置
-            # ダミープレイヤーには速度係数を渡す必要はない（移動しないため）
-            self.dummy_players = [
-                Player(sanctuary_pos_x, WINDOW_H // 2 - 20, is_main=False, color_override=11), 
-                Player(sanctuary_pos_x + 5, WINDOW_H // 2, is_main=False, color_override=7),  
-                Player(sanctuary_pos_x, WINDOW_H // 2 + 20, is_main=False, color_override=8)  
-            ]
-            self.players.extend(self.dummy_players)
-
-            self.zombies = []
-            self.captured_zombies = []
-            zombie_count = FINAL_STAGE_ZOMBIES # 30匹に設定
-                
-            for i in range(zombie_count):
-                while True:
-                    zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
-                    zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
-                    # プレイヤー初期位置から離れ、障害物と重ならない位置を探す
-                    if dist(zx, zy, spawn_x, spawn_y) > 32 and not any(o.collide(zx, zy, ZOMBIE_R) for o in self.obstacles):
-                        break
-                    # ゾンビに難易度係数を渡す
-                    sf = random.choice([0.8, 1.0, 1.3]) * zombie_base_speed_factor
-                    self.zombies.append(Zombie(zx, zy, speed_factor=sf))
-                    
-            self.stage_start_frame = pyxel.frame_count
-            self.state = "PLAYING" # Stage 6 はゾンビ捕獲から開始
-            self.marching = False
-            self.fade.to(0.0, speed=0.08)
-            return 
-
-        # --- 通常のステージ (Stage 1-5) のロジック ---
-        # プレイ可能ステージのタイムリミット設定
+        # ステージ数をインクリメント (Stage 6 を超えない)
+        self.stage = self.next_stage_number()
         self.stage_time_limit = tt[self.stage]
-        
-        self.obstacles = []
-        # 障害物の数を増やす
-        obstacle_count = 3 + self.stage
+
+        # 前のステージのエンティティはプールに戻す
+        self.player_pool.release(self.players)
+        self.zombie_pool.release(self.zombies)
+
+        # 演出中に生成済みの配置があれば、それを差し替えるだけで済む
+        stage = self.stage
+        self.obstacles, self.player, self.dummy_players, self.zombies = self.stage_prefetch.take(
+            (stage, zombie_base_speed_factor), lambda: self.build_stage(stage, zombie_base_speed_factor))
+        self.obstacle_grid = ObstacleGrid(self.obstacles)
+        self.flow_field = FlowField(self.obstacles)
+        self.players = [self.player] + self.dummy_players
+        self.captured_zombies = []
+        if self.pool_stats:
+            print("STAGE %d: %s, %s" % (self.stage, self.zombie_pool.summary(), self.player_pool.summary()))
+
+        # ステージが 1 の時だけ総プレイ時間をリセット
+        if self.stage == 1:
+            self.start_time_total = self.clock.seconds()
+
+        if self.gc_pacer:
+            self.gc_pacer.stage_built()
+
+        self.stage_start_frame = self.clock.ticks
+        self.state = "PLAYING" # Stage 6 もゾンビ捕獲から開始
+        self.marching = False
+        self.fade.to(0.0, speed=0.08)
+
+    def next_stage_number(self):
+        return min(self.stage + 1, MAX_STAGE_PLAY + 1)
+
+    def build_stage(self, stage, zombie_base_speed_factor):
+        """ステージの配置を生成するジェネレータ。ゾンビ 1 体ごとに yield し、完成した配置を返す"""
+        final = stage == MAX_STAGE_PLAY + 1
+
+        obstacles = []
+        # 障害物の数を増やす (Stage 6 は 13個)
+        obstacle_count = FINAL_STAGE_OBSTACLES if final else 3 + stage
         for _ in range(obstacle_count):
             w = random.randint(8, 22)
             h = random.randint(6, 14)
             # 聖域エリア（右端）には障害物を置かない
             x = random.randint(6, WINDOW_W - SANCTUARY_W - w - 6)
             y = random.randint(UI_HEIGHT + 6, WINDOW_H - h - 6)
-            self.obstacles.append(Obstacle(x, y, w, h, color=4))
+            obstacles.append(Obstacle(x, y, w, h, color=4))
 
-        # プレイヤー初期位置
+        # プレイヤー初期位置 (障害物と重ならないように調整)
         spawn_x, spawn_y = WINDOW_W // 4, WINDOW_H // 2
         for _ in range(40): 
-            if not any(o.collide(spawn_x, spawn_y, PLAYER_R + 2) for o in self.obstacles):
+            if not any(o.collide(spawn_x, spawn_y, PLAYER_R + 2) for o in obstacles):
                 break
             spawn_x = random.randint(PLAYER_R + 4, WINDOW_W - SANCTUARY_W - PLAYER_R - 4)
             spawn_y = random.randint(UI_HEIGHT + PLAYER_R + 4, WINDOW_H - PLAYER_R - 4)
 
-        self.players = []
         # メインプレイヤーに速度係数を渡す
-        self.player = Player(spawn_x, spawn_y, is_main=True, speed_factor=zombie_base_speed_factor)
-        self.players.append(self.player)
-        self.dummy_players = [] # Stage 1-5 ではダミープレイヤーはいない
+        player = self.player_pool.acquire(spawn_x, spawn_y, is_main=True, speed_factor=zombie_base_speed_factor)
 
-        self.zombies = []
-        self.captured_zombies = []
-        # ステージに応じてゾンビ数を増やす
-        zombie_count = ZOMBIE_COUNT_BASE + (self.stage - 1) * 2 
-            
-        for i in range(zombie_count):
-            while True:
-                zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
-                zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
-                # プレイヤー初期位置から離れ、障害物と重ならない位置を探す
-                if dist(zx, zy, spawn_x, spawn_y) > 32 and not any(o.collide(zx, zy, ZOMBIE_R) for o in self.obstacles):
-                    break
-            # ゾンビに難易度係数を渡す
-            sf = random.choice([0.8, 1.0, 1.3]) * zombie_base_speed_factor
-            self.zombies.append(Zombie(zx, zy, speed_factor=sf))
+        dummy_players = [] # Stage 1-5 ではダミープレイヤーはいない
+        zombies = []
 
-        # ステージが 1 の時だけ総プレイ時間をリセット
-        if self.stage == 1:
-            self.start_time_total = pyxel.frame_count / 60.0
+        try:
+            if final:
+                sanctuary_pos_x = WINDOW_W - SANCTUARY_W + 8
+                # ダミープレイヤー（色で識別）を配置
+                # ダミープレイヤーには速度係数を渡す必要はない（移動しないため）
+                dummy_players = [
+                    self.player_pool.acquire(sanctuary_pos_x, WINDOW_H // 2 - 20, is_main=False, color_override=11), 
+                    self.player_pool.acquire(sanctuary_pos_x + 5, WINDOW_H // 2, is_main=False, color_override=7),  
+                    self.player_pool.acquire(sanctuary_pos_x, WINDOW_H // 2 + 20, is_main=False, color_override=8)  
+                ]
+
+                zombie_count = FINAL_STAGE_ZOMBIES # 30匹に設定
+                
+                for i in range(zombie_count):
+                    while True:
+                        zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
+                        zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
+                        # プレイヤー初期位置から離れ、障害物と重ならない位置を探す
+                        if dist(zx, zy, spawn_x, spawn_y) > 32 and not any(o.collide(zx, zy, ZOMBIE_R) for o in obstacles):
+                            break
+                    # ゾンビに難易度係数を渡す
+                    sf = random.choice([0.8, 1.0, 1.3]) * zombie_base_speed_factor
+                    zombies.append(self.zombie_pool.acquire(zx, zy, speed_factor=sf))
+                    yield
+
+                return obstacles, player, dummy_players, zombies
+
+            # ステージに応じてゾンビ数を増やす
+            zombie_count = ZOMBIE_COUNT_BASE + (stage - 1) * 2 
             
-        self.stage_start_frame = pyxel.frame_count
-        self.state = "PLAYING"
-        self.marching = False
-        self.fade.to(0.0, speed=0.08)
+            for i in range(zombie_count):
+                while True:
+                    zx = random.randint(0, WINDOW_W - SANCTUARY_W - 6)
+                    zy = random.randint(UI_HEIGHT, WINDOW_H - 1)
+                    # プレイヤー初期位置から離れ、障害物と重ならない位置を探す
+                    if dist(zx, zy, spawn_x, spawn_y) > 32 and not any(o.collide(zx, zy, ZOMBIE_R) for o in obstacles):
+                        break
+                # ゾンビに難易度係数を渡す
+                sf = random.choice([0.8, 1.0, 1.3]) * zombie_base_speed_factor
+                zombies.append(self.zombie_pool.acquire(zx, zy, speed_factor=sf))
+                yield
+
+            return obstacles, player, dummy_players, zombies
+        except GeneratorExit:
+            # 生成途中で捨てられた (StagePrefetch.cancel) ので、ここまでに借りた分を返す
+            self.release_layout((obstacles, player, dummy_players, zombies))
+            raise
+
+    def release_layout(self, layout):
+        """build_stage の配置を使わずに捨てるとき、借りたプレイヤーとゾンビをプールへ返す"""
+        obstacles, player, dummy_players, zombies = layout
+        self.player_pool.release([player] + dummy_players)
+        self.zombie_pool.release(zombies)
+
+    def prefetch_stage(self, stage):
+        """演出中に次ステージの配置を少しずつ生成する"""
+        speed_factor = 1.0 + (self.cleared_count * 0.2)
+        self.stage_prefetch.step((stage, speed_factor), lambda: self.build_stage(stage, speed_factor))
 
     # エンディング演出開始
     def start_ending(self):
         # クリアタイムを計算
-        self.total_clear_time = (pyxel.frame_count / 60.0) - self.start_time_total
+        self.total_clear_time = self.clock.seconds() - self.start_time_total
         # 最終ステージクリア時のみ、クリア回数をインクリメント
         if self.stage == MAX_STAGE_PLAY + 1:
             self.cleared_count += 1 
@@ -664,6 +1238,27 @@ class GameApp:
 
     # UPDATE
     def update(self):
+        self.frame_start = time.perf_counter()
+        if self.alloc_profiler:
+            self.alloc_profiler.begin_frame(self.state)
+        if self.gc_pacer:
+            self.gc_pacer.frame(self.state)
+
+        # btnp は描画フレーム単位なので、このフレームのステップ数 (0 回・複数回) に関係なく
+        # 1 回だけ効くようにためておく
+        self.enter_latched = self.enter_latched or pyxel.btnp(pyxel.KEY_RETURN)
+
+        # シミュレーションは固定 dt で進める。落ちたフレームの分はまとめて追いつく
+        for _ in range(self.clock.steps()):
+            self.step()
+            self.clock.ticks += 1
+
+    def step(self):
+        """シミュレーションを 1 ステップ (1/SIM_RATE 秒) 進める"""
+        self.clock.remember(self.players, self.zombies)
+        is_enter_pressed = self.enter_latched
+        self.enter_latched = False
+
         # GAME_OVER ステートのステップ 1, 2 の間は、フェードを停止
         if self.state != "GAME_OVER" or self.gameover_step == 0 or self.gameover_step == 3:
              self.fade.update()
@@ -678,13 +1273,17 @@ class GameApp:
             for p in self.players:
                 # 修正: GAME_OVER ステートのステップ 1, 2 の間は、プレイヤーは操作不可
                 p_controllable = controllable and (self.state != "GAME_OVER")
-                p.update(self.obstacles, controllable=p_controllable)
+                p.update(self.obstacle_grid, controllable=p_controllable, tick=self.clock.ticks)
                 
+            # 距離場はプレイヤーがマスを移ったときだけ作り直される
+            self.flow_field.update(self.player.x, self.player.y)
             for z in self.zombies:
-                z.update(self.player, self.obstacles, self.captured_zombies)
+                z.update(self.player, self.obstacle_grid, self.captured_zombies, self.flow_field)
 
         if self.state == "TITLE":
-            if pyxel.btnp(pyxel.KEY_RETURN):
+            self.prefetch_stage(1)
+
+            if is_enter_pressed:
                 self.fade.to(1.0, speed=0.06)
                 self.next_stage_called = True
 
@@ -709,7 +1308,7 @@ class GameApp:
                 self.start_march()
 
             # タイムリミットチェック (Stage 1-6 共通)
-            elapsed = (pyxel.frame_count - self.stage_start_frame) / 60.0
+            elapsed = self.clock.seconds(self.stage_start_frame)
             if elapsed >= self.stage_time_limit and self.stage_time_limit > 0:
                 # タイムアップでゲームオーバー処理へ移行
                 self.state = "GAME_OVER"
@@ -721,6 +1320,9 @@ class GameApp:
         elif self.state == "GO_TO_SANCT":
             self.update_march()
 
+            if self.stage != MAX_STAGE_PLAY + 1:
+                self.prefetch_stage(self.next_stage_number())
+
             sanctuary_x_min = WINDOW_W - SANCTUARY_W
 
             # プレイヤーと捕獲ゾンビが聖域に到達したか
@@ -755,7 +1357,7 @@ class GameApp:
 
                 for p in self.dummy_players:
                     p.temp_color = 3 if is_flashing else (8 if pyxel.frame_count % 6 < 3 else None)
-                    p.update(self.obstacles, controllable=False) 
+                    p.update(self.obstacle_grid, controllable=False, tick=self.clock.ticks)
 
             # 変異完了時
             if self.ending_timer == TRANSFORM_DURATION:
@@ -773,7 +1375,8 @@ class GameApp:
             if self.ending_timer > TRANSFORM_DURATION + 90:
                 self.state = "CREDITS_ROLL"
                 self.credits_y = WINDOW_H
-                self.step_start_frame = pyxel.frame_count
+                self.credits_texture.render()
+                self.step_start_frame = self.clock.ticks
                 self.fade.to(0.0, speed=0.015)
 
         elif self.state == "CREDITS_ROLL":
@@ -846,6 +1449,8 @@ class GameApp:
     # DRAW
     def draw(self):
         ox, oy = self.shake.get_offset()
+        # ステップとステップの間の位置で描く
+        self.clock.lerp(self.players, self.zombies)
 
         pyxel.cls(1)
 
@@ -883,6 +1488,14 @@ class GameApp:
         if self.state != "GAME_OVER" and self.state != "TITLE" and self.fade.alpha > 0.01:
              self.fade.draw()
 
+        self.clock.restore()
+        if self.frame_start is not None:
+            self.quality.record(time.perf_counter() - self.frame_start)
+            self.frame_start = None
+
+        if self.alloc_profiler:
+            self.alloc_profiler.end_frame()
+
 
     def draw_title_logo(self, cx, cy):
         pyxel.text(cx - 34, cy - 12, "DEMOCRACY", 8)
@@ -951,36 +1564,36 @@ class GameApp:
             pyxel.text((WINDOW_W - len(s_time) * 4) // 2, WINDOW_H // 2 + 20, s_time, 10)
 
     def draw_credits_roll(self):
-        y = self.credits_y
-        for height, text, color in CREDITS_CONTENT:
-            if text:
-                pyxel.text((WINDOW_W - len(text) * 4) // 2, y, text, color)
-            y += height
+        self.credits_texture.draw(self.credits_y)
             
     def draw_ui(self):
-        pyxel.rect(0, 0, WINDOW_W, UI_HEIGHT, 0)
+        # 時間表示ロジック (Stage 1-6 共通)
+        elapsed = self.clock.seconds(self.stage_start_frame)
+        time_left = max(0.0, self.stage_time_limit - elapsed)
+
+        # タイムリミットが近い場合 (10秒未満) は赤く表示
+        color = 8 if time_left < 10 else 7
+
+        # 表示する値 (残り時間は 0.1 秒単位) が変わったときだけ書き直す
+        key = (self.stage, len(self.captured_zombies), len(self.zombies), round(time_left, 1), color)
+        self.hud_layer.draw(0, 0, key, self.render_ui)
+
+    def render_ui(self, img, ox, oy, key):
+        stage, captured_count, zombie_count, time_left, color = key
 
         # 最終ステージは「Stage: FINAL」と表示
-        stage_text = f"Stage: {self.stage}/{MAX_STAGE_PLAY}"
-        if self.stage == MAX_STAGE_PLAY + 1:
+        stage_text = f"Stage: {stage}/{MAX_STAGE_PLAY}"
+        if stage == MAX_STAGE_PLAY + 1:
               stage_text = "Stage: FINAL"
 
-        pyxel.text(4, 4, stage_text, 7)
-        
-        captured_count = len(self.captured_zombies)
-        pyxel.text(4, 12, f"Captured: {captured_count}/{len(self.zombies)}", 7)
+        img.text(ox + 4, oy + 4, stage_text, 7)
+
+        img.text(ox + 4, oy + 12, f"Captured: {captured_count}/{zombie_count}", 7)
 
-        # 時間表示ロジック (Stage 1-6 共通)
-        elapsed = (pyxel.frame_count - self.stage_start_frame) / 60.0
-        time_left = max(0.0, self.stage_time_limit - elapsed)
-        
         time_text = f"Time: {time_left:.1f}s"
         t_x = WINDOW_W - len(time_text) * 4 - 4
-        
-        # タイムリミットが近い場合 (10秒未満) は赤く表示
-        color = 8 if time_left < 10 else 7
-        
-        pyxel.text(t_x, 8, time_text, color)
+
+        img.text(ox + t_x, oy + 8, time_text, color)
             
             
     def draw_title(self):
@@ -989,9 +1602,13 @@ class GameApp:
         for i, (px, py, spd) in enumerate(self.title_particles):
             ny = (py + (pyxel.frame_count % 40) * spd) % 30
             pyxel.pset(px, ny + 10, 8 if (pyxel.frame_count + i) % 15 < 7 else 4)
-        pyxel.text(WINDOW_W // 2 - 46, 86, "- PRESS ENTER TO START -", 7)
-        pyxel.text(10, 102, "(C) Y.Kusanagi", 13)
-        pyxel.text(10, 112, "Game Assembly by (C) M.Takahashi", 13)
+        # 文字は一度書いたら使い回し、ロゴの上に重ねる (黒は透明)
+        self.screen_layer.draw(0, 0, ("TITLE",), self.render_title_text, 0)
+
+    def render_title_text(self, img, ox, oy, key):
+        img.text(ox + WINDOW_W // 2 - 46, oy + 86, "- PRESS ENTER TO START -", 7)
+        img.text(ox + 10, oy + 102, "(C) Y.Kusanagi", 13)
+        img.text(ox + 10, oy + 112, "Game Assembly by (C) M.Takahashi", 13)
 
     def draw_game_over(self):
         # 画面中央にテキストを描画